@@ -0,0 +1,119 @@
+"""
+Artist name matching over search-result lists: the previous per-candidate implementation vs ArtistNameMatcher.
+
+Run with `make benchmark ARGS=benchmarks/bench_artist_name_matching.py`.
+"""
+
+import random
+import timeit
+from collections.abc import Callable
+
+from django.conf import settings
+from rapidfuzz import fuzz
+from unidecode import unidecode
+
+from web.events.constants import ALNUM_TABLE
+from web.events.enums import ArtistNameMatchAccuracy
+from web.events.exceptions import HeuristicsException
+from web.events.matching import ArtistNameMatcher, get_name_variants
+
+NUM_SEARCHES = 2_000
+RESULTS_PER_SEARCH = 25
+
+WORDS = [
+    "the", "black", "sigur", "rós", "björk", "mötley", "crüe", "мумий", "тролль", "beyoncé", "ac/dc", "sunn", "o)))",
+    "røyksopp", "sólstafir", "ænima", "kraftwerk", "daft", "punk", "band", "orchestra", "dj", "mc", "&", "trio",
+]  # fmt: skip
+
+
+Match = tuple[str, ArtistNameMatchAccuracy]
+Search = tuple[str, list[tuple[str, str]]]
+
+
+def legacy_match(artist_name: str, available_artists: list[tuple[str, str]]) -> Match:
+    """The previous find_best_artist_name_match_advanced, with thefuzz's rounding of rapidfuzz scores"""
+
+    artist_name = artist_name.casefold()
+    available_artists = [(_, name.casefold()) for _, name in available_artists]
+
+    if matches := [(_, name) for _, name in available_artists if name and artist_name == name]:
+        return matches[0][0], ArtistNameMatchAccuracy.exact
+
+    alnum_artist_name = artist_name.translate(ALNUM_TABLE)
+    transformed = [(_, name.translate(ALNUM_TABLE)) for _, name in available_artists]
+    transformed = [(_, name) for _, name in transformed if name]
+    if alnum_artist_name and (matches := [(_, name) for _, name in transformed if alnum_artist_name == name]):
+        return matches[0][0], ArtistNameMatchAccuracy.exact_alnum
+
+    transliterated = [(_, unidecode(name)) for _, name in available_artists]
+    if matches := [(_, name) for _, name in transliterated if unidecode(artist_name) == name]:
+        return matches[0][0], ArtistNameMatchAccuracy.exact_ascii
+
+    artist_name = artist_name.encode("ascii", errors="ignore").decode("ascii")
+    if not artist_name:
+        raise HeuristicsException("Not found")
+
+    transformed = [(_, name.encode("ascii", errors="ignore").decode("ascii")) for _, name in available_artists]
+    transformed = [(_, name) for _, name in transformed if name]
+    if not transformed:
+        raise HeuristicsException("Not found")
+
+    if matches := [(_, name) for _, name in transformed if artist_name == name]:
+        return matches[0][0], ArtistNameMatchAccuracy.exact_ascii
+
+    if matches := [
+        (_, name)
+        for _, name in available_artists
+        if round(fuzz.ratio(artist_name, name)) >= settings.EVENT_ARTIST_NAME_MATCH_THRESHOLD
+    ]:
+        return matches[0][0], ArtistNameMatchAccuracy.fuzzy
+
+    raise HeuristicsException("Not found")
+
+
+def random_name(rng: random.Random) -> str:
+    name = " ".join(rng.choices(WORDS, k=rng.randint(1, 4)))
+    return name.title() if rng.random() < 0.5 else name
+
+
+def searches(rng: random.Random) -> list[Search]:
+    # Popular names come up in many searches, like they do across users and alternative names
+    popular_names = [random_name(rng) for _ in range(NUM_SEARCHES // 4)]
+
+    result = []
+    for _ in range(NUM_SEARCHES):
+        names = rng.sample(popular_names, RESULTS_PER_SEARCH)
+        results = [(str(i), name) for i, name in enumerate(names)]
+        query = rng.choice(names) if rng.random() < 0.3 else random_name(rng)
+        result.append((query, results))
+    return result
+
+
+def run(match: Callable[[str, list[tuple[str, str]]], Match], searches: list[Search]) -> list[Match | None]:
+    results: list[Match | None] = []
+    for query, available_artists in searches:
+        try:
+            results.append(match(query, available_artists))
+        except HeuristicsException:
+            results.append(None)
+    return results
+
+
+def test_artist_name_matching() -> None:
+    test_searches = searches(random.Random(42))  # noqa: S311
+
+    start = timeit.default_timer()
+    legacy = run(legacy_match, test_searches)
+    legacy_seconds = timeit.default_timer() - start
+
+    get_name_variants.cache_clear()
+    start = timeit.default_timer()
+    matched = run(lambda query, artists: ArtistNameMatcher(artists).match_advanced(query), test_searches)
+    matcher_seconds = timeit.default_timer() - start
+
+    print(  # noqa: T201
+        f"\n{NUM_SEARCHES} searches of {RESULTS_PER_SEARCH} results: "
+        f"legacy {legacy_seconds:.3f}s, ArtistNameMatcher {matcher_seconds:.3f}s"
+    )
+
+    assert matched == legacy
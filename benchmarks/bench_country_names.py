@@ -0,0 +1,87 @@
+"""
+Country name normalisation of venue countries: country_converter vs the precompiled lookup, in time and memory.
+
+Run with `make benchmark ARGS=benchmarks/bench_country_names.py`.
+"""
+
+import logging
+import random
+import subprocess
+import sys
+import timeit
+
+import country_converter as coco
+
+from web.events.countries import (
+    COUNTRY_DATA_MODULE_PATH,
+    convert_country_name,
+    get_country_data,
+    write_country_data_module,
+)
+
+NUM_VENUES = 5_000
+
+# As they come in scraped events: mostly a few common countries, in all kinds of spellings
+COUNTRY_NAMES = [
+    "UK", "GB", "United Kingdom", "US", "USA", "United States", "Germany", "DE", "Deutschland", "France", "FR",
+    "Netherlands", "The Netherlands", "NL", "Spain", "España", "Italy", "Canada", "Australia", "Brasil", "Japan",
+    "Poland", "Czech Republic", "Czechia", "South Korea", "Mexico", "Ireland", "Sweden", "Norway", "Iceland",
+]  # fmt: skip
+
+# Peak RSS of the process itself: unlike ru_maxrss, it does not include the parent's memory before exec
+MAX_RSS_SCRIPT = """
+import pathlib
+{setup}
+print(next(line for line in pathlib.Path("/proc/self/status").read_text().splitlines() if line.startswith("VmHWM")))
+"""
+
+
+def max_rss_kib(setup: str) -> int:
+    """Peak resident memory of a fresh interpreter after running `setup`"""
+
+    script = MAX_RSS_SCRIPT.format(setup=setup)
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True, check=True, text=True).stdout  # noqa: S603
+    return int(output.strip().splitlines()[-1].split()[1])
+
+
+def test_country_names() -> None:
+    if not COUNTRY_DATA_MODULE_PATH.exists():
+        write_country_data_module()
+
+    rng = random.Random(42)  # noqa: S311
+    venue_countries = rng.choices(COUNTRY_NAMES, k=NUM_VENUES)
+
+    # country_converter logs a warning for each name it does not find
+    logging.getLogger("country_converter").setLevel(logging.ERROR)
+
+    start = timeit.default_timer()
+    cc = coco.CountryConverter()
+    coco_load_seconds = timeit.default_timer() - start
+
+    start = timeit.default_timer()
+    expected = [cc.convert(name, to="name_short", not_found=None) for name in venue_countries]
+    coco_seconds = timeit.default_timer() - start
+
+    get_country_data.cache_clear()
+    convert_country_name.cache_clear()
+    start = timeit.default_timer()
+    get_country_data()
+    lookup_load_seconds = timeit.default_timer() - start
+
+    start = timeit.default_timer()
+    converted = [convert_country_name(name) for name in venue_countries]
+    lookup_seconds = timeit.default_timer() - start
+
+    baseline_kib = max_rss_kib("")
+    coco_kib = max_rss_kib("import country_converter\ncountry_converter.CountryConverter()")
+    lookup_kib = max_rss_kib("from web.events.countries import get_country_data\nget_country_data()")
+
+    print(  # noqa: T201
+        f"\n{NUM_VENUES} venues: "
+        f"country_converter load {coco_load_seconds:.3f}s, convert {coco_seconds:.3f}s; "
+        f"lookup load {lookup_load_seconds:.3f}s, convert {lookup_seconds:.3f}s\n"
+        f"Peak RSS over a bare interpreter: country_converter {(coco_kib - baseline_kib) / 1024:.1f} MiB, "
+        f"lookup {(lookup_kib - baseline_kib) / 1024:.1f} MiB"
+    )
+
+    assert converted == expected
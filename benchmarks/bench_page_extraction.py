@@ -0,0 +1,126 @@
+"""
+Extraction of event data from Bandsintown and Songkick pages: a full DOM, XPath strings and a full `window.__data`
+decode vs XPaths compiled once and the byte-level `window.__data` extraction.
+
+The pages are generated with the structure and the size of saved Bandsintown and Songkick pages (a `window.__data`
+blob of a few megabytes in the head, a large body), as real pages can't be shipped with the repo.
+
+Run with `make benchmark ARGS=benchmarks/bench_page_extraction.py`.
+"""
+
+import json
+import random
+import timeit
+from typing import Any
+
+from lxml import html as lh
+
+from web.events.constants import SONGKICK_EVENTS_XPATH
+from web.events.extraction import extract_bandsintown_event_view, extract_bandsintown_events_json_ld, get_xpath
+
+NUM_PAGES = 20
+NUM_EVENTS = 50
+# What Bandsintown pages carry besides the data we read: recommendations, translations, tracking, etc.
+NUM_FILLER_ITEMS = 20_000
+
+BANDSINTOWN_WINDOW_DATA_XPATH = "//head/script[contains(text(),'window.__data=')]/text()"
+
+
+def json_ld_event(rng: random.Random, i: int) -> dict[str, Any]:
+    return {
+        "@type": "MusicEvent",
+        "url": f"https://www.bandsintown.com/e/{rng.randrange(10**9)}?came_from=257",
+        "name": f"Event {i}",
+        "startDate": f"2026-{rng.randint(1, 12):02}-{rng.randint(1, 28):02}T20:00:00",
+        "location": {
+            "@type": "Place",
+            "name": f"Venue {i}",
+            "address": {"addressLocality": "Berlin", "addressCountry": "Germany", "postalCode": "10115"},
+            "geo": {"latitude": 52.52, "longitude": 13.4},
+        },
+    }
+
+
+def bandsintown_page(rng: random.Random) -> bytes:
+    filler = [
+        {"id": rng.randrange(10**9), "body": {"title": f"Item {i}", "text": 'Lorem ipsum "dolor" sit amet é ' * 5}}
+        for i in range(NUM_FILLER_ITEMS)
+    ]
+    window_data = {
+        "user": {"body": {"locale": "en"}},
+        "recommendations": filler,
+        "eventView": {
+            "body": {
+                "detailedTicketList": {
+                    "ticketList": [{"directTicketUrl": f"https://tickets.example.com/{i}"} for i in range(3)]
+                }
+            }
+        },
+        "jsonLdContainer": {"eventsJsonLd": [json_ld_event(rng, i) for i in range(NUM_EVENTS)]},
+    }
+    body = "".join(f"<div class='row'><a href='/a/{i}'>Artist {i}</a><span>é</span></div>" for i in range(5_000))
+    page = (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'><title>Artist</title>"
+        "<script>window.dataLayer=[];</script>"
+        f"<script>window.__data={json.dumps(window_data, ensure_ascii=False)}</script>"
+        f"</head><body>{body}</body></html>"
+    )
+    return page.encode()
+
+
+def songkick_page(rng: random.Random) -> bytes:
+    events = "".join(
+        "<li><div class='microformat'><script type='application/ld+json'>"
+        f"{json.dumps([json_ld_event(rng, i)])}</script></div><p>Event {i}</p></li>"
+        for i in range(NUM_EVENTS)
+    )
+    body = "".join(f"<div class='row'><a href='/artists/{i}'>Artist {i}</a></div>" for i in range(5_000))
+    page = (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'><title>Artist</title></head><body>"
+        f"<div id='calendar-summary' class='upcoming'><ol>{events}</ol></div>{body}</body></html>"
+    )
+    return page.encode()
+
+
+def legacy_window_data(content: bytes) -> dict[str, Any]:
+    """The previous extraction: DOM of the whole page, XPath string, split and decode of the whole blob"""
+
+    script_tag = lh.fromstring(content.decode()).xpath(BANDSINTOWN_WINDOW_DATA_XPATH)
+    data: dict[str, Any] = json.loads(script_tag[0].split("window.__data=")[1])
+    return data
+
+
+def test_page_extraction() -> None:
+    rng = random.Random(42)  # noqa: S311
+    bandsintown_pages = [bandsintown_page(rng) for _ in range(NUM_PAGES)]
+    songkick_pages = [songkick_page(rng) for _ in range(NUM_PAGES)]
+
+    start = timeit.default_timer()
+    legacy_events = [legacy_window_data(page)["jsonLdContainer"]["eventsJsonLd"] for page in bandsintown_pages]
+    legacy_event_views = [legacy_window_data(page)["eventView"] for page in bandsintown_pages]
+    legacy_bandsintown_seconds = timeit.default_timer() - start
+
+    start = timeit.default_timer()
+    events = [extract_bandsintown_events_json_ld(page) for page in bandsintown_pages]
+    event_views = [extract_bandsintown_event_view(page) for page in bandsintown_pages]
+    bandsintown_seconds = timeit.default_timer() - start
+
+    start = timeit.default_timer()
+    legacy_songkick_events = [lh.fromstring(page.decode()).xpath(SONGKICK_EVENTS_XPATH) for page in songkick_pages]
+    legacy_songkick_seconds = timeit.default_timer() - start
+
+    start = timeit.default_timer()
+    songkick_events = [get_xpath(SONGKICK_EVENTS_XPATH)(lh.fromstring(page.decode())) for page in songkick_pages]
+    songkick_seconds = timeit.default_timer() - start
+
+    page_mib = sum(map(len, bandsintown_pages)) / NUM_PAGES / 1024 / 1024
+    print(  # noqa: T201
+        f"\n{NUM_PAGES} Bandsintown pages of {page_mib:.1f} MiB, artist and event data: "
+        f"legacy {legacy_bandsintown_seconds:.3f}s, extraction {bandsintown_seconds:.3f}s\n"
+        f"{NUM_PAGES} Songkick pages: XPath string {legacy_songkick_seconds:.3f}s, "
+        f"compiled XPath {songkick_seconds:.3f}s"
+    )
+
+    assert events == legacy_events
+    assert event_views == legacy_event_views
+    assert songkick_events == legacy_songkick_events
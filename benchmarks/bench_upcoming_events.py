@@ -0,0 +1,148 @@
+"""
+Upcoming events of users with a location: per-artist distance queries vs a single spatially indexed query per user
+vs a lookup in the materialized UserEvent table.
+
+Run with `make benchmark ARGS=benchmarks/bench_upcoming_events.py`.
+"""
+
+import datetime
+import random
+import timeit
+import uuid
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.gis.geos import Point
+from django.contrib.gis.measure import Distance
+from django.db import models
+
+from web.events.enums import EventType
+from web.models import Artist, Event, EventArtist, SpotifyUser, User, UserEvent
+
+pytestmark = pytest.mark.django_db
+
+NUM_USERS = 1_000
+NUM_ARTISTS = 2_000
+NUM_EVENTS = 100_000
+ARTISTS_PER_USER = 20
+DISTANCE_KM = 100.0
+
+
+def random_point(rng: random.Random) -> Point:
+    # Roughly Europe
+    return Point(rng.uniform(-10.0, 30.0), rng.uniform(36.0, 60.0), srid=settings.GEODJANGO_SRID)
+
+
+def populate(rng: random.Random) -> list[User]:
+    today = datetime.datetime.now(tz=datetime.UTC).date()
+
+    artists = Artist.objects.bulk_create([Artist(spotify_id=f"bench_artist_{i}") for i in range(NUM_ARTISTS)])
+    event_artists = EventArtist.objects.bulk_create(
+        [
+            EventArtist(
+                artist=artist,
+                musicbrainz_id=uuid.uuid4(),
+                songkick_name_match_accuracy=100,
+                bandsintown_name_match_accuracy=100,
+            )
+            for artist in artists
+        ]
+    )
+
+    Event.objects.bulk_create(
+        [
+            Event(
+                artist=rng.choice(event_artists),
+                source="songkick",
+                source_url=f"https://www.songkick.com/concerts/bench_{i}",
+                type=EventType.live_stream if rng.random() < 0.02 else EventType.concert,
+                date=today + datetime.timedelta(days=rng.randint(-180, 365)),
+                geolocation=random_point(rng),
+            )
+            for i in range(NUM_EVENTS)
+        ],
+        batch_size=1000,
+    )
+
+    spotify_users = SpotifyUser.objects.bulk_create(
+        [SpotifyUser(spotify_id=f"bench_user_{i}", display_name=f"User {i}") for i in range(NUM_USERS)]
+    )
+    User.objects.bulk_create(
+        [
+            User(spotify_user=spotify_user, location=random_point(rng), event_distance_threshold=DISTANCE_KM)
+            for spotify_user in spotify_users
+        ]
+    )
+
+    through = EventArtist.watching_users.through
+    through.objects.bulk_create(
+        [
+            through(eventartist_id=event_artist.id, spotifyuser_id=spotify_user.id)
+            for spotify_user in spotify_users
+            for event_artist in rng.sample(event_artists, ARTISTS_PER_USER)
+        ],
+        batch_size=1000,
+    )
+
+    return list(User.objects.select_related("spotify_user"))
+
+
+def upcoming_event_ids_per_artist(user: User) -> set[uuid.UUID]:
+    """The way upcoming events used to be queried: one distance query per watched artist"""
+
+    event_ids = set()
+
+    for event_artist in user.spotify_user.watched_event_artists.all():  # pyright: ignore[reportAttributeAccessIssue]
+        events_query = event_artist.events.filter(
+            models.Q(date__gte=datetime.datetime.now(tz=datetime.UTC).date())
+            & (
+                models.Q(type=EventType.live_stream)
+                | (
+                    models.Q(~models.Q(type=EventType.live_stream), geolocation__isnull=False)
+                    & models.Q(geolocation__distance_lte=(user.location, Distance(km=user.event_distance_threshold)))
+                )
+            )
+        )
+        event_ids.update(events_query.values_list("id", flat=True))
+
+    return event_ids
+
+
+def relevant_event_ids(user: User) -> set[uuid.UUID]:
+    return set(user.relevant_events_query().values_list("id", flat=True))
+
+
+def upcoming_event_ids(user: User) -> set[uuid.UUID]:
+    upcoming_events = async_to_sync(user.upcoming_events)()
+    return {event.id for events in upcoming_events.values() for event in events}
+
+
+def test_upcoming_events() -> None:
+    users = populate(random.Random(42))  # noqa: S311
+
+    start = timeit.default_timer()
+    per_artist = [upcoming_event_ids_per_artist(user) for user in users]
+    per_artist_seconds = timeit.default_timer() - start
+
+    start = timeit.default_timer()
+    single_query = [relevant_event_ids(user) for user in users]
+    single_query_seconds = timeit.default_timer() - start
+
+    # Bulk inserts above bypass the signals that maintain UserEvent
+    start = timeit.default_timer()
+    for user in users:
+        UserEvent.refresh_for_user(user)
+    materialize_seconds = timeit.default_timer() - start
+
+    start = timeit.default_timer()
+    materialized = [upcoming_event_ids(user) for user in users]
+    materialized_seconds = timeit.default_timer() - start
+
+    print(  # noqa: T201
+        f"\n{NUM_USERS} users, {NUM_EVENTS} events: "
+        f"per-artist queries {per_artist_seconds:.2f}s, spatially indexed query {single_query_seconds:.2f}s, "
+        f"materialized lookup {materialized_seconds:.2f}s (materializing took {materialize_seconds:.2f}s)"
+    )
+
+    assert per_artist == single_query == materialized
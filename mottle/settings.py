@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 from socket import gethostbyname, gethostname
 from typing import Any
@@ -60,6 +61,7 @@ MIDDLEWARE = [
 ]
 
 URLSHORTENER_BASE_URL = env.str("URLSHORTENER_BASE_URL", "https://mottle.it")
+SHORT_URL_CACHE_SIZE = env.int("SHORT_URL_CACHE_SIZE", 10_000)  # Short URLs kept in memory by each process
 
 ROOT_HOSTCONF = "mottle.hosts"
 ROOT_URLCONF = "mottle.urls"
@@ -294,6 +296,10 @@ EMAIL_USE_SSL = env.bool("EMAIL_USE_SSL", False)
 EMAIL_HOST_USER = env.str("EMAIL_HOST_USER", "")
 EMAIL_HOST_PASSWORD = env.str("EMAIL_HOST_PASSWORD", "")
 EMAIL_TIMEOUT = env.int("EMAIL_TIMEOUT", 15)
+EMAIL_OUTBOX_BATCH_SIZE = env.int("EMAIL_OUTBOX_BATCH_SIZE", 50)
+EMAIL_OUTBOX_MAX_ATTEMPTS = env.int("EMAIL_OUTBOX_MAX_ATTEMPTS", 6)
+EMAIL_OUTBOX_RETRY_BACKOFF_SECONDS = env.int("EMAIL_OUTBOX_RETRY_BACKOFF_SECONDS", 60)
+EMAIL_OUTBOX_LEASE_SECONDS = env.int("EMAIL_OUTBOX_LEASE_SECONDS", 300)
 
 OPENAI_API_KEY = env.str("OPENAI_API_KEY", "openai-api-key")
 OPENAI_IMAGES_DUMP_DIR = env.path("OPENAI_IMAGES_DUMP_DIR", BASE_DIR / "images_dump")
@@ -301,16 +307,57 @@ OPENAI_IMAGES_DUMP_DIR = env.path("OPENAI_IMAGES_DUMP_DIR", BASE_DIR / "images_d
 HTTP_USER_AGENT = f"mottle/{APP_VERSION}"
 
 PROXY_URL = env.str("PROXY_URL", None)
+PROXY_URLS: list[str] = env.list("PROXY_URLS", [])  # Pool of proxies for event sources, used instead of PROXY_URL
+PROXY_COOLDOWN_SECONDS = env.int("PROXY_COOLDOWN_SECONDS", 30)  # Doubles with every consecutive throttle
+PROXY_MAX_COOLDOWN_SECONDS = env.int("PROXY_MAX_COOLDOWN_SECONDS", 900)
+EVENT_SOURCE_RETRY_BACKOFF_SECONDS = env.float("EVENT_SOURCE_RETRY_BACKOFF_SECONDS", 0.5)  # Doubles with every retry
+EVENT_SOURCE_RETRY_MAX_BACKOFF_SECONDS = env.float("EVENT_SOURCE_RETRY_MAX_BACKOFF_SECONDS", 30.0)
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = env.int("CIRCUIT_BREAKER_FAILURE_THRESHOLD", 20)  # Failures in the window
+CIRCUIT_BREAKER_WINDOW_SECONDS = env.int("CIRCUIT_BREAKER_WINDOW_SECONDS", 60)
+CIRCUIT_BREAKER_OPEN_SECONDS = env.int("CIRCUIT_BREAKER_OPEN_SECONDS", 30)  # Doubles every time a probe fails
+CIRCUIT_BREAKER_MAX_OPEN_SECONDS = env.int("CIRCUIT_BREAKER_MAX_OPEN_SECONDS", 600)
+CIRCUIT_BREAKER_CLOSE_AFTER_SUCCESSES = env.int("CIRCUIT_BREAKER_CLOSE_AFTER_SUCCESSES", 8)
+CIRCUIT_BREAKER_MAX_PARK_SECONDS = env.int("CIRCUIT_BREAKER_MAX_PARK_SECONDS", 60)  # Longer waits fail fast
+EVENT_SOURCE_HTTP_CACHE_ENABLED = env.bool("EVENT_SOURCE_HTTP_CACHE_ENABLED", True)  # Songkick and Bandsintown pages
+EVENT_SOURCE_HTTP_CACHE_DIR = env.path("EVENT_SOURCE_HTTP_CACHE_DIR", BASE_DIR / "http_cache")
+EVENT_SOURCE_HTTP_CACHE_MAX_BYTES = env.int("EVENT_SOURCE_HTTP_CACHE_MAX_BYTES", 512 * 1024 * 1024)
+# Songkick and Bandsintown requests slower than the quantile of recent ones are sent again, within the budget
+EVENT_SOURCE_HEDGING_ENABLED = env.bool("EVENT_SOURCE_HEDGING_ENABLED", False)
+EVENT_SOURCE_HEDGE_QUANTILE = env.float("EVENT_SOURCE_HEDGE_QUANTILE", 0.95)
+EVENT_SOURCE_HEDGE_BUDGET = env.float("EVENT_SOURCE_HEDGE_BUDGET", 0.05)  # Extra requests per request at most
+EVENT_PAGE_PARSER_PROCESS_POOL = env.bool("EVENT_PAGE_PARSER_PROCESS_POOL", False)  # Otherwise pages are parsed inline
+EVENT_PAGE_PARSER_PROCESSES = env.int("EVENT_PAGE_PARSER_PROCESSES", os.cpu_count() or 1)
+if EVENT_PAGE_PARSER_PROCESS_POOL:
+    # django-q workers are daemonic by default, and daemonic processes can't start the page parser processes
+    Q_CLUSTER["daemonize_workers"] = False
 
 EVENTS_ENABLED = env.bool("EVENTS_ENABLED", True)
 EVENT_SOURCES_FETCH_CONCURRENCY_LIMIT = env.int("EVENT_SOURCES_FETCH_CONCURRENCY_LIMIT", 100)
 EVENTS_FETCH_CONCURRENCY_LIMIT = env.int("EVENTS_FETCH_CONCURRENCY_LIMIT", 100)
+# MusicBrainz allows one request per second, URL lookups of concurrently tracked artists are batched to keep up
+MUSICBRAINZ_URL_LOOKUP_INTERVAL_SECONDS = env.float("MUSICBRAINZ_URL_LOOKUP_INTERVAL_SECONDS", 1.0)
+# Searches by the names of an artist in Songkick and Bandsintown that run at once, the first names are preferred
+EVENT_ARTIST_ALIAS_SEARCH_CONCURRENCY = env.int("EVENT_ARTIST_ALIAS_SEARCH_CONCURRENCY", 4)
 EVENT_ARTIST_NAME_MATCH_THRESHOLD = env.int("EVENT_ARTIST_NAME_MATCH_THRESHOLD", 85)
 RESOLVE_SONGKICK_URLS = env.bool("RESOLVE_SONGKICK_URLS", False)
+REDIRECT_RESOLUTION_PER_HOST_CONCURRENCY_LIMIT = env.int("REDIRECT_RESOLUTION_PER_HOST_CONCURRENCY_LIMIT", 10)
+EVENTS_REFRESH_BUDGET = env.int("EVENTS_REFRESH_BUDGET", 1000)  # Artists per run, 0 for no limit
+EVENT_ARTIST_REFRESH_MIN_INTERVAL_HOURS = env.int("EVENT_ARTIST_REFRESH_MIN_INTERVAL_HOURS", 12)
+EVENT_ARTIST_REFRESH_MAX_INTERVAL_HOURS = env.int("EVENT_ARTIST_REFRESH_MAX_INTERVAL_HOURS", 24 * 14)
+EVENT_ARTIST_REFRESH_SOON_DAYS = env.int("EVENT_ARTIST_REFRESH_SOON_DAYS", 30)
+# Events without ticket or stream URLs whose listing has not changed are re-checked after 10% of the time until them
+EVENT_DETAIL_RECHECK_MIN_INTERVAL_HOURS = env.int("EVENT_DETAIL_RECHECK_MIN_INTERVAL_HOURS", 12)
+EVENT_DETAIL_RECHECK_MAX_INTERVAL_HOURS = env.int("EVENT_DETAIL_RECHECK_MAX_INTERVAL_HOURS", 24 * 7)
+# Progress of artist tracking runs is saved after this many looked up artists or seconds, whichever comes first
+ARTIST_TRACKING_PROGRESS_SAVE_INTERVAL_ARTISTS = env.int("ARTIST_TRACKING_PROGRESS_SAVE_INTERVAL_ARTISTS", 50)
+ARTIST_TRACKING_PROGRESS_SAVE_INTERVAL_SECONDS = env.float("ARTIST_TRACKING_PROGRESS_SAVE_INTERVAL_SECONDS", 5.0)
+LOOKUP_CACHE_TTL_DAYS = env.int("LOOKUP_CACHE_TTL_DAYS", 30)
+LOOKUP_CACHE_NEGATIVE_TTL_DAYS = env.int("LOOKUP_CACHE_NEGATIVE_TTL_DAYS", 1)  # Doubles with every re-check
 
 GEODJANGO_SRID = 4326
 
 SCHEDULE = {
     "PLAYLIST_UPDATES": env.str("SCHEDULE_PLAYLIST_UPDATES", None),
     "EVENT_UPDATES": env.str("SCHEDULE_EVENT_UPDATES", None),
+    "EMAIL_OUTBOX": env.str("SCHEDULE_EMAIL_OUTBOX", "* * * * *"),
 }
@@ -9,7 +9,7 @@ from django.conf import settings
 from django_q.cluster import Cluster
 from prometheus_client import CollectorRegistry, multiprocess, start_http_server
 
-from taskrunner.schedules import event_updates, playlist_updates
+from taskrunner.schedules import email_outbox, event_updates, playlist_updates
 
 if TYPE_CHECKING:
     from threading import Thread
@@ -71,7 +71,7 @@ def main() -> None:
     metrics_server_port = int(sys.argv[2])
 
     q = MottleCluster()
-    q.add_schedules(playlist_updates, event_updates)
+    q.add_schedules(playlist_updates, event_updates, email_outbox)
     q.start(metrics_server_host, metrics_server_port)
 
 
@@ -15,6 +15,9 @@ PLAYLIST_UPDATES_FUNC = "web.tasks.check_playlists_for_updates"
 EVENT_UPDATES_NAME = "event_updates"
 EVENT_UPDATES_FUNC = "web.tasks.check_artists_for_event_updates"
 
+EMAIL_OUTBOX_NAME = "email_outbox"
+EMAIL_OUTBOX_FUNC = "web.tasks.send_queued_emails"
+
 
 def get_next_run(cron_schedule: str) -> datetime:
     return cast("datetime", croniter(cron_schedule, localtime()).get_next(datetime))
@@ -54,3 +57,22 @@ def event_updates() -> None:
             "next_run": get_next_run(schedule),
         },
     )
+
+
+def email_outbox() -> None:
+    schedule = settings.SCHEDULE.get("EMAIL_OUTBOX")
+    if schedule is None:
+        logger.warning("EMAIL_OUTBOX schedule is not set. Skipping task creation")
+        return
+
+    Schedule.objects.update_or_create(
+        name=EMAIL_OUTBOX_NAME,
+        defaults={
+            "func": EMAIL_OUTBOX_FUNC,
+            "schedule_type": Schedule.CRON,
+            "cron": schedule,
+            # Not on long_running, so that emails are not held back while the event updates job is running
+            "cluster": "default",
+            "next_run": get_next_run(schedule),
+        },
+    )
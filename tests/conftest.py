@@ -1,6 +1,6 @@
 import datetime
 import uuid
-from collections.abc import Awaitable, Callable
+from collections.abc import Awaitable, Callable, Iterator
 from unittest.mock import Mock
 
 import pytest
@@ -9,6 +9,7 @@ from django.contrib.gis.geos import Point
 from django.test import RequestFactory
 from tekore.model import FullAlbum, FullArtist, FullPlaylist, FullTrack, PublicUser
 
+from urlshortener.models import short_url_cache
 from web.middleware import MottleHttpRequest
 from web.models import (
     Artist,
@@ -24,6 +25,13 @@ from web.models import (
 from web.utils import MottleSpotifyClient
 
 
+@pytest.fixture(autouse=True)
+def clear_short_url_cache() -> Iterator[None]:
+    """Short URLs cached during a test would point to rows that are rolled back after it"""
+    yield
+    short_url_cache.clear()
+
+
 @pytest.fixture
 async def spotify_user() -> SpotifyUser:
     return await SpotifyUser.objects.acreate(
@@ -0,0 +1,51 @@
+import asyncio
+from itertools import pairwise
+
+import pytest
+
+from web.events.batching import LookupBatcher
+
+
+class TestLookupBatcher:
+    @pytest.mark.asyncio
+    async def test_batches_concurrent_lookups(self) -> None:
+        batches = []
+
+        async def fetch(keys: list[int]) -> dict[int, str]:
+            batches.append(keys)
+            await asyncio.sleep(0.01)
+            return {key: str(key) for key in keys if key != 3}
+
+        batcher = LookupBatcher("test", fetch, max_batch_size=4, interval_seconds=0.0)
+        values = await asyncio.gather(*[batcher.lookup(key) for key in [0, 1, 2, 3, 4, 5, 1]])
+
+        assert values == ["0", "1", "2", None, "4", "5", "1"]
+        # Repeated keys are looked up once
+        assert batches == [[0, 1, 2, 3], [4, 5]]
+
+    @pytest.mark.asyncio
+    async def test_spaces_batches(self) -> None:
+        request_times = []
+
+        async def fetch(keys: list[int]) -> dict[int, int]:
+            request_times.append(asyncio.get_running_loop().time())
+            return {key: key for key in keys}
+
+        batcher = LookupBatcher("test", fetch, max_batch_size=1, interval_seconds=0.05)
+        assert await asyncio.gather(*[batcher.lookup(key) for key in range(3)]) == [0, 1, 2]
+
+        assert len(request_times) == 3
+        assert all(b - a >= 0.045 for a, b in pairwise(request_times))
+
+    @pytest.mark.asyncio
+    async def test_fails_batch(self) -> None:
+        async def fetch(keys: list[int]) -> dict[int, int]:
+            if 0 in keys:
+                raise ValueError("Lookup failed")
+            return {key: key for key in keys}
+
+        batcher = LookupBatcher("test", fetch, max_batch_size=2, interval_seconds=0.0)
+        results = await asyncio.gather(*[batcher.lookup(key) for key in range(4)], return_exceptions=True)
+
+        assert [type(result) for result in results[:2]] == [ValueError, ValueError]
+        assert results[2:] == [2, 3]
@@ -0,0 +1,108 @@
+import email.utils
+import time
+
+import httpx
+import pytest
+
+from web.events.circuit_breaker import CircuitBreaker, CircuitState
+from web.events.exceptions import CircuitOpenException
+from web.events.http import AsyncRetryingClient, parse_retry_after
+
+
+def circuit_breaker(open_seconds: float = 0.05, max_park_seconds: float = 0.0) -> CircuitBreaker:
+    return CircuitBreaker(
+        "bandsintown",
+        failure_threshold=3,
+        window_seconds=60,
+        open_seconds=open_seconds,
+        max_open_seconds=60,
+        close_after_successes=3,
+        max_park_seconds=max_park_seconds,
+    )
+
+
+class TestCircuitBreaker:
+    @pytest.mark.asyncio
+    async def test_opens_after_failures_and_fails_fast(self) -> None:
+        breaker = circuit_breaker()
+
+        for _ in range(3):
+            breaker.release(await breaker.acquire(), "failure")
+
+        assert breaker.state == CircuitState.open
+        with pytest.raises(CircuitOpenException):
+            await breaker.acquire()
+
+    @pytest.mark.asyncio
+    async def test_closes_gradually(self) -> None:
+        breaker = circuit_breaker(max_park_seconds=1)
+        breaker.open(time.monotonic())
+
+        # Parked until the circuit is half-open, then let through as a probe
+        probe = await breaker.acquire()
+        assert probe is True
+        assert breaker.state == CircuitState.half_open
+        assert breaker.probes_in_flight == 1
+
+        breaker.release(probe, "ok")
+        # Every successful probe doubles the number of probes let through at once
+        assert breaker.probe_limit == 2
+        probes = [await breaker.acquire() for _ in range(2)]
+        for probe in probes:
+            breaker.release(probe, "ok")
+
+        assert breaker.state == CircuitState.closed
+        assert await breaker.acquire() is False
+
+    @pytest.mark.asyncio
+    async def test_failed_probe_reopens_for_longer(self) -> None:
+        breaker = circuit_breaker(max_park_seconds=1)
+        breaker.open(time.monotonic())
+
+        probe = await breaker.acquire()
+        now = time.monotonic()
+        breaker.release(probe, "failure")
+
+        assert breaker.state == CircuitState.open
+        assert breaker.open_until >= now + 0.1
+
+    def test_retry_after_extends_open_time(self) -> None:
+        breaker = circuit_breaker()
+        now = time.monotonic()
+
+        breaker.open(now, retry_after_seconds=0.5)
+
+        assert breaker.open_until == now + 0.5
+
+
+class TestAsyncRetryingClient:
+    @pytest.mark.asyncio
+    async def test_throttles_open_circuit(self) -> None:
+        requests: list[httpx.Request] = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            requests.append(request)
+            return httpx.Response(403)
+
+        async with AsyncRetryingClient(
+            name="bandsintown",
+            throttle_response_code=403,
+            circuit_breaker=circuit_breaker(open_seconds=60),
+            transport=httpx.MockTransport(handler),
+        ) as client:
+            with pytest.raises(CircuitOpenException):
+                await client.get("https://www.bandsintown.com/a/1")
+
+            # Instead of hammering the source with all the retries, requests are rejected once the circuit opens
+            assert len(requests) == 3
+            assert client.stats()["rejected"] == 1
+
+
+def test_parse_retry_after() -> None:
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("120") == 120.0
+    assert parse_retry_after("soon") is None
+
+    retry_after_seconds = parse_retry_after(email.utils.formatdate(time.time() + 60, usegmt=True))
+    assert retry_after_seconds is not None
+    assert 55 < retry_after_seconds <= 60
@@ -0,0 +1,115 @@
+import asyncio
+import json
+import multiprocessing
+from functools import partial
+from typing import Any
+
+import pytest
+from django.test import override_settings
+
+from web.events.constants import SONGKICK_TICKETS_XPATH
+from web.events.extraction import (
+    extract_bandsintown_event_view,
+    extract_bandsintown_events_json_ld,
+    extract_window_data,
+    select_html,
+)
+from web.events.parsing import get_parser_executor, parse_page
+
+
+def bandsintown_page(window_data: dict[str, Any]) -> bytes:
+    return (
+        "<html><head><script>window.dataLayer=[];</script>"
+        f"<script>window.__data={json.dumps(window_data, ensure_ascii=False)};</script>"
+        "</head><body><p>Ünïcode</p></body></html>"
+    ).encode()
+
+
+WINDOW_DATA = {
+    "user": {"body": {"locale": "en"}, "bio": 'Says "eventView": {} a lot'},
+    "eventView": {"body": {"detailedTicketList": {"ticketList": [{"directTicketUrl": "https://tickets.example.com"}]}}},
+    "jsonLdContainer": {"eventsJsonLd": [{"url": "https://www.bandsintown.com/e/1", "name": "Ünïcode"}]},
+}
+
+
+class TestExtractWindowData:
+    def test_extracts_only_needed_data(self) -> None:
+        page = bandsintown_page(WINDOW_DATA)
+
+        assert extract_bandsintown_events_json_ld(page) == WINDOW_DATA["jsonLdContainer"]["eventsJsonLd"]
+        assert extract_bandsintown_event_view(page) == WINDOW_DATA["eventView"]
+        # "body" occurs more than once, it is looked up in eventView
+        assert extract_window_data(page, ("eventView", "body")) == WINDOW_DATA["eventView"]["body"]
+
+    def test_key_under_another_parent(self) -> None:
+        page = bandsintown_page(
+            {"jsonLdContainer": {"artistJsonLd": {}}, "venueView": {"eventsJsonLd": [{"url": "https://example.com"}]}}
+        )
+
+        with pytest.raises(KeyError):
+            extract_bandsintown_events_json_ld(page)
+        assert extract_window_data(page, ("venueView", "eventsJsonLd")) == [{"url": "https://example.com"}]
+
+    def test_key_only_nested(self) -> None:
+        page = bandsintown_page({"user": {"eventView": {"body": {}}}, "venues": [{"eventView": {}}]})
+
+        assert extract_bandsintown_event_view(page) == {}
+        assert extract_window_data(page, ("user", "eventView")) == {"body": {}}
+
+        page = bandsintown_page({"venues": [{"jsonLdContainer": {"eventsJsonLd": []}}]})
+
+        with pytest.raises(KeyError):
+            extract_bandsintown_events_json_ld(page)
+
+    def test_missing_data(self) -> None:
+        page = bandsintown_page({"user": {}})
+
+        assert extract_bandsintown_event_view(page) == {}
+        with pytest.raises(KeyError):
+            extract_bandsintown_events_json_ld(page)
+        with pytest.raises(ValueError, match=r"no 'window\.__data=' element"):
+            extract_bandsintown_events_json_ld(b"<html><head></head></html>")
+
+
+def test_select_html() -> None:
+    page = "<html><body><a class='buy-ticket-link' href='/tickets/1?ö=1'>Tickets</a></body></html>".encode()
+
+    assert select_html(SONGKICK_TICKETS_XPATH, "utf-8", page) == ["/tickets/1?ö=1"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("process_pool", [False, True])
+async def test_parse_page(process_pool: bool) -> None:
+    page = bandsintown_page(WINDOW_DATA)
+
+    get_parser_executor.cache_clear()
+    try:
+        with override_settings(EVENT_PAGE_PARSER_PROCESS_POOL=process_pool, EVENT_PAGE_PARSER_PROCESSES=1):
+            events = await parse_page(extract_bandsintown_events_json_ld, page)
+            urls = await parse_page(partial(select_html, "//script/text()", "utf-8"), page)
+    finally:
+        if (executor := get_parser_executor()) is not None:
+            executor.shutdown()
+        get_parser_executor.cache_clear()
+
+    assert events == WINDOW_DATA["jsonLdContainer"]["eventsJsonLd"]
+    assert len(urls) == 2
+
+
+def parse_events_in_process(page: bytes, results: multiprocessing.Queue) -> None:
+    with override_settings(EVENT_PAGE_PARSER_PROCESS_POOL=True, EVENT_PAGE_PARSER_PROCESSES=1):
+        results.put(asyncio.run(parse_page(extract_bandsintown_events_json_ld, page)))
+
+
+def test_parse_page_in_daemonic_process() -> None:
+    # Like a django-q worker, daemonic processes can't have children
+    page = bandsintown_page(WINDOW_DATA)
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+
+    process = context.Process(target=parse_events_in_process, args=(page, results), daemon=True)
+    process.start()
+    events = results.get(timeout=30)
+    process.join()
+
+    assert events == WINDOW_DATA["jsonLdContainer"]["eventsJsonLd"]
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.contrib.gis.geos import Point
+
+from web.geo import bounding_box
+
+
+class TestBoundingBox:
+    def test_contains_points_at_distance(self) -> None:
+        # London, 100 km
+        xmin, ymin, xmax, ymax = bounding_box(Point(-0.1, 51.5, srid=settings.GEODJANGO_SRID), 100)
+
+        # ~0.9 degrees of latitude and ~1.44 degrees of longitude at this latitude
+        assert ymin < 51.5 - 0.89 < 51.5 + 0.89 < ymax
+        assert xmin < -0.1 - 1.43 < -0.1 + 1.43 < xmax
+        assert ymax - ymin < 2
+        assert xmax - xmin < 3
+
+    def test_spans_all_longitudes_across_antimeridian(self) -> None:
+        xmin, ymin, xmax, ymax = bounding_box(Point(179.9, -17.7, srid=settings.GEODJANGO_SRID), 100)
+
+        assert (xmin, xmax) == (-180.0, 180.0)
+        assert ymin < -17.7 < ymax
+
+    def test_spans_all_longitudes_near_pole(self) -> None:
+        xmin, ymin, xmax, ymax = bounding_box(Point(10.0, 89.5, srid=settings.GEODJANGO_SRID), 100)
+
+        assert (xmin, xmax) == (-180.0, 180.0)
+        assert ymax == 90.0
+        assert ymin < 89.5
@@ -0,0 +1,109 @@
+import asyncio
+
+import httpx
+import pytest
+
+from web.events.hedging import RequestHedger
+from web.events.http import AsyncRetryingClient
+from web.events.proxies import ProxyPoolTransport
+
+
+def warmed_up_hedger(budget: float = 1.0) -> RequestHedger:
+    hedger = RequestHedger("songkick", budget=budget, quantile=0.95, min_samples=10)
+    for _ in range(10):
+        hedger.record(0.05)
+    return hedger
+
+
+def stand_in_proxy(delay_seconds: float, requests: list[str]) -> httpx.MockTransport:
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(str(request.url))
+        await asyncio.sleep(delay_seconds)
+        return httpx.Response(200, text=str(delay_seconds))
+
+    return httpx.MockTransport(handler)
+
+
+class TestRequestHedger:
+    def test_hedge_delay(self) -> None:
+        hedger = RequestHedger("songkick", budget=0.5, quantile=0.9, window_size=20, min_samples=10)
+
+        for seconds in range(9):
+            hedger.record(seconds)
+        assert hedger.start() is None
+
+        for seconds in range(9, 30):
+            hedger.record(seconds)
+        # The quantile of the last 20 response times: 10..29
+        assert hedger.start() == 28
+
+    def test_budget(self) -> None:
+        hedger = warmed_up_hedger(budget=0.25)
+
+        hedges = []
+        for _ in range(8):
+            hedger.start()
+            hedges.append(hedger.try_hedge())
+
+        assert hedges == [False, False, False, True] * 2
+
+
+class TestAsyncRetryingClient:
+    @pytest.mark.asyncio
+    async def test_slow_request_is_hedged_through_another_proxy(self) -> None:
+        slow_requests: list[str] = []
+        fast_requests: list[str] = []
+        transport = ProxyPoolTransport(
+            "songkick",
+            {
+                "http://slow.proxy:8080": stand_in_proxy(5, slow_requests),
+                "http://fast.proxy:8080": stand_in_proxy(0, fast_requests),
+            },
+        )
+        # Make the slow proxy get the first request
+        transport.proxies[1].score = 0.5
+
+        async with AsyncRetryingClient(name="songkick", hedger=warmed_up_hedger(), transport=transport) as client:
+            response = await asyncio.wait_for(client.get("https://www.songkick.com/artists/1"), timeout=1)
+
+        assert response.text == "0"
+        assert len(slow_requests) == 1
+        assert len(fast_requests) == 1
+        assert client.stats()["hedged"] == 1
+        assert client.stats()["total"] == 1
+
+    @pytest.mark.asyncio
+    async def test_lost_hedge_request_is_not_recorded(self) -> None:
+        requests: list[str] = []
+        transport = ProxyPoolTransport(
+            "songkick",
+            {
+                "http://medium.proxy:8080": stand_in_proxy(0.2, requests),
+                "http://slow.proxy:8080": stand_in_proxy(5, requests),
+            },
+        )
+        # Make the medium proxy get the first request
+        transport.proxies[1].score = 0.5
+        hedger = warmed_up_hedger()
+
+        async with AsyncRetryingClient(name="songkick", hedger=hedger, transport=transport) as client:
+            response = await asyncio.wait_for(client.get("https://www.songkick.com/artists/1"), timeout=1)
+
+        assert response.text == "0.2"
+        assert client.stats()["hedged"] == 1
+        # Only the response of the request itself
+        assert len(hedger.latencies) == 11
+        assert hedger.latencies[-1] >= 0.2
+
+    @pytest.mark.asyncio
+    async def test_no_hedging_over_budget(self) -> None:
+        requests: list[str] = []
+
+        async with AsyncRetryingClient(
+            name="songkick", hedger=warmed_up_hedger(budget=0.0), transport=stand_in_proxy(0.1, requests)
+        ) as client:
+            response = await client.get("https://www.songkick.com/artists/1")
+
+        assert response.text == "0.1"
+        assert len(requests) == 1
+        assert client.stats()["hedged"] == 0
@@ -0,0 +1,70 @@
+import os
+from pathlib import Path
+
+import httpx
+import pytest
+
+from web.events.http import AsyncRetryingClient
+from web.events.http_cache import HTTPCache
+
+PAGE = b"<html><body>Calendar</body></html>"
+
+
+def page_response(content: bytes = PAGE, etag: str = '"v1"') -> httpx.Response:
+    return httpx.Response(200, headers={"ETag": etag, "Content-Type": "text/html; charset=utf-8"}, content=content)
+
+
+class TestHTTPCache:
+    def test_put_and_get(self, tmp_path: Path) -> None:
+        cache = HTTPCache(tmp_path, max_bytes=1024 * 1024)
+
+        assert cache.get("https://www.songkick.com/artists/1") is None
+
+        cache.put("https://www.songkick.com/artists/1", page_response())
+        cache.put("https://www.songkick.com/artists/2", page_response())
+        cached = cache.get("https://www.songkick.com/artists/1")
+
+        assert cached is not None
+        assert cached.content == PAGE
+        assert cached.conditional_headers() == {"If-None-Match": '"v1"'}
+        # Identical bodies are stored once
+        assert len(list((tmp_path / "bodies").rglob("*"))) == 2  # Directory and body
+
+    def test_evicts_least_recently_used(self, tmp_path: Path) -> None:
+        cache = HTTPCache(tmp_path, max_bytes=1000)
+        urls = [f"https://www.bandsintown.com/a/{i}" for i in range(3)]
+
+        cache.put(urls[0], page_response(os.urandom(200)))
+        for path in tmp_path.rglob("*"):
+            os.utime(path, (0, 0))
+        cache.put(urls[1], page_response(os.urandom(200)))
+        cache.put(urls[2], page_response(os.urandom(200)))
+
+        assert cache.get(urls[0]) is None
+        assert cache.get(urls[1]) is not None
+        assert cache.get(urls[2]) is not None
+        assert cache.size_bytes is not None
+        assert cache.size_bytes <= 1000
+
+
+class TestAsyncRetryingClient:
+    @pytest.mark.asyncio
+    async def test_not_modified_is_a_hit(self, tmp_path: Path) -> None:
+        conditional_headers = []
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            conditional_headers.append(request.headers.get("If-None-Match"))
+            if request.headers.get("If-None-Match") == '"v1"':
+                return httpx.Response(304)
+            return page_response()
+
+        async with AsyncRetryingClient(
+            name="songkick",
+            http_cache=HTTPCache(tmp_path, max_bytes=1024 * 1024),
+            transport=httpx.MockTransport(handler),
+        ) as client:
+            responses = [await client.get("https://www.songkick.com/artists/1/calendar") for _ in range(2)]
+
+        assert conditional_headers == [None, '"v1"']
+        assert [response.status_code for response in responses] == [200, 200]
+        assert responses[1].text == PAGE.decode()
@@ -0,0 +1,56 @@
+import pytest
+
+from web.events.enums import ArtistNameMatchAccuracy
+from web.events.exceptions import HeuristicsException
+from web.events.matching import ArtistNameMatcher, get_name_variants
+
+SEARCH_RESULTS = [
+    ("1", "Björk Tribute Band"),
+    ("2", "Sigur Rós"),
+    ("3", "AC/DC"),
+    ("4", "Мумий Тролль"),
+    ("5", "Beyoncé"),
+    ("6", "Sigur Rós"),
+    ("7", "Radiohead Experience"),
+]
+
+
+class TestGetNameVariants:
+    def test_variants(self) -> None:
+        variants = get_name_variants("Sigur Rós!")
+
+        assert variants.casefolded == "sigur rós!"
+        assert variants.alnum == "sigurrós"
+        assert variants.transliterated == "sigur ros!"
+        assert variants.ascii == "sigur rs!"
+
+
+class TestArtistNameMatcher:
+    @pytest.mark.parametrize(
+        ("artist_name", "expected"),
+        [
+            ("sigur rós", ("2", ArtistNameMatchAccuracy.exact)),
+            ("ACDC", ("3", ArtistNameMatchAccuracy.exact_alnum)),
+        ],
+    )
+    def test_match_simple(self, artist_name: str, expected: tuple[str, ArtistNameMatchAccuracy]) -> None:
+        assert ArtistNameMatcher(SEARCH_RESULTS).match_simple(artist_name) == expected
+
+    def test_match_simple_not_found(self) -> None:
+        with pytest.raises(HeuristicsException):
+            ArtistNameMatcher(SEARCH_RESULTS).match_simple("Beyonce")
+
+    @pytest.mark.parametrize(
+        ("artist_name", "expected"),
+        [
+            ("sigur rós", ("2", ArtistNameMatchAccuracy.exact)),
+            ("Beyonce", ("5", ArtistNameMatchAccuracy.exact_ascii)),
+            ("Radiohead Experiences", ("7", ArtistNameMatchAccuracy.fuzzy)),
+        ],
+    )
+    def test_match_advanced(self, artist_name: str, expected: tuple[str, ArtistNameMatchAccuracy]) -> None:
+        assert ArtistNameMatcher(SEARCH_RESULTS).match_advanced(artist_name) == expected
+
+    def test_match_advanced_not_found(self) -> None:
+        with pytest.raises(HeuristicsException):
+            ArtistNameMatcher(SEARCH_RESULTS).match_advanced("Portishead")
@@ -1,35 +1,62 @@
+import asyncio
 import datetime
 import json
+import tarfile
+import tempfile
 import uuid
+from pathlib import Path
+from typing import Any
+from unittest.mock import patch
 
+import httpx
 import pytest
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.contrib.gis.geos import Point
-from django.db import IntegrityError
-from django.test import TestCase
+from django.core import mail
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from tekore import Token
 
+from urlshortener.models import ShortURL
 from web.events.data import Event as FetchedEvent
-from web.events.data import EventSourceArtist
+from web.events.data import (
+    EventSourceArtist,
+    MusicBrainzArtist,
+    find_artist_in_bandsintown,
+    resolve_redirect_urls,
+    shorten_event_urls,
+)
 from web.events.data import Venue as FetchedVenue
-from web.events.enums import ArtistNameMatchAccuracy, EventDataSource, EventType
+from web.events.enums import ArtistNameMatchAccuracy, EventDataSource, EventType, LookupType
+from web.events.exceptions import HTTPClientException, MusicBrainzException, SongkickException
+from web.events.http import HostConcurrencyLimiter, async_songkick_client
 from web.models import (
     Artist,
+    ArtistTrackingRun,
     Event,
     EventArtist,
+    EventRefreshRun,
     EventUpdate,
     EventUpdateChangesJSONDecoder,
     EventUpdateChangesJSONEncoder,
+    LookupCacheEntry,
+    MusicBrainzIndexEntry,
+    OutboxEmail,
     Playlist,
     PlaylistUpdate,
     PlaylistWatchConfig,
     SpotifyAuth,
     SpotifyUser,
     User,
+    UserEvent,
     decrypt_value,
     encrypt_value,
     generate_playlist_update_hash,
 )
+from web.tasks import atrack_artists_events
 
 pytestmark = pytest.mark.django_db
 
@@ -807,6 +834,123 @@ class TestEventArtist(TestCase):
         assert event_artist.songkick_name_match_accuracy == ArtistNameMatchAccuracy.exact
         assert event_artist.bandsintown_name_match_accuracy == ArtistNameMatchAccuracy.exact_alnum
 
+    async def test_due_for_refresh(self) -> None:
+        """Test that only due watched artists are refreshed, those with notified watchers first."""
+        now = datetime.datetime.now(tz=datetime.UTC)
+        spotify_user = await SpotifyUser.objects.acreate(spotify_id="user_due_for_refresh")
+        notified_spotify_user = await SpotifyUser.objects.acreate(spotify_id="user_due_for_refresh_notified")
+        await User.objects.acreate(spotify_user=spotify_user, event_notifications=False)
+        await User.objects.acreate(spotify_user=notified_spotify_user, event_notifications=True)
+
+        event_artists = []
+        for name, next_fetch_at in (
+            ("watched", None),
+            ("notified", now - datetime.timedelta(hours=1)),
+            ("not_due", now + datetime.timedelta(hours=1)),
+            ("unwatched", None),
+        ):
+            artist = await Artist.objects.acreate(spotify_id=f"artist_due_for_refresh_{name}")
+            event_artists.append(
+                await EventArtist.objects.acreate(
+                    artist=artist,
+                    songkick_name_match_accuracy=100,
+                    bandsintown_name_match_accuracy=95,
+                    next_fetch_at=next_fetch_at,
+                )
+            )
+        watched, notified, not_due, _ = event_artists
+        await watched.watching_users.aadd(spotify_user)
+        await notified.watching_users.aadd(notified_spotify_user)
+        await not_due.watching_users.aadd(notified_spotify_user)
+
+        assert [a.id async for a in EventArtist.due_for_refresh(budget=0)] == [notified.id, watched.id]
+        assert [a.id async for a in EventArtist.due_for_refresh(budget=1)] == [notified.id]
+
+    async def test_record_fetch(self) -> None:
+        """Test that fetches without changes are spaced out, and a change resets the interval."""
+        artist = await Artist.objects.acreate(spotify_id="artist_record_fetch")
+        event_artist = await EventArtist.objects.acreate(
+            artist=artist, songkick_name_match_accuracy=100, bandsintown_name_match_accuracy=95
+        )
+
+        with override_settings(EVENT_ARTIST_REFRESH_MIN_INTERVAL_HOURS=12, EVENT_ARTIST_REFRESH_MAX_INTERVAL_HOURS=36):
+            await event_artist.record_fetch(changed=False)
+            assert event_artist.next_fetch_at - event_artist.last_fetched_at == datetime.timedelta(hours=24)
+
+            await event_artist.record_fetch(changed=False)
+            assert event_artist.next_fetch_at - event_artist.last_fetched_at == datetime.timedelta(hours=36)
+
+            await event_artist.record_fetch(changed=True)
+            assert event_artist.unchanged_fetches == 0
+            assert event_artist.last_changed_at == event_artist.last_fetched_at
+            assert event_artist.next_fetch_at - event_artist.last_fetched_at == datetime.timedelta(hours=12)
+
+    async def test_failed_fetch_is_rescheduled(self) -> None:
+        """Test that an artist whose events fail to be fetched is not due again right away."""
+        artist = await Artist.objects.acreate(spotify_id="artist_failed_fetch")
+        event_artist = await EventArtist.objects.acreate(
+            artist=artist,
+            songkick_url="https://www.songkick.com/artists/failed_fetch",
+            songkick_name_match_accuracy=100,
+            bandsintown_name_match_accuracy=95,
+        )
+
+        with (
+            patch("web.events.data.asend_get_request", side_effect=HTTPClientException("Boom")),
+            pytest.raises(SongkickException),
+        ):
+            await event_artist.update_events()
+
+        await event_artist.arefresh_from_db()
+        assert event_artist.unchanged_fetches == 1
+        assert event_artist.next_fetch_at > datetime.datetime.now(tz=datetime.UTC)
+
+    async def test_load_known_events(self) -> None:
+        """Test loading a snapshot of upcoming events of event artists."""
+        artist = await Artist.objects.acreate(spotify_id="artist_load_known_events")
+        event_artist = await EventArtist.objects.acreate(
+            artist=artist,
+            musicbrainz_id=uuid.uuid4(),
+            songkick_name_match_accuracy=100,
+            bandsintown_name_match_accuracy=95,
+        )
+        today = datetime.datetime.now(tz=datetime.UTC).date()
+
+        await Event.objects.acreate(
+            artist=event_artist,
+            source="songkick",
+            source_url="https://www.songkick.com/concerts/known_with_urls",
+            type="concert",
+            date=today + datetime.timedelta(days=10),
+            tickets_urls=["https://tickets.example.com/1"],
+        )
+        await Event.objects.acreate(
+            artist=event_artist,
+            source="bandsintown",
+            source_url="https://www.bandsintown.com/e/known_without_urls",
+            type="concert",
+            date=today + datetime.timedelta(days=20),
+        )
+        await Event.objects.acreate(
+            artist=event_artist,
+            source="songkick",
+            source_url="https://www.songkick.com/concerts/known_past",
+            type="concert",
+            date=today - datetime.timedelta(days=10),
+        )
+
+        known_events = await EventArtist.load_known_events(EventArtist.objects.filter(id=event_artist.id))
+
+        assert set(known_events) == {event_artist.id}
+        artist_events = known_events[event_artist.id]
+        assert set(artist_events) == {
+            "https://www.songkick.com/concerts/known_with_urls",
+            "https://www.bandsintown.com/e/known_without_urls",
+        }
+        assert artist_events["https://www.songkick.com/concerts/known_with_urls"].has_urls is True
+        assert artist_events["https://www.songkick.com/concerts/known_with_urls"].source == EventDataSource.songkick
+        assert artist_events["https://www.bandsintown.com/e/known_without_urls"].has_urls is False
+
 
 @pytest.mark.asyncio
 class TestEvent(TestCase):
@@ -977,6 +1121,104 @@ class TestEvent(TestCase):
         assert fetched.venue is None
         assert fetched.stream_urls is not None
 
+    async def test_bulk_upsert_from_fetched_events(self) -> None:
+        """Test that bulk upsert creates, updates and skips events and records the matching EventUpdates."""
+        artist = await Artist.objects.acreate(spotify_id="artist_bulk_upsert")
+        event_artist = await EventArtist.objects.acreate(
+            artist=artist,
+            musicbrainz_id=uuid.uuid4(),
+            songkick_url="https://www.songkick.com/artists/bulk_upsert",
+            bandsintown_url="https://www.bandsintown.com/a/bulk_upsert",
+            songkick_name_match_accuracy=100,
+            bandsintown_name_match_accuracy=95,
+        )
+        date = datetime.datetime.now(tz=datetime.UTC).date() + datetime.timedelta(days=30)
+        venue = FetchedVenue(name="Bulk Venue", city="London", country="UK", geo_lat=51.5, geo_lon=-0.1)
+
+        unchanged = await Event.objects.acreate(
+            artist=event_artist,
+            source="songkick",
+            source_url="https://www.songkick.com/concerts/bulk_unchanged",
+            type="concert",
+            date=date,
+            venue="Bulk Venue",
+            city="London",
+            country="UK",
+            geolocation=Point(-0.1, 51.5, srid=settings.GEODJANGO_SRID),
+            stream_urls=[],
+            tickets_urls=["https://example.com/tickets"],
+        )
+        changed = await Event.objects.acreate(
+            artist=event_artist,
+            source="songkick",
+            source_url="https://www.songkick.com/concerts/bulk_changed",
+            type="concert",
+            date=date,
+            venue="Bulk Venue",
+            city="London",
+            country="UK",
+            geolocation=Point(-0.1, 51.5, srid=settings.GEODJANGO_SRID),
+            stream_urls=[],
+            tickets_urls=[],
+        )
+        await EventUpdate.objects.all().adelete()
+
+        fetched_events = [
+            FetchedEvent(
+                source=EventDataSource.songkick,
+                url=unchanged.source_url,
+                type=EventType.concert,
+                date=date,
+                venue=venue,
+                tickets_urls=["https://example.com/tickets"],
+                listing_hash="unchanged_hash",
+            ),
+            FetchedEvent(
+                source=EventDataSource.songkick,
+                url=changed.source_url,
+                type=EventType.concert,
+                date=date,
+                venue=venue,
+                tickets_urls=["https://example.com/new-tickets"],
+            ),
+            FetchedEvent(
+                source=EventDataSource.bandsintown,
+                url="https://www.bandsintown.com/e/bulk_new",
+                type=EventType.concert,
+                date=date,
+                venue=venue,
+                listing_hash="new_hash",
+            ),
+        ]
+
+        created_count, updated_count = await Event.bulk_upsert_from_fetched_events(fetched_events, event_artist)
+
+        assert (created_count, updated_count) == (1, 1)
+        assert await Event.objects.filter(artist=event_artist).acount() == 3
+
+        await changed.arefresh_from_db()
+        assert changed.tickets_urls == ["https://example.com/new-tickets"]
+
+        new_event = await Event.objects.aget(source_url="https://www.bandsintown.com/e/bulk_new")
+        assert new_event.geolocation is not None
+        assert new_event.geolocation.coords == (-0.1, 51.5)
+
+        assert not await unchanged.updates.aexists()
+        await unchanged.arefresh_from_db()
+        assert unchanged.listing_hash == "unchanged_hash"
+        assert unchanged.detail_checked_at is not None
+        assert new_event.listing_hash == "new_hash"
+        assert new_event.detail_checked_at is not None
+
+        changed_updates = [u async for u in changed.updates.all()]
+        assert len(changed_updates) == 1
+        assert changed_updates[0].type == EventUpdate.PARTIAL
+        assert changed_updates[0].changes == {"tickets_urls": {"old": [], "new": ["https://example.com/new-tickets"]}}
+
+        new_updates = [u async for u in new_event.updates.all()]
+        assert len(new_updates) == 1
+        assert new_updates[0].type == EventUpdate.FULL
+
 
 @pytest.mark.asyncio
 class TestPlaylist(TestCase):
@@ -1591,3 +1833,673 @@ class TestEventSignals(TestCase):
         assert "geolocation" in updates[0].changes
         assert "stream_urls" in updates[0].changes
         assert "tickets_urls" in updates[0].changes
+
+
+@pytest.mark.asyncio
+class TestOutboxEmail(TestCase):
+    async def test_enqueue_reuses_pending_email_with_same_message(self) -> None:
+        """Test that enqueueing the same message twice does not create a second pending email."""
+        first = await OutboxEmail.enqueue("outbox@example.com", "Subject", "<p>Hello</p>")
+        second = await OutboxEmail.enqueue("outbox@example.com", "Subject", "<p>Hello</p>")
+        other = await OutboxEmail.enqueue("outbox@example.com", "Subject", "<p>Bye</p>")
+
+        assert first.id == second.id
+        assert first.id != other.id
+        assert first.status == OutboxEmail.PENDING
+        assert await OutboxEmail.objects.acount() == 2
+
+    async def test_enqueue_reuses_email_being_sent(self) -> None:
+        """Test that a message is not enqueued again while the sender has claimed the same one."""
+        first = await OutboxEmail.enqueue("outbox@example.com", "Subject", "<p>Hello</p>")
+        assert await sync_to_async(first.claim)()
+
+        second = await OutboxEmail.enqueue("outbox@example.com", "Subject", "<p>Hello</p>")
+
+        assert first.id == second.id
+        assert second.status == OutboxEmail.SENDING
+
+    async def test_enqueue_tells_fields_apart(self) -> None:
+        """Test that messages whose fields only differ in where one ends and the next begins are different."""
+        first = await OutboxEmail.enqueue("outbox@example.com", "Subject", "<p>Hello</p>")
+        second = await OutboxEmail.enqueue("outbox@example.com", "Subject<p>", "Hello</p>")
+
+        assert first.id != second.id
+        assert first.message_hash != second.message_hash
+
+    async def test_send_pending_marks_updates_notified_of(self) -> None:
+        """Test that delivered emails are marked as sent and their updates as notified of."""
+        spotify_user = await SpotifyUser.objects.acreate(spotify_id="user_outbox_send", email="send@example.com")
+        playlist = await Playlist.objects.acreate(spotify_id="playlist_outbox_send", spotify_user=spotify_user)
+        watched = await Playlist.objects.acreate(spotify_id="watched_outbox_send")
+        update = await PlaylistUpdate.objects.acreate(
+            target_playlist=playlist, source_playlist=watched, tracks_added=["track1"]
+        )
+
+        email = await OutboxEmail.enqueue("send@example.com", "Subject", "<p>Updates</p>", playlist_updates=[update])
+
+        sent_count, failed_count = await sync_to_async(OutboxEmail.send_pending)()
+
+        assert (sent_count, failed_count) == (1, 0)
+        assert len(mail.outbox) == 1
+        assert mail.outbox[0].to == ["send@example.com"]
+
+        await email.arefresh_from_db()
+        await update.arefresh_from_db()
+        assert email.status == OutboxEmail.SENT
+        assert email.sent_at is not None
+        assert update.is_notified_of
+
+    @override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=2, EMAIL_OUTBOX_RETRY_BACKOFF_SECONDS=60)
+    async def test_send_pending_retries_with_backoff_then_gives_up(self) -> None:
+        """Test that failed emails are retried later and eventually marked as failed."""
+        spotify_user = await SpotifyUser.objects.acreate(spotify_id="user_outbox_fail", email="fail@example.com")
+        playlist = await Playlist.objects.acreate(spotify_id="playlist_outbox_fail", spotify_user=spotify_user)
+        watched = await Playlist.objects.acreate(spotify_id="watched_outbox_fail")
+        update = await PlaylistUpdate.objects.acreate(
+            target_playlist=playlist, source_playlist=watched, tracks_added=["track1"]
+        )
+        email = await OutboxEmail.enqueue("fail@example.com", "Subject", "<p>Fail</p>", playlist_updates=[update])
+
+        with patch("django.core.mail.backends.locmem.EmailBackend.send_messages", side_effect=ConnectionError("Boom")):
+            sent_count, failed_count = await sync_to_async(OutboxEmail.send_pending)()
+
+            assert (sent_count, failed_count) == (0, 1)
+            await email.arefresh_from_db()
+            assert email.status == OutboxEmail.PENDING
+            assert email.attempts == 1
+            assert email.next_attempt_at > datetime.datetime.now(tz=datetime.UTC)
+            assert email.last_error == "ConnectionError: Boom"
+
+            # Not due yet
+            assert await sync_to_async(OutboxEmail.send_pending)() == (0, 0)
+
+            email.next_attempt_at = datetime.datetime.now(tz=datetime.UTC)
+            await email.asave()
+            await sync_to_async(OutboxEmail.send_pending)()
+
+        await email.arefresh_from_db()
+        await update.arefresh_from_db()
+        assert email.status == OutboxEmail.FAILED
+        assert email.attempts == 2
+        assert not update.is_notified_of
+
+    async def test_claimed_email_is_sent_once(self) -> None:
+        """Test that an email claimed by one sender is not sent by another until the claim expires."""
+        email = await OutboxEmail.enqueue("claim@example.com", "Subject", "<p>Claim</p>")
+
+        assert await sync_to_async(email.claim)()
+        # Another sender that loaded the email before it was claimed
+        other = await OutboxEmail.objects.aget(id=email.id)
+        assert not await sync_to_async(other.claim)()
+        assert await sync_to_async(OutboxEmail.send_pending)() == (0, 0)
+        assert len(mail.outbox) == 0
+
+        # The first sender did not finish in time
+        await OutboxEmail.objects.filter(id=email.id).aupdate(next_attempt_at=datetime.datetime.now(tz=datetime.UTC))
+        assert await sync_to_async(OutboxEmail.send_pending)() == (1, 0)
+        assert len(mail.outbox) == 1
+
+
+@pytest.mark.asyncio
+class TestEventRefreshRun(TestCase):
+    async def test_finish(self) -> None:
+        """Test filling the run report from aggregates and request counters."""
+        artist = await Artist.objects.acreate(spotify_id="artist_refresh_run")
+        event_artist = await EventArtist.objects.acreate(
+            artist=artist,
+            musicbrainz_id=uuid.uuid4(),
+            songkick_name_match_accuracy=100,
+            bandsintown_name_match_accuracy=95,
+        )
+        other_artist = await Artist.objects.acreate(spotify_id="artist_refresh_run_other")
+        other_event_artist = await EventArtist.objects.acreate(
+            artist=other_artist,
+            musicbrainz_id=uuid.uuid4(),
+            songkick_name_match_accuracy=100,
+            bandsintown_name_match_accuracy=95,
+        )
+        date = datetime.datetime.now(tz=datetime.UTC).date() + datetime.timedelta(days=10)
+
+        run = EventRefreshRun(started_at=datetime.datetime.now(tz=datetime.UTC), num_artists=1)
+        request_stats_before = EventRefreshRun.request_stats()
+
+        with patch.object(async_songkick_client, "send_hedged", return_value=httpx.Response(200)):
+            for i in range(3):
+                await async_songkick_client.get(f"https://www.songkick.com/artists/refresh_run_{i}")
+
+        await Event.objects.acreate(
+            artist=event_artist,
+            source="songkick",
+            source_url="https://www.songkick.com/concerts/refresh_run_1",
+            type="concert",
+            date=date,
+            tickets_urls=["https://tickets.example.com/1", "https://tickets.example.com/2"],
+            stream_urls=["https://stream.example.com/1"],
+        )
+        await Event.objects.acreate(
+            artist=event_artist,
+            source="songkick",
+            source_url="https://www.songkick.com/concerts/refresh_run_2",
+            type="concert",
+            date=date,
+        )
+        await Event.objects.acreate(
+            artist=other_event_artist,
+            source="songkick",
+            source_url="https://www.songkick.com/concerts/refresh_run_other",
+            type="concert",
+            date=date,
+            tickets_urls=["https://tickets.example.com/3"],
+        )
+        await run.finish(EventArtist.objects.filter(id=event_artist.id), request_stats_before)
+        await run.arefresh_from_db()
+
+        assert run.num_events == 2
+        assert run.num_event_urls == 3
+        assert run.requests["songkick"]["total"] == 3
+        assert run.requests["songkick"]["accepted"] == 3
+        assert run.requests["bandsintown"]["total"] == 0
+        assert run.finished_at is not None
+        assert run.duration_seconds is not None
+
+
+@pytest.mark.asyncio
+class TestArtistTrackingRun(TestCase):
+    async def test_track_artists_events(self) -> None:
+        """Test that only new artists are looked up in the event sources, in the order of priority."""
+        spotify_user = await SpotifyUser.objects.acreate(spotify_id="user_tracking_run")
+        user = await User.objects.acreate(spotify_user=spotify_user)
+        other_spotify_user = await SpotifyUser.objects.acreate(spotify_id="user_tracking_run_other")
+        known_artist = await Artist.objects.acreate(spotify_id="artist_tracking_run_known")
+        known_event_artist = await EventArtist.objects.acreate(
+            artist=known_artist, songkick_name_match_accuracy=100, bandsintown_name_match_accuracy=100
+        )
+        await known_event_artist.watching_users.aadd(other_spotify_user)
+        known_event = await Event.objects.acreate(
+            artist=known_event_artist,
+            source="songkick",
+            source_url="https://www.songkick.com/concerts/tracking_run",
+            type="concert",
+            date=datetime.datetime.now(tz=datetime.UTC).date() + datetime.timedelta(days=10),
+        )
+        # An artist without an EventArtist, e.g. from a playlist
+        await Artist.objects.acreate(spotify_id="artist_tracking_run_new")
+
+        looked_up = []
+
+        async def find_event_data_sources(artist_spotify_id: str, artist_name: str) -> tuple[None, EventSourceArtist]:
+            looked_up.append(artist_spotify_id)
+            if artist_spotify_id == "artist_tracking_run_failed":
+                raise MusicBrainzException("Lookup failed")
+            return None, EventSourceArtist(
+                name=artist_name,
+                songkick_url="https://www.songkick.com/artists/tracking_run",
+                bandsintown_url=None,
+                songkick_match_accuracy=ArtistNameMatchAccuracy.exact,
+                bandsintown_match_accuracy=ArtistNameMatchAccuracy.no_match,
+                events=[],
+            )
+
+        with patch("web.tasks.find_event_data_sources", side_effect=find_event_data_sources):
+            await atrack_artists_events(
+                {
+                    "artist_tracking_run_failed": "Failed Artist",
+                    "artist_tracking_run_known": "Known Artist",
+                    "artist_tracking_run_new": "New Artist",
+                    "artist_tracking_run_empty": "",
+                },
+                str(spotify_user.id),
+                concurrent_execution=False,
+            )
+
+        assert looked_up == ["artist_tracking_run_failed", "artist_tracking_run_new"]
+
+        watchers = {user.spotify_id async for user in known_event_artist.watching_users.all()}
+        assert watchers == {"user_tracking_run", "user_tracking_run_other"}
+        # The user has no location, so every upcoming event of the artists they now watch is relevant
+        assert await UserEvent.objects.filter(user=user, event=known_event).aexists()
+        new_event_artist = await EventArtist.objects.aget(artist__spotify_id="artist_tracking_run_new")
+        assert new_event_artist.songkick_url == "https://www.songkick.com/artists/tracking_run"
+        assert [user.id async for user in new_event_artist.watching_users.all()] == [spotify_user.id]
+        assert await Artist.objects.filter(spotify_id="artist_tracking_run_failed").aexists()
+        assert not await Artist.objects.filter(spotify_id="artist_tracking_run_empty").aexists()
+
+        run = await ArtistTrackingRun.objects.aget(spotify_user=spotify_user)
+        assert run.num_artists == 3
+        assert run.num_artists_known == 1
+        assert run.num_artists_succeeded == 1
+        assert run.num_artists_failed == 1
+        assert run.num_artists_processed == run.num_artists
+        assert run.finished_at is not None
+
+    async def test_record_saves_progress_in_batches(self) -> None:
+        """Test that progress is saved once enough artists have been recorded, and in full when the run finishes."""
+        spotify_user = await SpotifyUser.objects.acreate(spotify_id="user_tracking_run_batches")
+        run = await ArtistTrackingRun.objects.acreate(
+            spotify_user=spotify_user, started_at=datetime.datetime.now(tz=datetime.UTC), num_artists=4
+        )
+
+        async def saved_num_artists_processed() -> int:
+            saved_run = await ArtistTrackingRun.objects.aget(id=run.id)
+            return saved_run.num_artists_processed
+
+        with override_settings(
+            ARTIST_TRACKING_PROGRESS_SAVE_INTERVAL_ARTISTS=2, ARTIST_TRACKING_PROGRESS_SAVE_INTERVAL_SECONDS=3600
+        ):
+            # The first outcome is saved right away, the following ones in batches of 2
+            await run.record(succeeded=True)
+            assert await saved_num_artists_processed() == 1
+            await run.record(succeeded=False)
+            assert await saved_num_artists_processed() == 1
+            await run.record(succeeded=True)
+            assert await saved_num_artists_processed() == 3
+            await run.record(succeeded=True)
+            assert await saved_num_artists_processed() == 3
+
+        await run.finish()
+        assert await saved_num_artists_processed() == 4
+
+
+@pytest.mark.asyncio
+class TestUserEvent(TestCase):
+    async def create_user_and_event(self) -> None:
+        spotify_user = await SpotifyUser.objects.acreate(
+            spotify_id="user_user_event", display_name="User Event User", email="userevent@example.com"
+        )
+        self.user = await User.objects.acreate(
+            spotify_user=spotify_user,
+            location=Point(-0.1, 51.5, srid=settings.GEODJANGO_SRID),  # London
+            event_distance_threshold=50,
+        )
+        artist = await Artist.objects.acreate(spotify_id="artist_user_event")
+        self.event_artist = await EventArtist.objects.acreate(
+            artist=artist,
+            musicbrainz_id=uuid.uuid4(),
+            songkick_name_match_accuracy=100,
+            bandsintown_name_match_accuracy=95,
+        )
+        await self.event_artist.watching_users.aadd(spotify_user)
+        self.event = await Event.objects.acreate(
+            artist=self.event_artist,
+            source="songkick",
+            source_url="https://www.songkick.com/concerts/user_event",
+            type="concert",
+            date=datetime.datetime.now(tz=datetime.UTC).date() + datetime.timedelta(days=10),
+            geolocation=Point(-2.2, 53.5, srid=settings.GEODJANGO_SRID),  # Manchester
+        )
+
+    async def relevant_event_ids(self) -> list[uuid.UUID]:
+        return [e.id async for e in self.user.upcoming_events_query()]
+
+    async def test_event_moved_nearby(self) -> None:
+        """Test that an event becomes relevant once it is moved within the user's radius."""
+        await self.create_user_and_event()
+
+        assert await self.relevant_event_ids() == []
+
+        self.event.geolocation = Point(-0.2, 51.4, srid=settings.GEODJANGO_SRID)
+        await self.event.asave()
+
+        assert await self.relevant_event_ids() == [self.event.id]
+
+    async def test_user_radius_changed(self) -> None:
+        """Test that events are re-evaluated when the user changes their radius."""
+        await self.create_user_and_event()
+
+        self.user.event_distance_threshold = 300
+        await self.user.asave()
+
+        assert await self.relevant_event_ids() == [self.event.id]
+
+        self.user.event_distance_threshold = 50
+        await self.user.asave()
+
+        assert await self.relevant_event_ids() == []
+
+    async def test_watching_changed(self) -> None:
+        """Test that events are re-evaluated when the user starts or stops watching an artist."""
+        await self.create_user_and_event()
+
+        self.user.location = None
+        await self.user.asave()
+
+        assert await self.relevant_event_ids() == [self.event.id]
+
+        spotify_user = await sync_to_async(lambda: self.user.spotify_user)()
+        await self.event_artist.watching_users.aremove(spotify_user)
+
+        assert await self.relevant_event_ids() == []
+
+        await spotify_user.watched_event_artists.aadd(self.event_artist)
+
+        assert await self.relevant_event_ids() == [self.event.id]
+
+    async def test_refresh_for_events(self) -> None:
+        """Test refreshing the relevance of a batch of events with a fixed number of queries."""
+        await self.create_user_and_event()
+        other_spotify_user = await SpotifyUser.objects.acreate(spotify_id="user_user_event_anywhere")
+        # Without a location
+        anywhere_user = await User.objects.acreate(spotify_user=other_spotify_user)
+        await self.event_artist.watching_users.aadd(other_spotify_user)
+
+        date = datetime.datetime.now(tz=datetime.UTC).date() + datetime.timedelta(days=10)
+        events = [
+            self.event,
+            await Event.objects.acreate(
+                artist=self.event_artist,
+                source="songkick",
+                source_url="https://www.songkick.com/concerts/user_event_nearby",
+                type="concert",
+                date=date,
+                geolocation=Point(-0.2, 51.4, srid=settings.GEODJANGO_SRID),
+            ),
+            await Event.objects.acreate(
+                artist=self.event_artist,
+                source="songkick",
+                source_url="https://www.songkick.com/live-streams/user_event_stream",
+                type="live_stream",
+                date=date,
+            ),
+        ]
+        await UserEvent.objects.all().adelete()
+
+        def refresh() -> int:
+            with CaptureQueriesContext(connection) as queries:
+                UserEvent.refresh_for_events(events)
+            return len(queries)
+
+        # Watchers, distances, delete and insert, plus the savepoint of the transaction
+        assert await sync_to_async(refresh)() == 6
+
+        user_events = {(user_event.user_id, user_event.event_id) async for user_event in UserEvent.objects.all()}
+        assert user_events == {
+            (anywhere_user.id, events[0].id),
+            (anywhere_user.id, events[1].id),
+            (anywhere_user.id, events[2].id),
+            (self.user.id, events[1].id),
+            (self.user.id, events[2].id),
+        }
+
+
+@pytest.mark.asyncio
+class TestLookupCacheEntry(TestCase):
+    async def test_get_and_set_value(self) -> None:
+        """Test caching found and not found lookups with their TTLs."""
+        assert await LookupCacheEntry.get_value(LookupType.musicbrainz_url, "https://example.com/a") == (False, None)
+
+        await LookupCacheEntry.set_value(LookupType.musicbrainz_url, "https://example.com/a", "artist-id")
+        await LookupCacheEntry.set_value(LookupType.musicbrainz_url, "https://example.com/b", None)
+
+        assert await LookupCacheEntry.get_value(LookupType.musicbrainz_url, "https://example.com/a") == (
+            True,
+            "artist-id",
+        )
+        assert await LookupCacheEntry.get_value(LookupType.musicbrainz_url, "https://example.com/b") == (True, None)
+        assert await LookupCacheEntry.get_value(LookupType.redirect, "https://example.com/a") == (False, None)
+
+        found = await LookupCacheEntry.objects.aget(key="https://example.com/a")
+        not_found = await LookupCacheEntry.objects.aget(key="https://example.com/b")
+        assert (found.expires_at - not_found.expires_at).days == (
+            settings.LOOKUP_CACHE_TTL_DAYS - settings.LOOKUP_CACHE_NEGATIVE_TTL_DAYS - 1
+        )
+
+        not_found.expires_at = datetime.datetime.now(tz=datetime.UTC)
+        await not_found.asave()
+
+        assert await LookupCacheEntry.get_value(LookupType.musicbrainz_url, "https://example.com/b") == (False, None)
+        assert await LookupCacheEntry.purge_expired() == 1
+        assert await LookupCacheEntry.objects.acount() == 1
+
+    async def test_musicbrainz_artist_from_cache(self) -> None:
+        """Test that MusicBrainz lookups and redirects are only requested once."""
+        artist_id = str(uuid.uuid4())
+        responses = {
+            "url": ({"relations": [{"artist": {"id": artist_id}}]}, None, None, None),
+            f"artist/{artist_id}": (
+                {
+                    "name": "Artist",
+                    "aliases": [{"name": "Alias", "primary": True}, {"name": "Other", "primary": False}],
+                    "relations": [
+                        {"type": "songkick", "url": {"resource": "https://www.songkick.com/artists/1"}},
+                        {"type": "bandsintown", "url": {"resource": "https://www.bandsintown.com/a/1"}},
+                    ],
+                },
+                None,
+                None,
+                None,
+            ),
+            "https://www.songkick.com/artists/1": (None, None, "https://www.songkick.com/artists/1-artist", None),
+            "https://www.bandsintown.com/a/1": (None, None, None, None),
+        }
+        requested_urls = []
+
+        async def send_get_request(_: object, url: str, **__: object) -> tuple:
+            requested_urls.append(url)
+            return responses[url]
+
+        with patch("web.events.data.asend_get_request", side_effect=send_get_request):
+            for _ in range(2):
+                artist = await MusicBrainzArtist.find_by_spotify_url("https://open.spotify.com/artist/cached")
+
+                assert artist is not None
+                assert artist.id == artist_id
+                assert artist.names == ["Artist", "Alias"]
+                assert artist.songkick_url == "https://www.songkick.com/artists/1-artist"
+                assert artist.bandsintown_url is None
+
+        assert requested_urls == list(responses)
+
+    async def test_musicbrainz_url_lookups_are_batched(self) -> None:
+        """Test that URL lookups of concurrently found artists share a MusicBrainz request."""
+        artist_ids = [str(uuid.uuid4()) for _ in range(2)]
+        urls = [f"https://open.spotify.com/artist/batched_{i}" for i in range(3)]
+        requests = []
+
+        async def send_get_request(_: object, url: str, params: dict[str, Any], **__: object) -> tuple:
+            requests.append((url, params))
+            if url == "url":
+                urls_data = [
+                    {"resource": urls[0], "relations": [{"artist": {"id": artist_ids[0]}}]},
+                    {"resource": urls[1], "relations": [{"artist": {"id": artist_ids[1]}}]},
+                ]
+                return {"url-count": 2, "urls": urls_data}, None, None, None
+            return {"name": url, "aliases": [], "relations": []}, None, None, None
+
+        with patch("web.events.data.asend_get_request", side_effect=send_get_request):
+            results = await asyncio.gather(
+                *[MusicBrainzArtist.find_by_spotify_url(url) for url in urls], return_exceptions=True
+            )
+
+        assert [r.id for r in results[:2]] == artist_ids  # type: ignore[union-attr]
+        assert isinstance(results[2], MusicBrainzException)
+        assert requests[0] == ("url", {"resource": urls, "inc": "artist-rels"})
+        assert [url for url, _ in requests[1:]] == [f"artist/{artist_id}" for artist_id in artist_ids]
+        assert await LookupCacheEntry.get_value(LookupType.musicbrainz_url, urls[2]) == (True, None)
+
+    async def test_negative_ttl_grows(self) -> None:
+        """Test that consecutive negative results are re-checked less and less often."""
+        key = "https://example.com/missing"
+        ttls = []
+
+        for _ in range(3):
+            await LookupCacheEntry.set_value(LookupType.musicbrainz_url, key, None)
+            entry = await LookupCacheEntry.objects.aget(key=key)
+            ttls.append(round((entry.expires_at - datetime.datetime.now(tz=datetime.UTC)).total_seconds() / 86400))
+
+        negative_ttl_days = settings.LOOKUP_CACHE_NEGATIVE_TTL_DAYS
+        assert ttls == [negative_ttl_days, negative_ttl_days * 2, negative_ttl_days * 4]
+        assert entry.num_misses == 3
+
+        await LookupCacheEntry.set_value(LookupType.musicbrainz_url, key, "artist-id")
+        entry = await LookupCacheEntry.objects.aget(key=key)
+        assert entry.num_misses == 0
+
+    async def test_artist_search_from_cache(self) -> None:
+        """Test that artist searches are cached per casefolded query, including those that found nothing."""
+        search_results = {
+            "searchSuggestions?searchTerm=Sigur Ros": {"artists": [{"id": 1, "name": "Sigur Rós"}]},
+            "searchSuggestions?searchTerm=Nobody": {"artists": []},
+        }
+        requested_urls = []
+
+        async def send_get_request(_: object, url: str, **__: object) -> tuple:
+            requested_urls.append(url)
+            return search_results[url], None, None, None
+
+        with patch("web.events.data.asend_get_request", side_effect=send_get_request):
+            assert await find_artist_in_bandsintown("Sigur Ros") == (None, ArtistNameMatchAccuracy.no_match)
+            assert await find_artist_in_bandsintown("sigur ros", use_advanced_heuristics=True) == (
+                "1",
+                ArtistNameMatchAccuracy.exact_ascii,
+            )
+            assert await find_artist_in_bandsintown("Nobody") == (None, ArtistNameMatchAccuracy.no_match)
+            assert await find_artist_in_bandsintown("Nobody") == (None, ArtistNameMatchAccuracy.no_match)
+
+        assert requested_urls == list(search_results)
+
+        entry = await LookupCacheEntry.objects.aget(type=LookupType.bandsintown_artist_search, key="nobody")
+        no_match = [None, ArtistNameMatchAccuracy.no_match]
+        assert entry.value == {"artists": [], "matches": {"simple": no_match, "advanced": no_match}}
+        assert entry.num_misses == 1
+
+
+MUSICBRAINZ_ARTIST_DUMP = Path(__file__).parent / "fixtures" / "musicbrainz_artist_dump.jsonl"
+
+
+@pytest.mark.asyncio
+class TestMusicBrainzIndexEntry(TestCase):
+    async def test_import_dump(self) -> None:
+        """Test importing a MusicBrainz artist dump archive and then an update of a changed artist."""
+        with tempfile.TemporaryDirectory() as directory:
+            archive_path = Path(directory) / "artist.tar.xz"
+            with tarfile.open(archive_path, "w:xz") as archive:
+                archive.add(MUSICBRAINZ_ARTIST_DUMP, arcname="mbdump/artist")
+
+            await sync_to_async(call_command)("import_musicbrainz_dump", str(archive_path), "--full")
+
+            entries = {e.spotify_url: e async for e in MusicBrainzIndexEntry.objects.all()}
+            assert set(entries) == {
+                "https://open.spotify.com/artist/6XyY86QOPPrYVGvF9ch6wz",
+                "https://open.spotify.com/artist/0gmmrJHR5ApC7eIe6nKLCX",
+                "https://open.spotify.com/artist/4sHTkvq0BkQeMvHq3nkNXj",
+            }
+            linkin_park = entries["https://open.spotify.com/artist/6XyY86QOPPrYVGvF9ch6wz"]
+            assert linkin_park.name == "Linkin Park"
+            assert linkin_park.primary_aliases == ["Linkin Park"]
+            assert linkin_park.songkick_url == "https://www.songkick.com/artists/148307"
+            assert linkin_park.bandsintown_url == "https://www.bandsintown.com/a/3393"
+
+            # The artist lost one of its Spotify URLs
+            artist = json.loads(MUSICBRAINZ_ARTIST_DUMP.read_text().splitlines()[1])
+            artist["relations"] = artist["relations"][:1]
+            update_path = Path(directory) / "update.jsonl"
+            update_path.write_text(json.dumps(artist))
+
+            await sync_to_async(call_command)("import_musicbrainz_dump", str(update_path))
+
+        assert [e.spotify_url async for e in MusicBrainzIndexEntry.objects.order_by("spotify_url")] == [
+            "https://open.spotify.com/artist/0gmmrJHR5ApC7eIe6nKLCX",
+            "https://open.spotify.com/artist/6XyY86QOPPrYVGvF9ch6wz",
+        ]
+
+    async def test_find_in_index(self) -> None:
+        """Test that artists in the index are found without MusicBrainz requests."""
+        artists = [json.loads(line) for line in MUSICBRAINZ_ARTIST_DUMP.read_text().splitlines()]
+        await sync_to_async(MusicBrainzIndexEntry.import_artists)(artists)
+
+        with patch("web.events.data.asend_get_request", side_effect=AssertionError("No requests expected")):
+            artist = await MusicBrainzArtist.find("4sHTkvq0BkQeMvHq3nkNXj", "Mumiy Troll")
+
+        assert artist is not None
+        assert artist.id == "9c9f1380-2516-4fc9-a3e6-f9f61941d090"
+        assert artist.names == ["Мумий Тролль", "Mumiy Troll"]
+        assert artist.songkick_url is None
+
+
+@pytest.mark.asyncio
+class TestShortURL(TestCase):
+    async def test_shorten_many(self) -> None:
+        """Test shortening URLs in bulk, in order and with duplicates."""
+        existing = await ShortURL.shorten("https://tickets.example.com/existing")
+
+        short_urls, num_created = await ShortURL.shorten_many(
+            [
+                "https://tickets.example.com/new",
+                "https://tickets.example.com/existing",
+                "https://tickets.example.com/new",
+            ]
+        )
+
+        assert [s.url for s in short_urls] == [
+            "https://tickets.example.com/new",
+            "https://tickets.example.com/existing",
+            "https://tickets.example.com/new",
+        ]
+        assert short_urls[1].id == existing.id
+        assert short_urls[0].id == short_urls[2].id
+        assert short_urls[0].hash
+        assert num_created == 1
+        assert await ShortURL.objects.acount() == 2
+
+        # Served from the process-level cache from now on
+        with patch.object(ShortURL.objects, "filter", side_effect=AssertionError("Not cached")):
+            assert await ShortURL.shorten_many(["https://tickets.example.com/new"]) == ([short_urls[0]], 0)
+
+    async def test_shorten_event_urls(self) -> None:
+        """Test that the URLs of a batch of events are shortened together."""
+        events = [
+            FetchedEvent(
+                source=EventDataSource.bandsintown,
+                url=f"https://www.bandsintown.com/e/{i}",
+                type=EventType.concert,
+                date=datetime.date(2030, 1, 1),
+                tickets_urls=["https://tickets.example.com/vendor", f"https://tickets.example.com/{i}"],
+            )
+            for i in range(3)
+        ]
+
+        with patch.object(ShortURL, "shorten_many", wraps=ShortURL.shorten_many) as shorten_many:
+            num_created = await shorten_event_urls(events)
+
+        shorten_many.assert_called_once()
+        assert num_created == 4
+        short_urls = {short_url.url: short_url async for short_url in ShortURL.objects.all()}
+        assert len(short_urls) == 4
+        for i, event in enumerate(events):
+            assert event.tickets_urls == [
+                short_urls["https://tickets.example.com/vendor"].full_short_url,
+                short_urls[f"https://tickets.example.com/{i}"].full_short_url,
+            ]
+
+
+@pytest.mark.asyncio
+class TestRedirectResolution(TestCase):
+    async def test_resolve_redirect_urls(self) -> None:
+        """Test that redirects are resolved with limited concurrency per host, and only once."""
+        in_flight = 0
+        max_in_flight = 0
+        requested_urls = []
+
+        async def send_get_request(_: object, url: str, **__: object) -> tuple:
+            nonlocal in_flight, max_in_flight
+            requested_urls.append(url)
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            if url.endswith("fail"):
+                raise HTTPClientException("Boom")
+            return None, None, f"https://vendor.example.com/{url.rsplit('/', 1)[-1]}", None
+
+        urls = [f"tickets/{i}" for i in range(6)] + ["tickets/fail"]
+
+        with (
+            patch("web.events.data.asend_get_request", side_effect=send_get_request),
+            patch("web.events.data.redirect_resolution_limiter", HostConcurrencyLimiter(2)),
+        ):
+            resolved = await resolve_redirect_urls(async_songkick_client, urls)
+            assert await resolve_redirect_urls(async_songkick_client, urls[:6]) == resolved
+
+        assert resolved == [f"https://vendor.example.com/{i}" for i in range(6)]
+        assert max_in_flight == 2
+        assert sorted(requested_urls) == sorted(urls)
@@ -0,0 +1,45 @@
+import datetime
+import uuid
+
+from web.events.enums import EventType
+from web.models import Event, EventArtist, EventUpdate, SpotifyUser, User
+from web.notifications import fan_out_event_updates
+
+
+def make_user() -> User:
+    return User(spotify_user=SpotifyUser(id=uuid.uuid4()))
+
+
+def make_update(event_artist: EventArtist) -> EventUpdate:
+    event = Event(artist=event_artist, type=EventType.concert, date=datetime.datetime.now(tz=datetime.UTC).date())
+    return EventUpdate(event=event, type=EventUpdate.FULL)
+
+
+class TestFanOutEventUpdates:
+    def test_groups_relevant_updates_by_user_and_artist(self) -> None:
+        artist1 = EventArtist(id=uuid.uuid4())
+        artist2 = EventArtist(id=uuid.uuid4())
+        user1 = make_user()
+        user2 = make_user()
+
+        update1 = make_update(artist1)
+        update2 = make_update(artist2)
+        update3 = make_update(artist1)
+        irrelevant = make_update(artist1)
+
+        relevant_user_ids = {
+            update1.event.id: [user1.id],
+            update2.event.id: [user1.id, user2.id],
+            update3.event.id: [user1.id],
+        }
+
+        fan_out = fan_out_event_updates(
+            {user1.id: user1, user2.id: user2}, [update1, update2, update3, irrelevant], relevant_user_ids
+        )
+
+        assert fan_out == {user1: {artist1: [update1, update3], artist2: [update2]}, user2: {artist2: [update2]}}
+
+    def test_users_that_cannot_be_notified_are_left_out(self) -> None:
+        update = make_update(EventArtist(id=uuid.uuid4()))
+
+        assert fan_out_event_updates({}, [update], {update.event.id: [uuid.uuid4()]}) == {}
@@ -1,12 +1,21 @@
+import asyncio
 import copy
 import json
 import os
 from base64 import b64encode
+from datetime import UTC, datetime, timedelta
 
+import country_converter as coco
 import pytest
 from django.conf import settings
 from django.contrib.gis.geos import Point
+from django.test import override_settings
 
+from web.events.countries import convert_country_name, get_country_data
+from web.events.data import KnownEvent, find_artist_by_names
+from web.events.enums import ArtistNameMatchAccuracy, EventDataSource
+from web.events.exceptions import BandsintownException
+from web.events.utils import get_listing_hash, should_fetch_event
 from web.images import calculate_base64_size
 from web.models import EventUpdateChangesJSONDecoder, EventUpdateChangesJSONEncoder
 
@@ -40,3 +49,78 @@ def test_custom_json_encoder_decoder() -> None:
     as_object_normalized["geolocation"]["new"] = list(as_object_normalized["geolocation"]["new"].coords)
 
     assert as_object_normalized == data_normalized
+
+
+@pytest.mark.parametrize(
+    "country_name",
+    [
+        "UK", "uk", "GB", "US", "USA", "usa", "United States", "England", "Great Britain", "The Netherlands",
+        "Deutschland", "Côte d'Ivoire", "Korea", "Congo", "Niger", "Guinea", "826", "0826", "NA", "EL", "afg",
+        "Asia excluding China", "Unknown", "", "X",
+    ],
+)  # fmt: skip
+def test_convert_country_name(country_name: str) -> None:
+    expected = coco.CountryConverter().convert(country_name, to="name_short", not_found=None)
+
+    convert_country_name.cache_clear()
+    assert convert_country_name(country_name) == expected
+
+    # Without the precomputed names, the conversion rules are applied
+    country_names = get_country_data()["country_names"]
+    get_country_data()["country_names"] = {}
+    try:
+        convert_country_name.cache_clear()
+        assert convert_country_name(country_name) == expected
+    finally:
+        get_country_data()["country_names"] = country_names
+        convert_country_name.cache_clear()
+
+
+def test_should_fetch_event() -> None:
+    url = "https://www.bandsintown.com/e/1"
+    source = EventDataSource.bandsintown
+    event_data = {"url": f"{url}?came_from=257", "startDate": "2026-10-19T20:00:00", "location": {"name": "Venue"}}
+    listing_hash = get_listing_hash(event_data)
+    now = datetime.now(tz=UTC)
+    event_date = (now + timedelta(days=50)).date()
+
+    def known(*, has_urls: bool, checked_days_ago: int | None, hash: str = listing_hash) -> dict[str, KnownEvent]:  # noqa: A002
+        checked_at = None if checked_days_ago is None else now - timedelta(days=checked_days_ago)
+        return {url: KnownEvent(source, url, event_date, has_urls, hash, checked_at)}
+
+    # The tracking query of the URL is not part of the listing
+    assert get_listing_hash({**event_data, "url": f"{url}?came_from=1"}) == listing_hash
+
+    assert should_fetch_event(url, source, event_data, {})
+    assert should_fetch_event(url, source, event_data, known(has_urls=True, checked_days_ago=0, hash="old_hash"))
+    assert not should_fetch_event(url, source, event_data, known(has_urls=True, checked_days_ago=30))
+    # Without URLs, re-checked after 10% of the time until the event
+    assert not should_fetch_event(url, source, event_data, known(has_urls=False, checked_days_ago=4))
+    assert should_fetch_event(url, source, event_data, known(has_urls=False, checked_days_ago=6))
+    assert should_fetch_event(url, source, event_data, known(has_urls=False, checked_days_ago=None))
+
+
+@pytest.mark.asyncio
+@override_settings(EVENT_ARTIST_ALIAS_SEARCH_CONCURRENCY=4)
+async def test_find_artist_by_names() -> None:
+    delays = {"first": 0.05, "failing": 0, "second": 0.1, "third": 0, "fourth": 5}
+    cancelled = []
+
+    async def find(name: str) -> tuple[str | None, ArtistNameMatchAccuracy]:
+        try:
+            await asyncio.sleep(delays[name])
+        except asyncio.CancelledError:
+            cancelled.append(name)
+            raise
+
+        if name == "failing":
+            raise BandsintownException("Search failed")
+        if name == "first":
+            return None, ArtistNameMatchAccuracy.no_match
+        return name, ArtistNameMatchAccuracy.exact
+
+    match = await asyncio.wait_for(find_artist_by_names("Bandsintown", list(delays), find, BandsintownException), 1)
+
+    # The first name that finds the artist wins, even though a later one found it sooner
+    assert match == ("second", ArtistNameMatchAccuracy.exact)
+    assert cancelled == ["fourth"]
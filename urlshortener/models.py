@@ -1,5 +1,6 @@
 import logging
 import uuid
+from collections import OrderedDict
 from typing import Any
 
 from django.conf import settings
@@ -37,11 +38,88 @@ class ShortURL(BaseModel):
         short_url, _ = await ShortURL.objects.aget_or_create(url=url)
         return short_url
 
+    @staticmethod
+    async def shorten_many(urls: list[str]) -> tuple[list["ShortURL"], int]:
+        """
+        Short URLs of `urls`, in the same order, and the number of URLs that were shortened for the first time. URLs
+        are looked up in the process-level cache first, then the rest in one query, and those that are not shortened
+        yet are created in one bulk insert.
+        """
+
+        short_urls: dict[str, ShortURL] = {}
+        num_created = 0
+        missing_urls = []
+
+        for url in dict.fromkeys(urls):
+            if (short_url := short_url_cache.get(url)) is not None:
+                short_urls[url] = short_url
+            else:
+                missing_urls.append(url)
+
+        if not missing_urls:
+            return [short_urls[url] for url in urls], num_created
+
+        short_urls.update(
+            {short_url.url: short_url async for short_url in ShortURL.objects.filter(url__in=missing_urls)}
+        )
+
+        if new_short_urls := [ShortURL(url=url) for url in missing_urls if url not in short_urls]:
+            # bulk_create doesn't call save()
+            for short_url in new_short_urls:
+                short_url.hash = uuid_to_hash(short_url.id)
+
+            # URLs shortened concurrently elsewhere are skipped, hence everything is fetched back
+            await ShortURL.objects.abulk_create(new_short_urls, ignore_conflicts=True)
+            new_urls = [short_url.url for short_url in new_short_urls]
+            short_urls.update(
+                {short_url.url: short_url async for short_url in ShortURL.objects.filter(url__in=new_urls)}
+            )
+            # Those created here have the IDs they were given, the others were created elsewhere
+            new_ids = {short_url.id for short_url in new_short_urls}
+            num_created += sum(short_urls[url].id in new_ids for url in new_urls if url in short_urls)
+
+        for url in missing_urls:
+            # Skipped because of a hash collision
+            if url not in short_urls:
+                short_urls[url], created = await ShortURL.objects.aget_or_create(url=url)
+                num_created += created
+
+            short_url_cache.put(short_urls[url])
+
+        return [short_urls[url] for url in urls], num_created
+
     @property
     def full_short_url(self) -> str:
         return f"{settings.URLSHORTENER_BASE_URL}/{self.hash}"
 
 
+class ShortURLCache:
+    """Process-level LRU of short URLs by URL. Short URLs never change, so entries never go stale."""
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self.short_urls: OrderedDict[str, ShortURL] = OrderedDict()
+
+    def get(self, url: str) -> ShortURL | None:
+        short_url = self.short_urls.get(url)
+        if short_url is not None:
+            self.short_urls.move_to_end(url)
+        return short_url
+
+    def put(self, short_url: ShortURL) -> None:
+        self.short_urls[short_url.url] = short_url
+        self.short_urls.move_to_end(short_url.url)
+
+        while len(self.short_urls) > self.max_size:
+            self.short_urls.popitem(last=False)
+
+    def clear(self) -> None:
+        self.short_urls.clear()
+
+
+short_url_cache = ShortURLCache(settings.SHORT_URL_CACHE_SIZE)
+
+
 def uuid_to_hash(uuid_obj: uuid.UUID, length: int = HASH_LENGTH) -> str:
     """Convert UUID to a robust alphanumeric short hash."""
 
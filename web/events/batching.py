@@ -0,0 +1,86 @@
+import asyncio
+import logging
+import weakref
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from itertools import islice
+
+from prometheus_client import Histogram
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class LookupBatcherState[K, V]:
+    pending: dict[K, list[asyncio.Future[V | None]]] = field(default_factory=dict)
+    worker: asyncio.Task[None] | None = None
+    next_request_at: float = 0.0
+
+
+class LookupBatcher[K, V]:
+    """
+    Collects the lookups of concurrent tasks into batches of up to `max_batch_size` keys, for APIs that look up many
+    keys in one request. One batch is requested at a time, and at most every `interval_seconds`, and the lookups that
+    come in meanwhile go into the next batch, so batches grow with the number of waiting lookups. `fetch` returns the
+    values of the keys of a batch, keys it leaves out get None. State is kept per event loop, as tasks may run in
+    loops of their own.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fetch: Callable[[list[K]], Awaitable[dict[K, V]]],
+        max_batch_size: int,
+        interval_seconds: float,
+        batch_size_metric: Histogram | None = None,
+    ) -> None:
+        self.name = name
+        self.fetch = fetch
+        self.max_batch_size = max_batch_size
+        self.interval_seconds = interval_seconds
+        self.batch_size_metric = batch_size_metric
+        self.states: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, LookupBatcherState[K, V]] = (
+            weakref.WeakKeyDictionary()
+        )
+
+    async def lookup(self, key: K) -> V | None:
+        loop = asyncio.get_running_loop()
+        state = self.states.setdefault(loop, LookupBatcherState())
+
+        future: asyncio.Future[V | None] = loop.create_future()
+        # Lookups of the same key share a slot in the batch
+        state.pending.setdefault(key, []).append(future)
+
+        if state.worker is None or state.worker.done():
+            state.worker = loop.create_task(self.run(state))
+
+        return await future
+
+    async def run(self, state: LookupBatcherState[K, V]) -> None:
+        loop = asyncio.get_running_loop()
+
+        while state.pending:
+            # Also lets the lookups that were started along with this one join the batch
+            await asyncio.sleep(max(state.next_request_at - loop.time(), 0.0))
+
+            keys = list(islice(state.pending, self.max_batch_size))
+            futures = {key: state.pending.pop(key) for key in keys}
+            state.next_request_at = loop.time() + self.interval_seconds
+
+            if self.batch_size_metric is not None:
+                self.batch_size_metric.observe(len(keys))
+            logger.debug(f"Looking up a batch of {len(keys)} keys in {self.name}, {len(state.pending)} waiting")
+
+            try:
+                values = await self.fetch(keys)
+            except Exception as e:
+                for key_futures in futures.values():
+                    for future in key_futures:
+                        if not future.done():
+                            future.set_exception(e)
+                continue
+
+            for key, key_futures in futures.items():
+                for future in key_futures:
+                    if not future.done():
+                        future.set_result(values.get(key))
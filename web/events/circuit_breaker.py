@@ -0,0 +1,152 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from enum import IntEnum
+from typing import Self
+
+from django.conf import settings
+
+from web.metrics import EVENT_SOURCE_CIRCUIT_BREAKER_STATE
+
+from .exceptions import CircuitOpenException
+
+logger = logging.getLogger(__name__)
+
+# How often requests parked while the circuit is half-open check whether they may be sent
+HALF_OPEN_POLL_SECONDS = 0.1
+
+
+class CircuitState(IntEnum):  # Values are exported as the state gauge
+    closed = 0
+    half_open = 1
+    open = 2
+
+
+class CircuitBreaker:
+    """
+    Stops sending requests to an event source that keeps throttling or failing them. After `failure_threshold`
+    throttles or failures within `window_seconds` the circuit opens for `open_seconds` (or for as long as the source
+    asked with Retry-After), during which requests are parked, or rejected if they would be parked for longer than
+    `max_park_seconds`. The circuit then becomes half-open and closes gradually: a single probe is let through, every
+    successful probe doubles the number of requests let through at once, and it closes after `close_after_successes`
+    successes. A failure while half-open opens it again, for twice as long.
+
+    The breaker has no loop-bound state, so a client shared between event loops can share its breaker too.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        failure_threshold: int,
+        window_seconds: float,
+        open_seconds: float,
+        max_open_seconds: float,
+        close_after_successes: int,
+        max_park_seconds: float,
+    ) -> None:
+        self.source = source
+        self.failure_threshold = failure_threshold
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.close_after_successes = close_after_successes
+        self.max_park_seconds = max_park_seconds
+
+        self.state = CircuitState.closed
+        self.failures: deque[float] = deque()
+        self.open_until = 0.0
+        self.consecutive_opens = 0
+        self.probe_successes = 0
+        self.probes_in_flight = 0
+
+        EVENT_SOURCE_CIRCUIT_BREAKER_STATE.labels(self.source).set(self.state)
+
+    @classmethod
+    def from_settings(cls, source: str) -> Self:
+        return cls(
+            source,
+            failure_threshold=settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+            window_seconds=settings.CIRCUIT_BREAKER_WINDOW_SECONDS,
+            open_seconds=settings.CIRCUIT_BREAKER_OPEN_SECONDS,
+            max_open_seconds=settings.CIRCUIT_BREAKER_MAX_OPEN_SECONDS,
+            close_after_successes=settings.CIRCUIT_BREAKER_CLOSE_AFTER_SUCCESSES,
+            max_park_seconds=settings.CIRCUIT_BREAKER_MAX_PARK_SECONDS,
+        )
+
+    @property
+    def probe_limit(self) -> int:
+        return 2**self.probe_successes
+
+    async def acquire(self) -> bool:
+        """Waits until a request may be sent. Returns whether the request is a probe of a half-open circuit"""
+
+        park_deadline = time.monotonic() + self.max_park_seconds
+
+        while True:
+            now = time.monotonic()
+
+            if self.state == CircuitState.open and now >= self.open_until:
+                self.transition(CircuitState.half_open)
+
+            if self.state == CircuitState.closed:
+                return False
+
+            if self.state == CircuitState.half_open and self.probes_in_flight < self.probe_limit:
+                self.probes_in_flight += 1
+                return True
+
+            wake_at = self.open_until if self.state == CircuitState.open else now + HALF_OPEN_POLL_SECONDS
+            if wake_at > park_deadline:
+                raise CircuitOpenException(
+                    f"Circuit for {self.source} is {self.state.name}, retry in {max(wake_at - now, 0.0):.1f}s"
+                )
+
+            await asyncio.sleep(wake_at - now)
+
+    def release(self, probe: bool, outcome: str | None, retry_after_seconds: float | None = None) -> None:
+        """
+        Records the outcome of a request: "ok", "failure" (throttled or failed), or None if it says nothing about the
+        health of the source (e.g. a 400)
+        """
+
+        if probe:
+            self.probes_in_flight -= 1
+
+        now = time.monotonic()
+
+        if outcome == "failure":
+            if self.state == CircuitState.half_open:
+                self.open(now, retry_after_seconds)
+            elif self.state == CircuitState.closed:
+                self.failures.append(now)
+                while self.failures and self.failures[0] <= now - self.window_seconds:
+                    self.failures.popleft()
+
+                if len(self.failures) >= self.failure_threshold:
+                    self.open(now, retry_after_seconds)
+        elif outcome == "ok" and probe and self.state == CircuitState.half_open:
+            self.probe_successes += 1
+
+            if self.probe_successes >= self.close_after_successes:
+                self.consecutive_opens = 0
+                self.transition(CircuitState.closed)
+
+    def open(self, now: float, retry_after_seconds: float | None = None) -> None:
+        open_seconds = min(self.open_seconds * 2**self.consecutive_opens, self.max_open_seconds)
+        if retry_after_seconds is not None:
+            open_seconds = max(open_seconds, min(retry_after_seconds, self.max_open_seconds))
+
+        self.consecutive_opens += 1
+        self.open_until = now + open_seconds
+        self.transition(CircuitState.open)
+        logger.warning(f"Circuit for {self.source} opened for {open_seconds}s")
+
+    def transition(self, state: CircuitState) -> None:
+        if state != CircuitState.open:
+            logger.info(f"Circuit for {self.source} is {state.name}")
+
+        self.state = state
+        self.failures.clear()
+        self.probe_successes = 0
+        EVENT_SOURCE_CIRCUIT_BREAKER_STATE.labels(self.source).set(state)
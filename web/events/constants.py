@@ -7,9 +7,12 @@ BANDSINTOWN_BASE_URL = "https://www.bandsintown.com"
 SONGKICK_BASE_URL = "https://www.songkick.com"
 
 MUSICBRAINZ_API_REQUEST_TIMEOUT = 5
+# MusicBrainz takes up to 100 URLs per lookup, fewer keep the request line well within server limits
+MUSICBRAINZ_URL_LOOKUP_MAX_BATCH_SIZE = 50
 SONGKICK_API_REQUEST_TIMEOUT = 5
 BANDSINTOWN_API_REQUEST_TIMEOUT = 5
 
+SPOTIFY_ARTIST_URL_REGEX = re.compile(r"^https?://open\.spotify\.com/(?:intl-[\w-]+/)?artist/([0-9A-Za-z]{22})\b")
 SONGKICK_EVENT_URL_REGEX = re.compile(r"^https://www\.songkick\.com/(concerts|festivals|live-stream-concerts).*$")
 SONGKICK_EVENTS_XPATH = (
     "//div[@id='calendar-summary' and contains(@class, 'upcoming')]/ol/li/div[@class='microformat']/script/text()"
@@ -17,6 +20,4 @@ SONGKICK_EVENTS_XPATH = (
 SONGKICK_TICKETS_XPATH = "//a[contains(@class, 'buy-ticket-link')]/@href"
 SONGKICK_LIVE_STREAM_XPATH = "//div[contains(@class, 'live-stream-link')]/a/@href"
 
-BANDSINTOWN_WINDOW_DATA_XPATH = "//head/script[contains(text(),'window.__data=')]/text()"
-
 ALNUM_TABLE = str.maketrans("", "", string.punctuation + string.whitespace)
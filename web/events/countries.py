@@ -0,0 +1,123 @@
+"""
+Country name normalisation with the data and the rules of country_converter (coco), without loading coco and its
+pandas table into every process. The data is generated into `countries_data.py` at build time
+(`python -m web.events.countries`). Without the generated module it is built from coco on first use.
+"""
+
+import importlib
+import logging
+import re
+import sys
+from functools import cache, lru_cache
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+COUNTRY_DATA_MODULE_PATH = Path(__file__).parent / "countries_data.py"
+COUNTRY_NAMES_CACHE_SIZE = 4096
+
+# What coco strips from names before converting them, e.g. "Asia excluding China" is "Asia"
+EXCLUDE_PREFIX_REGEX = re.compile("excl\\w.*|without|w/o")
+
+CountryName = str | list[str]
+
+
+def build_country_data() -> dict[str, Any]:
+    """The data coco converts names with, and the short names of all the names and codes in it"""
+
+    import country_converter as coco
+
+    cc = coco.CountryConverter()
+    names = cc.data["name_short"].tolist()
+
+    def exact_names(column: str) -> dict[str, list[str]]:
+        # Like coco, codes are matched case-insensitively, without anything after a dot
+        codes = cc.data[column].astype(str).str.replace("\\..*", "", regex=True).tolist()
+        result: dict[str, list[str]] = {}
+        for code, name in zip(codes, names, strict=True):
+            result.setdefault(code.lower(), []).append(name)
+        return result
+
+    known_names = {
+        str(value)
+        for column in ("name_short", "name_official", "ISO3", "ISOnumeric")
+        for value in cc.data[column].dropna()
+    }
+    known_names.update(code for pattern in cc.data["ISO2"].dropna() for code in re.findall("[A-Z]{2}", pattern))
+
+    return {
+        "version": coco.__version__,
+        "name_patterns": [(regex.pattern, name) for regex, name in zip(cc.regexes, names, strict=True)],
+        "iso2_patterns": [(regex.pattern, name) for regex, name in zip(cc.iso2_regexes, names, strict=True)],
+        "iso3_names": exact_names("ISO3"),
+        "iso_numeric_names": exact_names("ISOnumeric"),
+        "country_names": {name: cc.convert(name, to="name_short", not_found=None) for name in sorted(known_names)},
+    }
+
+
+def write_country_data_module(path: Path = COUNTRY_DATA_MODULE_PATH) -> None:
+    data = build_country_data()
+    lines = [f"# Generated by web/events/countries.py from country_converter {data.pop('version')}. Do not edit.", ""]
+    lines.extend(f"{key.upper()} = {value!r}" for key, value in data.items())
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+
+@cache
+def get_country_data() -> dict[str, Any]:
+    try:
+        countries_data = importlib.import_module(f"{__package__}.countries_data")
+    except ImportError:
+        logger.warning(f"{COUNTRY_DATA_MODULE_PATH} has not been generated. Building country data from coco")
+        data = build_country_data()
+    else:
+        data = {
+            "name_patterns": countries_data.NAME_PATTERNS,
+            "iso2_patterns": countries_data.ISO2_PATTERNS,
+            "iso3_names": countries_data.ISO3_NAMES,
+            "iso_numeric_names": countries_data.ISO_NUMERIC_NAMES,
+            "country_names": countries_data.COUNTRY_NAMES,
+        }
+
+    data["name_patterns"] = [(re.compile(p, re.IGNORECASE), name) for p, name in data["name_patterns"]]
+    data["iso2_patterns"] = [(re.compile(p, re.IGNORECASE), name) for p, name in data["iso2_patterns"]]
+    return data
+
+
+@lru_cache(maxsize=COUNTRY_NAMES_CACHE_SIZE)
+def convert_country_name(country_name: str) -> CountryName:
+    """
+    What `coco.convert(country_name, to="name_short", not_found=None)` returns: the short name, a list of them if
+    there are several matches, or the name itself if there are none.
+    """
+
+    data = get_country_data()
+
+    if (result := data["country_names"].get(country_name)) is not None:
+        return result
+
+    name = EXCLUDE_PREFIX_REGEX.split(country_name)[0]
+
+    try:
+        int(name)
+    except ValueError:
+        if len(name) == 2:
+            results = [short_name for regex, short_name in data["iso2_patterns"] if regex.search(name)]
+        elif len(name) == 3:
+            results = data["iso3_names"].get(name.lower(), [])
+        else:
+            results = [short_name for regex, short_name in data["name_patterns"] if regex.search(name)]
+    else:
+        results = data["iso_numeric_names"].get(name.lower(), [])
+
+    if not results:
+        return name
+    if len(results) == 1:
+        return results[0]
+    return list(results)
+
+
+if __name__ == "__main__":
+    path = Path(sys.argv[1]) if len(sys.argv) > 1 else COUNTRY_DATA_MODULE_PATH
+    write_country_data_module(path)
+    print(f"Country data written to {path}")  # noqa: T201
@@ -1,25 +1,31 @@
 import asyncio
 import json
 import logging
+from collections.abc import Awaitable, Callable
 from dataclasses import dataclass, field
 from datetime import date, datetime
+from functools import partial
 from typing import Any, Optional
 
+import httpx
 from django.conf import settings
 from sentry_sdk import capture_exception, capture_message
 
 from urlshortener.models import ShortURL
+from web.metrics import MUSICBRAINZ_URL_LOOKUP_BATCH_SIZE
 
+from .batching import LookupBatcher
 from .constants import (
     BANDSINTOWN_BASE_URL,
-    BANDSINTOWN_WINDOW_DATA_XPATH,
+    MUSICBRAINZ_URL_LOOKUP_MAX_BATCH_SIZE,
     SONGKICK_BASE_URL,
     SONGKICK_EVENT_URL_REGEX,
     SONGKICK_EVENTS_XPATH,
     SONGKICK_LIVE_STREAM_XPATH,
     SONGKICK_TICKETS_XPATH,
+    SPOTIFY_ARTIST_URL_REGEX,
 )
-from .enums import SONGKICK_EVENT_TYPE_MAP, ArtistNameMatchAccuracy, EventDataSource, EventType
+from .enums import SONGKICK_EVENT_TYPE_MAP, ArtistNameMatchAccuracy, EventDataSource, EventType, LookupType
 from .exceptions import (
     BandsintownException,
     EventDataSourceException,
@@ -28,15 +34,19 @@ from .exceptions import (
     MusicBrainzException,
     SongkickException,
 )
+from .extraction import extract_bandsintown_event_view, extract_bandsintown_events_json_ld
 from .http import (
+    AsyncRetryingClient,
     asend_get_request,
     async_bandsintown_client,
     async_musicbrainz_client,
     async_songkick_client,
+    redirect_resolution_limiter,
 )
 from .utils import (
     find_best_artist_name_match_advanced,
     find_best_artist_name_match_simple,
+    get_listing_hash,
     get_normalized_country_name,
     normalize_string,
     replace_unicode_characters,
@@ -63,35 +73,58 @@ class MusicBrainzArtist:
 
     @staticmethod
     async def find_by_spotify_url(url: str) -> Optional["MusicBrainzArtist"]:
-        try:
-            resp = await asend_get_request(
-                async_musicbrainz_client, "url", params={"resource": url, "inc": "artist-rels"}
-            )
-        except HTTPClientException as e:
-            raise MusicBrainzException(f"Failed to fetch artist by Spotify URL '{url}': {e}") from e
+        indexed_artist = await get_indexed_artist(url)
 
-        try:
-            data = resp.json()
-        except Exception as e:
-            raise MusicBrainzException(f"Failed to parse JSON '{resp.text}': {e}") from e
+        if indexed_artist is None:
+            data = None
+            found, artist_id = await get_cached_lookup(LookupType.musicbrainz_url, url)
 
-        relations = data.get("relations", [])
-        if not relations:
-            raise MusicBrainzException(f"No artist relations found for URL '{url}' in MusicBrainz")
+            if not found:
+                # Lookups of concurrently tracked artists are batched
+                artist_id = await musicbrainz_url_lookup_batcher.lookup(url)
+                await cache_lookup(LookupType.musicbrainz_url, url, artist_id)
 
-        artist_id = relations[0].get("artist", {}).get("id")
-        if not artist_id:
-            raise MusicBrainzException(f"No artist ID found for URL '{url}' in MusicBrainz")
+            if not artist_id:
+                raise MusicBrainzException(f"No artist found for URL '{url}' in MusicBrainz")
 
-        logger.info(f"Found artist ID '{artist_id}' for Spotify URL '{url}' in MusicBrainz")
+            logger.info(f"Found artist ID '{artist_id}' for Spotify URL '{url}' in MusicBrainz")
+        else:
+            artist_id, data = indexed_artist
+            logger.info(f"Found artist ID '{artist_id}' for Spotify URL '{url}' in the MusicBrainz index")
 
         try:
-            artist = await MusicBrainzArtist.from_artist_id(artist_id)
+            artist = await MusicBrainzArtist.from_artist_id(artist_id, data)
         except Exception as e:
             raise MusicBrainzException(f"Failed to get artist info for {artist_id}: {e}") from e
         else:
             return artist
 
+    @staticmethod
+    async def fetch_artist_ids_by_urls(urls: list[str]) -> dict[str, str | None]:
+        """IDs of the artists the URLs belong to, from one request. URLs that MusicBrainz does not know are left out"""
+
+        try:
+            data, _, _, _ = await asend_get_request(
+                async_musicbrainz_client, "url", params={"resource": urls, "inc": "artist-rels"}, parse_json=True
+            )
+        except HTTPClientException as e:
+            # Only if none of the URLs is known
+            if is_not_found(e):
+                return {}
+            raise MusicBrainzException(f"Failed to fetch artists by {len(urls)} URLs: {e}") from e
+
+        # A lookup of a single URL returns the URL itself rather than a list
+        urls_data = data["urls"] if "urls" in data else [{"resource": urls[0], **data}]
+
+        artist_ids = {}
+        for url_data in urls_data:
+            relations = url_data.get("relations", [])
+            if not relations:
+                logger.warning(f"No artist relations found for URL '{url_data['resource']}' in MusicBrainz")
+            artist_ids[url_data["resource"]] = relations[0].get("artist", {}).get("id") if relations else None
+
+        return artist_ids
+
     @staticmethod
     async def find_by_name(artist_name: str) -> Optional["MusicBrainzArtist"]:
         if not artist_name:
@@ -100,17 +133,12 @@ class MusicBrainzArtist:
         logger.info(f"Searching for artist '{artist_name}' in MusicBrainz")
 
         try:
-            resp = await asend_get_request(
-                async_musicbrainz_client, "artist", params={"query": artist_name, "limit": 100}
+            data, _, _, _ = await asend_get_request(
+                async_musicbrainz_client, "artist", params={"query": artist_name, "limit": 100}, parse_json=True
             )
         except HTTPClientException as e:
             raise MusicBrainzException(f"Failed to fetch artist by name '{artist_name}': {e}") from e
 
-        try:
-            data = resp.json()
-        except Exception as e:
-            raise MusicBrainzException(f"Failed to parse JSON '{resp.text}': {e}") from e
-
         artists = data.get("artists", [])
 
         if not artists:
@@ -138,45 +166,33 @@ class MusicBrainzArtist:
         return None
 
     @staticmethod
-    async def from_artist_id(artist_id: str) -> "MusicBrainzArtist":
-        try:
-            resp = await asend_get_request(
-                async_musicbrainz_client, f"artist/{artist_id}", params={"inc": "aliases+url-rels"}
-            )
-        except HTTPClientException as e:
-            raise MusicBrainzException(f"Failed to fetch artist by ID '{artist_id}': {e}") from e
+    async def from_artist_id(artist_id: str, data: dict[str, Any] | None = None) -> "MusicBrainzArtist":
+        """The artist, from `data` if it's already known (see `parse_artist_data`), from MusicBrainz otherwise"""
 
-        try:
-            data = resp.json()
-        except Exception as e:
-            raise HTTPClientException(f"Failed to parse JSON '{resp.text}': {e}") from e
+        if data is None:
+            found, data = await get_cached_lookup(LookupType.musicbrainz_artist, artist_id)
 
-        songkick_url = None
-        bandsintown_url = None
+            if not found:
+                data = await MusicBrainzArtist.fetch_artist_data(artist_id)
+                await cache_lookup(LookupType.musicbrainz_artist, artist_id, data)
 
-        for url in data.get("relations", []):
-            if url["type"] == "songkick":
-                songkick_url = url["url"]["resource"]
-                logger.debug(f"Found Songkick URL: {songkick_url}")
-            if url["type"] == "bandsintown":
-                bandsintown_url = url["url"]["resource"]
-                logger.debug(f"Found Bandsintown URL: {bandsintown_url}")
+        if data is None:
+            raise MusicBrainzException(f"Artist '{artist_id}' not found in MusicBrainz")
+
+        songkick_url = data["songkick_url"]
+        bandsintown_url = data["bandsintown_url"]
 
         if songkick_url:
             # Get the final URL
             try:
-                _, _, songkick_url, _ = await asend_get_request(
-                    async_songkick_client, songkick_url, redirect_url=True, raise_for_lte_300=False
-                )
+                songkick_url = await resolve_redirect_url(async_songkick_client, songkick_url)
             except HTTPClientException as e:
                 raise SongkickException(f"Failed to get final Songkick URL: {e}") from e
 
         if bandsintown_url:
             # Sometimes the URL we find in MusicBrainz is not the final URL, e.g. https://www.bandsintown.com/a/738
             try:
-                _, _, bandsintown_url, _ = await asend_get_request(
-                    async_bandsintown_client, bandsintown_url, redirect_url=True, raise_for_lte_300=False
-                )
+                bandsintown_url = await resolve_redirect_url(async_bandsintown_client, bandsintown_url)
             except HTTPClientException as e:
                 raise BandsintownException(f"Failed to get final Bandsintown URL: {e}") from e
 
@@ -186,7 +202,7 @@ class MusicBrainzArtist:
             # TODO: https://musicbrainz.org/doc/Style/Artist/Sort_Name
             # TODO: Artist 563ace2c-6e94-4b64-b544-40099a96b86d has a legitimate alias that is not primary
             # c463f1c4-d19f-420f-ac88-a7b5afabeeb9 has no primary alises at all
-            aliases = [data["name"]] + [a["name"] for a in data.get("aliases", []) if a["primary"]]
+            aliases = [data["name"], *data["primary_aliases"]]
             artist_names = [replace_unicode_characters(a) for a in aliases] + aliases
             artist_names = list(dict.fromkeys([a for a in artist_names if a]))
 
@@ -194,6 +210,123 @@ class MusicBrainzArtist:
             id=artist_id, names=artist_names, songkick_url=songkick_url, bandsintown_url=bandsintown_url
         )
 
+    @staticmethod
+    async def fetch_artist_data(artist_id: str) -> dict[str, Any] | None:
+        """The name, primary aliases, and Songkick and Bandsintown URLs of an artist, as they are in MusicBrainz"""
+
+        try:
+            data, _, _, _ = await asend_get_request(
+                async_musicbrainz_client, f"artist/{artist_id}", params={"inc": "aliases+url-rels"}, parse_json=True
+            )
+        except HTTPClientException as e:
+            if is_not_found(e):
+                return None
+            raise MusicBrainzException(f"Failed to fetch artist by ID '{artist_id}': {e}") from e
+
+        return parse_artist_data(data)
+
+
+musicbrainz_url_lookup_batcher = LookupBatcher(
+    name="musicbrainz_url",
+    fetch=MusicBrainzArtist.fetch_artist_ids_by_urls,
+    max_batch_size=MUSICBRAINZ_URL_LOOKUP_MAX_BATCH_SIZE,
+    interval_seconds=settings.MUSICBRAINZ_URL_LOOKUP_INTERVAL_SECONDS,
+    batch_size_metric=MUSICBRAINZ_URL_LOOKUP_BATCH_SIZE,
+)
+
+
+def parse_artist_data(data: dict[str, Any]) -> dict[str, Any]:
+    """
+    The name, primary aliases, and Songkick and Bandsintown URLs of an artist, from its MusicBrainz JSON with aliases
+    and URL relations, as the API returns it and as it is in the JSON data dumps
+    """
+
+    songkick_url = None
+    bandsintown_url = None
+
+    for url in data.get("relations", []):
+        if url["type"] == "songkick":
+            songkick_url = url["url"]["resource"]
+            logger.debug(f"Found Songkick URL: {songkick_url}")
+        if url["type"] == "bandsintown":
+            bandsintown_url = url["url"]["resource"]
+            logger.debug(f"Found Bandsintown URL: {bandsintown_url}")
+
+    return {
+        "name": data["name"],
+        "primary_aliases": [a["name"] for a in data.get("aliases", []) if a["primary"]],
+        "songkick_url": songkick_url,
+        "bandsintown_url": bandsintown_url,
+    }
+
+
+def get_spotify_artist_urls(data: dict[str, Any]) -> list[str]:
+    """Spotify artist URLs among the URL relations of an artist's MusicBrainz JSON, in the form we look them up by"""
+
+    urls = []
+    for relation in data.get("relations", []):
+        match = SPOTIFY_ARTIST_URL_REGEX.match(relation.get("url", {}).get("resource", ""))
+        if match is not None:
+            urls.append(f"https://open.spotify.com/artist/{match.group(1)}")
+    return list(dict.fromkeys(urls))
+
+
+def is_not_found(e: HTTPClientException) -> bool:
+    return isinstance(e.__cause__, httpx.HTTPStatusError) and e.__cause__.response.status_code == httpx.codes.NOT_FOUND
+
+
+async def get_indexed_artist(spotify_url: str) -> tuple[str, dict[str, Any]] | None:
+    from web.models import MusicBrainzIndexEntry  # web.models imports this module
+
+    return await MusicBrainzIndexEntry.get_artist(spotify_url)
+
+
+async def get_cached_lookup(lookup_type: LookupType, key: str) -> tuple[bool, Any]:
+    from web.models import LookupCacheEntry  # web.models imports this module
+
+    return await LookupCacheEntry.get_value(lookup_type, key)
+
+
+async def cache_lookup(lookup_type: LookupType, key: str, value: Any, negative: bool | None = None) -> None:
+    from web.models import LookupCacheEntry  # web.models imports this module
+
+    await LookupCacheEntry.set_value(lookup_type, key, value, negative=negative)
+
+
+async def resolve_redirect_url(client: AsyncRetryingClient, url: str) -> str | None:
+    """The URL that `url` redirects to, or None if it does not redirect"""
+
+    absolute_url = client.base_url.join(url)
+
+    found, value = await get_cached_lookup(LookupType.redirect, str(absolute_url))
+    if found:
+        return value["url"]
+
+    async with redirect_resolution_limiter.acquire(absolute_url.host):
+        _, _, redirect_url, _ = await asend_get_request(client, url, redirect_url=True, raise_for_lte_300=False)
+
+    await cache_lookup(LookupType.redirect, str(absolute_url), {"url": redirect_url})
+    return redirect_url
+
+
+async def resolve_redirect_urls(client: AsyncRetryingClient, urls: list[str]) -> list[str]:
+    """The URLs that `urls` redirect to, in the same order. Those that fail or do not redirect are left out."""
+
+    results = await asyncio.gather(*[resolve_redirect_url(client, url) for url in urls], return_exceptions=True)
+
+    redirect_urls = []
+    for r in results:
+        if isinstance(r, HTTPClientException):
+            logger.exception(f"Failed to fetch URL: {r}")
+            capture_exception(r)
+        elif isinstance(r, BaseException):
+            logger.exception(f"Unexpected error while fetching URL: {r}")
+            capture_exception(r)
+        elif r is not None:
+            redirect_urls.append(r)
+
+    return redirect_urls
+
 
 @dataclass
 class Venue:
@@ -215,6 +348,19 @@ class Event:
     venue: Venue | None = None
     stream_urls: list[str] = field(default_factory=list)
     tickets_urls: list[str] = field(default_factory=list)
+    listing_hash: str | None = None
+
+
+@dataclass(frozen=True)
+class KnownEvent:
+    """The part of an already stored event that is needed to decide whether to fetch it again"""
+
+    source: EventDataSource
+    url: str
+    date: date
+    has_urls: bool
+    listing_hash: str | None = None
+    detail_checked_at: datetime | None = None
 
 
 @dataclass
@@ -225,7 +371,9 @@ class EventSourceArtist:
     bandsintown_url: str | None = None
     songkick_match_accuracy: ArtistNameMatchAccuracy = ArtistNameMatchAccuracy.no_match
     bandsintown_match_accuracy: ArtistNameMatchAccuracy = ArtistNameMatchAccuracy.no_match
+    known_events: dict[str, KnownEvent] = field(default_factory=dict)
     events: list[Event] = field(default_factory=list)
+    num_urls_shortened: int = 0
 
     def __post_init__(self) -> None:
         if not self.name:
@@ -282,22 +430,17 @@ class EventSourceArtist:
             logger.warning("Songkick URL already exists")
             return
 
-        for name in [self.name, *self.alternative_names]:
-            logger.info(f"Searching for artist in Songkick by one of the names: '{name}'")
-
-            try:
-                artist_id, accuracy = await find_artist_in_songkick(name, use_advanced_heuristics)
-            except Exception as e:
-                logger.exception(f"Failed to search for artist in Songkick by name '{name}': {e}. Trying next name")
-                capture_exception(e)
-            else:
-                if artist_id is None:
-                    logger.warning(f"Could not find artist by name '{name}' in Songkick. Trying next name")
-                else:
-                    break
-        else:
+        match = await find_artist_by_names(
+            "Songkick",
+            [self.name, *self.alternative_names],
+            partial(find_artist_in_songkick, use_advanced_heuristics=use_advanced_heuristics),
+            Exception,
+        )
+        if match is None:
             raise SongkickException(f"Artist '{self.name}' not found in Songkick using any of the names")
 
+        artist_id, accuracy = match
+
         url_path = f"artists/{artist_id}/calendar"
         try:
             _, _, artist_url, _ = await asend_get_request(
@@ -319,22 +462,17 @@ class EventSourceArtist:
             logger.warning("Bandsintown URL already exists")
             return
 
-        for name in [self.name, *self.alternative_names]:
-            logger.info(f"Searching for artist in Bandsintown by one of the names: '{name}'")
-
-            try:
-                artist_id, accuracy = await find_artist_in_bandsintown(name, use_advanced_heuristics)
-            except BandsintownException as e:
-                logger.exception(f"Failed to search for artist in Bandsintown by name '{name}': {e}. Trying next name")
-                capture_exception(e)
-            else:
-                if artist_id is None:
-                    logger.warning(f"Could not find artist by name '{name}' in Bandsintown. Trying next name")
-                else:
-                    break
-        else:
+        match = await find_artist_by_names(
+            "Bandsintown",
+            [self.name, *self.alternative_names],
+            partial(find_artist_in_bandsintown, use_advanced_heuristics=use_advanced_heuristics),
+            BandsintownException,
+        )
+        if match is None:
             raise BandsintownException(f"Artist '{self.name}' not found in Bandsintown using any of the names")
 
+        artist_id, accuracy = match
+
         artist_url = f"{BANDSINTOWN_BASE_URL}/a/{artist_id}"
         logger.info(f"Found artist in Bandsintown: {artist_url}")
 
@@ -342,7 +480,8 @@ class EventSourceArtist:
         self.bandsintown_match_accuracy = accuracy
 
     async def fetch_events(self) -> None:
-        events = {e.url: e for e in self.events}
+        # Only newly fetched events end up here, known events that need no refetching are left out
+        events: dict[str, Event] = {}
 
         if self.songkick_url is not None:
             try:
@@ -364,8 +503,8 @@ class EventSourceArtist:
                 event_data = event_json[0]
                 event_url = event_data["url"].split("?")[0]
 
-                if not should_fetch_event(event_url, EventDataSource.songkick, events):
-                    logger.info(f"Event {event_url} already exists and has tickets or stream URLs. Skipping")
+                if not should_fetch_event(event_url, EventDataSource.songkick, event_data, self.known_events):
+                    logger.info(f"Event {event_url} is unchanged since it was last checked. Skipping")
                     continue
 
                 songkick_events_data.append(event_data)
@@ -386,15 +525,15 @@ class EventSourceArtist:
                 raise BandsintownException(f"Failed to fetch events from Bandsintown: {exc}") from exc
 
             # This assumes that there are no duplicate dates in the following `for` loop
-            existing_event_dates = [e.date for e in events.values()]
+            existing_event_dates = {e.date for e in self.known_events.values()} | {e.date for e in events.values()}
 
             bandsintown_events_data = []
             for event_data in events_data:
                 event_url = event_data["url"].split("?")[0]
                 event_date = datetime.fromisoformat(event_data["startDate"]).date()
 
-                if not should_fetch_event(event_url, EventDataSource.bandsintown, events):
-                    logger.info(f"Event {event_url} already exists and has tickets or stream URLs. Skipping")
+                if not should_fetch_event(event_url, EventDataSource.bandsintown, event_data, self.known_events):
+                    logger.info(f"Event {event_url} is unchanged since it was last checked. Skipping")
                     continue
 
                 # TODO: Perhaps this check needs to be a little smarter, but good enough for now
@@ -414,6 +553,7 @@ class EventSourceArtist:
                     events[r.url] = r
 
         self.events = list(events.values())
+        self.num_urls_shortened = await shorten_event_urls(self.events)
 
 
 async def find_artist_in_songkick(
@@ -423,50 +563,145 @@ async def find_artist_in_songkick(
         # https://github.com/encode/httpx/discussions/3360
         artist_name = artist_name.replace('"', "%22")
 
+    return await find_artist(
+        LookupType.songkick_artist_search, search_artists_in_songkick, artist_name, use_advanced_heuristics
+    )
+
+
+async def find_artist_in_bandsintown(
+    artist_name: str, use_advanced_heuristics: bool = False
+) -> tuple[str | None, ArtistNameMatchAccuracy]:
+    return await find_artist(
+        LookupType.bandsintown_artist_search, search_artists_in_bandsintown, artist_name, use_advanced_heuristics
+    )
+
+
+async def search_artists_in_songkick(artist_name: str) -> list[tuple[str, str]]:
     search_results, _, __, __ = await asend_get_request(
         async_songkick_client, f"api/universal_search?query={artist_name}", parse_json=True
     )
 
-    artists = [
+    return [
         (str(a["document"]["primary_key_id"]), a["document"]["name"])
         for a in search_results["data"]["attributes"]["search_results"]["artists"]
     ]
 
+
+async def search_artists_in_bandsintown(artist_name: str) -> list[tuple[str, str]]:
+    search_results, _, __, __ = await asend_get_request(
+        async_bandsintown_client, f"searchSuggestions?searchTerm={artist_name}", parse_json=True
+    )
+
+    return [(str(a["id"]), a["name"]) for a in search_results["artists"]]
+
+
+def pick_artist(
+    artist_name: str, artists: list[tuple[str, str]], use_advanced_heuristics: bool
+) -> tuple[str | None, ArtistNameMatchAccuracy]:
     if not artists:
         return None, ArtistNameMatchAccuracy.no_match
 
     if use_advanced_heuristics:
-        pick_artist = find_best_artist_name_match_advanced
+        find_best_artist_name_match = find_best_artist_name_match_advanced
     else:
-        pick_artist = find_best_artist_name_match_simple
+        find_best_artist_name_match = find_best_artist_name_match_simple
 
     try:
-        return pick_artist(artist_name, artists)
+        return find_best_artist_name_match(artist_name, artists)
     except HeuristicsException:
         return None, ArtistNameMatchAccuracy.no_match
 
 
-async def find_artist_in_bandsintown(
-    artist_name: str, use_advanced_heuristics: bool = False
+async def find_artist_by_names(
+    source: str,
+    names: list[str],
+    find: Callable[[str], Awaitable[tuple[str | None, ArtistNameMatchAccuracy]]],
+    errors: type[Exception] | tuple[type[Exception], ...],
+) -> tuple[str, ArtistNameMatchAccuracy] | None:
+    """
+    The ID and the match accuracy of the artist found by the first of the names that finds one. Searches by the next
+    EVENT_ARTIST_ALIAS_SEARCH_CONCURRENCY names run at once, and those still running are cancelled once the earlier
+    names have found nothing and one finds the artist. `errors` of a search mean trying the next name.
+    """
+
+    searches: dict[int, asyncio.Task[tuple[str | None, ArtistNameMatchAccuracy]]] = {}
+
+    try:
+        for index, name in enumerate(names):
+            for next_index in range(index, min(index + settings.EVENT_ARTIST_ALIAS_SEARCH_CONCURRENCY, len(names))):
+                if next_index not in searches:
+                    logger.info(f"Searching for artist in {source} by one of the names: '{names[next_index]}'")
+                    searches[next_index] = asyncio.create_task(find(names[next_index]))
+
+            try:
+                artist_id, accuracy = await searches.pop(index)
+            except errors as e:
+                logger.exception(f"Failed to search for artist in {source} by name '{name}': {e}. Trying next name")
+                capture_exception(e)
+                continue
+
+            if artist_id is not None:
+                return artist_id, accuracy
+
+            logger.warning(f"Could not find artist by name '{name}' in {source}. Trying next name")
+    finally:
+        for search in searches.values():
+            search.cancel()
+        await asyncio.gather(*searches.values(), return_exceptions=True)
+
+    return None
+
+
+async def find_artist(
+    lookup_type: LookupType,
+    search: Callable[[str], Awaitable[list[tuple[str, str]]]],
+    artist_name: str,
+    use_advanced_heuristics: bool,
 ) -> tuple[str | None, ArtistNameMatchAccuracy]:
-    search_results, _, __, __ = await asend_get_request(
-        async_bandsintown_client, f"searchSuggestions?searchTerm={artist_name}", parse_json=True
+    """
+    Search for the artist and pick the best match among the found ones. Search results are cached per casefolded
+    query (name matching ignores case anyway) together with the picks of both heuristics. Queries that nothing was
+    picked for are searched again after intervals that grow with every such result.
+    """
+
+    key = artist_name.casefold()
+    heuristics = "advanced" if use_advanced_heuristics else "simple"
+
+    found, value = await get_cached_lookup(lookup_type, key)
+    if found:
+        artist_id, accuracy = value["matches"][heuristics]
+        return artist_id, ArtistNameMatchAccuracy(accuracy)
+
+    artists = await search(artist_name)
+    matches = {
+        "simple": pick_artist(artist_name, artists, use_advanced_heuristics=False),
+        "advanced": pick_artist(artist_name, artists, use_advanced_heuristics=True),
+    }
+    await cache_lookup(
+        lookup_type,
+        key,
+        {"artists": artists, "matches": matches},
+        negative=all(artist_id is None for artist_id, _ in matches.values()),
     )
 
-    artists = [(str(a["id"]), a["name"]) for a in search_results["artists"]]
+    return matches[heuristics]
 
-    if not artists:
-        return None, ArtistNameMatchAccuracy.no_match
 
-    if use_advanced_heuristics:
-        pick_artist = find_best_artist_name_match_advanced
-    else:
-        pick_artist = find_best_artist_name_match_simple
+async def shorten_event_urls(events: list[Event]) -> int:
+    """
+    Replaces the stream and ticket URLs of events with short URLs, shortened together for the whole batch. Returns the
+    number of URLs that were shortened for the first time.
+    """
 
-    try:
-        return pick_artist(artist_name, artists)
-    except HeuristicsException:
-        return None, ArtistNameMatchAccuracy.no_match
+    urls = [url for event in events for url in (*event.stream_urls, *event.tickets_urls)]
+    short_url_list, num_created = await ShortURL.shorten_many(urls)
+    short_urls = {short_url.url: short_url.full_short_url for short_url in short_url_list}
+
+    for event in events:
+        event.stream_urls = [short_urls[url] for url in event.stream_urls]
+        event.tickets_urls = [short_urls[url] for url in event.tickets_urls]
+
+    return num_created
 
 
 async def extract_songkick_event(event_data: dict[str, Any]) -> Event:
@@ -516,28 +751,14 @@ async def extract_songkick_event(event_data: dict[str, Any]) -> Event:
     urls = [u.split("?")[0] for u in urls]
 
     if settings.RESOLVE_SONGKICK_URLS:
-        calls = [asend_get_request(async_songkick_client, u, redirect_url=True, raise_for_lte_300=False) for u in urls]
-        results = await asyncio.gather(*calls, return_exceptions=True)
-
-        result_urls = []
-        for r in results:
-            if isinstance(r, HTTPClientException):
-                logger.exception(f"Failed to fetch URL: {r}")
-                capture_exception(r)
-            elif isinstance(r, BaseException):
-                logger.exception(f"Unexpected error while fetching URL: {r}")
-                capture_exception(r)
-            else:  # noqa: PLR5501
-                if r[2] is not None:
-                    result_urls.append((await ShortURL.shorten(r[2])).full_short_url)
+        urls = await resolve_redirect_urls(async_songkick_client, urls)
     else:
         urls = [f"{SONGKICK_BASE_URL}/{u}" for u in urls]
-        result_urls = [(await ShortURL.shorten(u)).full_short_url for u in urls]
 
     if event_type == EventType.live_stream:
-        stream_urls = result_urls
+        stream_urls = urls
     else:
-        tickets_urls = result_urls
+        tickets_urls = urls
 
     return Event(
         source=EventDataSource.songkick,
@@ -547,6 +768,7 @@ async def extract_songkick_event(event_data: dict[str, Any]) -> Event:
         venue=venue,
         stream_urls=stream_urls,
         tickets_urls=tickets_urls,
+        listing_hash=get_listing_hash(event_data),
     )
 
 
@@ -557,32 +779,15 @@ async def extract_bandsintown_event(event_data: dict[str, Any]) -> Event:
     date = datetime.fromisoformat(event_data["startDate"]).date()
 
     try:
-        _, script_tag, _, _ = await asend_get_request(
-            async_bandsintown_client, event_url, xpath=BANDSINTOWN_WINDOW_DATA_XPATH
+        _, event_view, _, _ = await asend_get_request(
+            async_bandsintown_client, event_url, extract=extract_bandsintown_event_view
         )
     except HTTPClientException as e:
         raise BandsintownException(f"Failed to fetch data for event {event_url}: {e}") from e
-    else:
-        if not script_tag:
-            raise BandsintownException(f"'window.__data' element not found on {event_url}")
-
-        if len(script_tag) > 1:
-            raise BandsintownException(f"Multiple 'window.__data' elements found on {event_url}")
-
-        try:
-            window_data = script_tag[0].split("window.__data=")[1]
-        except Exception as e:
-            raise BandsintownException(f"Failed to extract 'window.__data' from {event_url}: {e}") from e
-
-        try:
-            data = json.loads(window_data)
-        except Exception as e:
-            raise BandsintownException(f"Failed to parse 'window.__data' from {event_url}: {e}") from e
 
     tickets_urls = []
     stream_urls = []
 
-    event_view = data.get("eventView", {})
     if not event_view:
         msg = f"eventView key not found in 'window.__data' on {event_url}"
         logger.error(msg)
@@ -604,7 +809,7 @@ async def extract_bandsintown_event(event_data: dict[str, Any]) -> Event:
 
         stream_url = event_details.get("streamingUrl")
         if stream_url:
-            stream_urls = [(await ShortURL.shorten(stream_url)).full_short_url]
+            stream_urls = [stream_url]
         else:
             logger.warning(
                 f"eventView.body.hybridEventDetails.streamingUrl key not found in 'window.__data' on {event_url}"
@@ -639,7 +844,7 @@ async def extract_bandsintown_event(event_data: dict[str, Any]) -> Event:
             for ticket in ticket_list:
                 ticket_url = ticket.get("directTicketUrl")
                 if ticket_url:
-                    tickets_urls.append((await ShortURL.shorten(ticket_url)).full_short_url)
+                    tickets_urls.append(ticket_url)
                 else:
                     logger.warning(
                         f"directTicketUrl not found in one of the elements in "
@@ -654,33 +859,18 @@ async def extract_bandsintown_event(event_data: dict[str, Any]) -> Event:
         venue=venue,
         stream_urls=stream_urls,
         tickets_urls=tickets_urls,
+        listing_hash=get_listing_hash(event_data),
     )
 
 
 async def extract_bandsintown_events_data(bandsintown_url: str) -> list[dict[str, Any]]:
     try:
-        _, script_tag, __, __ = await asend_get_request(
-            async_bandsintown_client, bandsintown_url, xpath=BANDSINTOWN_WINDOW_DATA_XPATH
+        _, extracted, __, __ = await asend_get_request(
+            async_bandsintown_client, bandsintown_url, extract=extract_bandsintown_events_json_ld
         )
     except HTTPClientException as e:
         raise BandsintownException(f"Failed to fetch data from {bandsintown_url}: {e}") from e
 
-    if not script_tag:
-        raise BandsintownException(f"'{bandsintown_url}' page has no 'window.__data=' element")
-
-    if len(script_tag) > 1:
-        raise BandsintownException(f"Multiple 'window.__data=' elements found on {bandsintown_url}")
-
-    try:
-        window_data = script_tag[0].split("window.__data=")[1]
-    except Exception as e:
-        raise BandsintownException(f"Failed to extract 'window.__data' from {bandsintown_url}: {e}") from e
-
-    try:
-        data = json.loads(window_data)
-    except Exception as e:
-        raise BandsintownException(f"Failed to parse 'window.__data' on {bandsintown_url}: {e}") from e
-
-    events_data: list[dict[str, Any]] = data["jsonLdContainer"]["eventsJsonLd"]
+    events_data: list[dict[str, Any]] = extracted
 
     return events_data
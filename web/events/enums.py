@@ -34,3 +34,11 @@ SONGKICK_EVENT_TYPE_MAP = {
     "festivals": EventType.festival,
     "live-stream-concerts": EventType.live_stream,
 }
+
+
+class LookupType(StrEnum):
+    musicbrainz_url = "musicbrainz_url"  # URL -> MusicBrainz ID of the artist it belongs to
+    musicbrainz_artist = "musicbrainz_artist"  # MusicBrainz artist ID -> names and event source URLs
+    redirect = "redirect"  # URL -> the URL it redirects to
+    songkick_artist_search = "songkick_artist_search"  # Search query -> found artists and the best matching ones
+    bandsintown_artist_search = "bandsintown_artist_search"  # Search query -> found artists and the best matching ones
@@ -24,3 +24,7 @@ class SongkickException(Exception):
 
 class HeuristicsException(Exception):
     pass
+
+
+class CircuitOpenException(Exception):
+    pass
@@ -0,0 +1,126 @@
+"""
+Extraction of event data from Songkick and Bandsintown pages. XPaths are compiled once per process. The data
+Bandsintown embeds in its pages as `window.__data=` (often megabytes of JSON) is located in the raw page bytes, without
+building a DOM, and only the part of it that is needed is decoded.
+
+Extractors take page bytes and return plain data, so that they can run in page parser processes (see `parsing`).
+"""
+
+import json
+import re
+from functools import cache
+from typing import Any
+
+from lxml import etree
+from lxml import html as lh
+
+WINDOW_DATA_MARKER = b"window.__data="
+SCRIPT_END_TAG = b"</script>"
+
+JSON_WHITESPACE = b" \t\r\n"
+JSON_STRING_PATTERN = re.compile(rb'"(?:[^"\\]|\\.)*"', re.DOTALL)
+
+json_decoder = json.JSONDecoder()
+
+get_xpath = cache(etree.XPath)
+
+
+def select_html(expression: str, encoding: str, content: bytes) -> list[str]:
+    """The text or attribute values an XPath expression selects from an HTML page"""
+
+    html = lh.fromstring(content.decode(encoding, errors="replace"))
+    return [str(result) for result in get_xpath(expression)(html)]
+
+
+def find_window_data(content: bytes) -> tuple[int, int]:
+    """Start and end of the `window.__data=` JSON in a Bandsintown page"""
+
+    start = content.find(WINDOW_DATA_MARKER)
+    if start == -1:
+        raise ValueError("Page has no 'window.__data=' element")
+
+    if content.find(WINDOW_DATA_MARKER, start + 1) != -1:
+        raise ValueError("Multiple 'window.__data=' elements found on page")
+
+    start += len(WINDOW_DATA_MARKER)
+    end = content.find(SCRIPT_END_TAG, start)
+    if end == -1:
+        raise ValueError("'window.__data=' element is not closed")
+
+    return start, end
+
+
+def find_json_key_values(content: bytes, key: str, start: int, end: int, limit: int = 2) -> list[int]:
+    """Offsets of (up to `limit`) values of `key` in JSON objects between `start` and `end`"""
+
+    needle = f'"{key}"'.encode()
+    offsets: list[int] = []
+
+    position = content.find(needle, start, end)
+    while position != -1 and len(offsets) < limit:
+        value_start = position + len(needle)
+        while value_start < end and content[value_start] in JSON_WHITESPACE:
+            value_start += 1
+
+        # A key is followed by a colon, and is not within a string, where its quotes would be escaped
+        if content[value_start : value_start + 1] == b":" and content[position - 1 : position] != b"\\":
+            offsets.append(value_start + 1)
+
+        position = content.find(needle, position + 1, end)
+
+    return offsets
+
+
+def get_json_depth(content: bytes, start: int, end: int) -> int:
+    """Nesting depth in objects and arrays at `end` (not within a string) of the JSON starting at `start`"""
+
+    structure = JSON_STRING_PATTERN.sub(b"", content[start:end])
+    return structure.count(b"{") + structure.count(b"[") - structure.count(b"}") - structure.count(b"]")
+
+
+def decode_json_value(content: bytes, start: int, end: int) -> Any:
+    text = content[start:end].decode()
+    value, _ = json_decoder.raw_decode(text, len(text) - len(text.lstrip()))
+    return value
+
+
+def extract_window_data(content: bytes, path: tuple[str, ...]) -> Any:
+    """
+    The value at `path` in the `window.__data=` object of a Bandsintown page. If the first key of the path occurs once
+    in the data, and at the top level, only its value is decoded. The rest of the path is looked up in that value, so
+    a deeper key is never taken from under another parent. Otherwise the whole object is decoded.
+    Raises `ValueError` if the data can't be found or decoded, `KeyError` if there is nothing at `path`.
+    """
+
+    start, end = find_window_data(content)
+
+    offsets = find_json_key_values(content, path[0], start, end)
+    if len(offsets) == 1 and get_json_depth(content, start, offsets[0]) == 1:
+        return get_json_path(decode_json_value(content, offsets[0], end), path[1:])
+
+    return get_json_path(decode_json_value(content, start, end), path)
+
+
+def get_json_path(value: Any, path: tuple[str, ...]) -> Any:
+    for key in path:
+        if not isinstance(value, dict) or key not in value:
+            raise KeyError(key)
+        value = value[key]
+    return value
+
+
+def extract_bandsintown_events_json_ld(content: bytes) -> list[dict[str, Any]]:
+    """Events of a Bandsintown artist page"""
+
+    events_data: list[dict[str, Any]] = extract_window_data(content, ("jsonLdContainer", "eventsJsonLd"))
+    return events_data
+
+
+def extract_bandsintown_event_view(content: bytes) -> dict[str, Any]:
+    """Details of a Bandsintown event page, empty if the page has none"""
+
+    try:
+        event_view: dict[str, Any] = extract_window_data(content, ("eventView",))
+    except KeyError:
+        return {}
+    return event_view
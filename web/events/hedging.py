@@ -0,0 +1,84 @@
+import logging
+from bisect import bisect_left, insort
+from collections import deque
+from typing import Self
+
+from django.conf import settings
+
+from web.metrics import EVENT_SOURCE_HEDGED_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+# Response times that the hedge delay is computed from, and how many are needed before requests are hedged
+HEDGE_LATENCY_WINDOW = 1000
+HEDGE_MIN_SAMPLES = 100
+# Unused budget is saved for bursts of slow responses, up to this many hedge requests
+HEDGE_MAX_BURST = 10
+
+
+class RequestHedger:
+    """
+    Decides when to hedge a request to an event source, i.e. to send it a second time, as a response that takes
+    longer than `quantile` of the recent response times of the source is likely to take much longer. Hedge requests
+    are paid from a budget that grows by `budget` with every request, so they add at most that share of requests.
+
+    The hedger has no loop-bound state, so a client shared between event loops can share its hedger too.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        budget: float,
+        quantile: float,
+        window_size: int = HEDGE_LATENCY_WINDOW,
+        min_samples: int = HEDGE_MIN_SAMPLES,
+        max_burst: int = HEDGE_MAX_BURST,
+    ) -> None:
+        self.source = source
+        self.budget = budget
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.max_burst = max_burst
+
+        self.latencies: deque[float] = deque(maxlen=window_size)
+        self.sorted_latencies: list[float] = []
+        self.tokens = 0.0
+
+    @classmethod
+    def from_settings(cls, source: str) -> Self | None:
+        if not settings.EVENT_SOURCE_HEDGING_ENABLED:
+            return None
+        return cls(source, budget=settings.EVENT_SOURCE_HEDGE_BUDGET, quantile=settings.EVENT_SOURCE_HEDGE_QUANTILE)
+
+    def record(self, seconds: float) -> None:
+        """Records how long a request took, or was waited for if it was cancelled"""
+
+        if len(self.latencies) == self.latencies.maxlen:
+            del self.sorted_latencies[bisect_left(self.sorted_latencies, self.latencies[0])]
+
+        self.latencies.append(seconds)
+        insort(self.sorted_latencies, seconds)
+
+    def start(self) -> float | None:
+        """
+        Adds a request's share to the budget. Returns how long to wait for its response before hedging it, or None if
+        there are too few response times yet to tell what is slow.
+        """
+
+        self.tokens = min(self.tokens + self.budget, self.max_burst)
+
+        num_latencies = len(self.sorted_latencies)
+        if num_latencies < self.min_samples:
+            return None
+
+        return self.sorted_latencies[min(int(num_latencies * self.quantile), num_latencies - 1)]
+
+    def try_hedge(self) -> bool:
+        """Whether the budget allows a hedge request, which is then paid from it"""
+
+        if self.tokens < 1:
+            EVENT_SOURCE_HEDGED_REQUESTS.labels(self.source, "over_budget").inc()
+            return False
+
+        self.tokens -= 1
+        return True
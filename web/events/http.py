@@ -1,14 +1,18 @@
 import asyncio
+import email.utils
 import logging
 import random
 import string
 import time
 import timeit
+import weakref
+from collections.abc import AsyncIterator, Callable
+from contextlib import asynccontextmanager
+from functools import partial
 from typing import Any
 
 import httpx
 from django.conf import settings
-from lxml import html as lh
 from prometheus_client import Counter, Histogram
 
 from web.metrics import (
@@ -16,6 +20,8 @@ from web.metrics import (
     BANDSINTOWN_API_RESPONSE_TIME_SECONDS,
     BANDSINTOWN_API_RESPONSES_GTE_400,
     BANDSINTOWN_API_RESPONSES_THROTTLED,
+    EVENT_SOURCE_HEDGED_REQUESTS,
+    EVENT_SOURCE_HTTP_CACHE_REQUESTS,
     MUSICBRAINZ_API_EXCEPTIONS,
     MUSICBRAINZ_API_REQUEST_DELAY_TIME_SECONDS,
     MUSICBRAINZ_API_RESPONSE_TIME_SECONDS,
@@ -26,6 +32,7 @@ from web.metrics import (
     SONGKICK_API_RESPONSES_GTE_400,
 )
 
+from .circuit_breaker import CircuitBreaker
 from .constants import (
     BANDSINTOWN_API_REQUEST_TIMEOUT,
     BANDSINTOWN_BASE_URL,
@@ -34,7 +41,12 @@ from .constants import (
     SONGKICK_API_REQUEST_TIMEOUT,
     SONGKICK_BASE_URL,
 )
-from .exceptions import HTTPClientException, RetriesExhaustedException
+from .exceptions import CircuitOpenException, HTTPClientException, RetriesExhaustedException
+from .extraction import select_html
+from .hedging import RequestHedger
+from .http_cache import HTTPCache
+from .parsing import parse_page
+from .proxies import ProxyPoolTransport
 
 logger = logging.getLogger(__name__)
 
@@ -52,6 +64,9 @@ class AsyncRetryingClient(httpx.AsyncClient):
         throttle_counter_metric: Counter | None = None,
         delay_time_metric: Histogram | None = None,
         log_request_details: bool = False,
+        circuit_breaker: CircuitBreaker | None = None,
+        http_cache: HTTPCache | None = None,
+        hedger: RequestHedger | None = None,
         *args: Any,
         **kwargs: Any,
     ) -> None:
@@ -67,6 +82,9 @@ class AsyncRetryingClient(httpx.AsyncClient):
         self.throttle_counter_metric = throttle_counter_metric
         self.delay_time_metric = delay_time_metric
         self.log_request_details = log_request_details
+        self.circuit_breaker = circuit_breaker
+        self.http_cache = http_cache
+        self.hedger = hedger
         self.requests_total = 0
         self.requests_timedout = 0
         self.requests_failed_to_connect = 0
@@ -76,6 +94,9 @@ class AsyncRetryingClient(httpx.AsyncClient):
         self.requests_gte_400 = 0
         self.requests_throttled = 0
         self.requests_retries_exhausted = 0
+        self.requests_rejected = 0
+        self.requests_hedged = 0
+        self.response_time_seconds_total = 0.0
         self.next_request_allowed_at = time.time()
 
     def _merge_headers(self, headers: httpx._types.HeaderTypes | None = None) -> httpx._types.HeaderTypes | None:
@@ -85,9 +106,36 @@ class AsyncRetryingClient(httpx.AsyncClient):
         return headers
 
     async def send(self, request: httpx.Request, *args: Any, **kwargs: Any) -> httpx.Response:
+        if self.http_cache is None or request.method != "GET" or kwargs.get("stream"):
+            return await self.send_with_retries(request, *args, **kwargs)
+
+        url = str(request.url)
+        cached = await asyncio.to_thread(self.http_cache.get, url)
+        if cached is not None:
+            request.headers.update(cached.conditional_headers())
+
+        response = await self.send_with_retries(request, *args, **kwargs)
+
+        if cached is not None and response.status_code == 304:
+            EVENT_SOURCE_HTTP_CACHE_REQUESTS.labels(self.name, "hit").inc()
+            return cached.to_response(request)
+
+        EVENT_SOURCE_HTTP_CACHE_REQUESTS.labels(self.name, "miss").inc()
+
+        if response.status_code == 200 and ("ETag" in response.headers or "Last-Modified" in response.headers):
+            await asyncio.to_thread(self.http_cache.put, url, response)
+
+        return response
+
+    async def send_with_retries(self, request: httpx.Request, *args: Any, **kwargs: Any) -> httpx.Response:
         retries = self.retries
+        retry_after_seconds = None
 
         while retries > 0:
+            if retries < self.retries:
+                await self.back_off(self.retries - retries - 1, retry_after_seconds)
+                retry_after_seconds = None
+
             if self.delay_seconds:
                 time_to_sleep_seconds = max(self.next_request_allowed_at - time.time(), 0.0)
 
@@ -97,18 +145,24 @@ class AsyncRetryingClient(httpx.AsyncClient):
                     logger.debug(f"Sleeping for {time_to_sleep_seconds} seconds")
                     await asyncio.sleep(time_to_sleep_seconds)
 
+            probe = await self.acquire_circuit(request)
+
             self.requests_total += 1
 
             start = timeit.default_timer()
 
             try:
-                response = await super().send(request, *args, **kwargs)
+                response = await self.send_hedged(request, *args, **kwargs)
+            except asyncio.CancelledError:
+                self.release_circuit(probe, None)
+                raise
             except httpx.ConnectError as e:
                 if self.exceptions_counter_metric is None:
                     logger.warning(f"exceptions_counter_metric for {self.name} is None. Skipping metric recording")
                 else:
                     self.exceptions_counter_metric.labels("connect").inc()
 
+                self.release_circuit(probe, "failure")
                 self.requests_failed_to_connect += 1
                 logger.warning(f"Failed to connect while requesting {request.url}: {e}. Retrying...")
                 retries -= 1
@@ -119,6 +173,7 @@ class AsyncRetryingClient(httpx.AsyncClient):
                 else:
                     self.exceptions_counter_metric.labels("proxy").inc()
 
+                self.release_circuit(probe, "failure")
                 self.requests_failed_to_proxy += 1
                 logger.warning(f"Failed to proxy while requesting {request.url}: {e}. Retrying...")
                 retries -= 1
@@ -129,6 +184,7 @@ class AsyncRetryingClient(httpx.AsyncClient):
                 else:
                     self.exceptions_counter_metric.labels("timeout").inc()
 
+                self.release_circuit(probe, "failure")
                 self.requests_timedout += 1
                 logger.warning(f"Timeout {self.timeout} reached while requesting {request.url}: {e}. Retrying...")
                 retries -= 1
@@ -139,6 +195,7 @@ class AsyncRetryingClient(httpx.AsyncClient):
                 else:
                     self.exceptions_counter_metric.labels("other").inc()
 
+                self.release_circuit(probe, "failure")
                 self.requests_errored += 1
 
                 exc_msg = e.__class__.__name__
@@ -151,6 +208,7 @@ class AsyncRetryingClient(httpx.AsyncClient):
 
             # else:
             request_time = max(timeit.default_timer() - start, 0)
+            self.response_time_seconds_total += request_time
 
             if self.response_time_metric is None:
                 logger.warning(f"response_time_metric for {self.name} is None. Skipping metric recording")
@@ -180,6 +238,14 @@ class AsyncRetryingClient(httpx.AsyncClient):
 
             if response.status_code >= 400:
                 self.requests_gte_400 += 1
+                retry_after_seconds = parse_retry_after(response.headers.get("Retry-After"))
+
+            if response.status_code == self.throttle_response_code or response.status_code >= 500:
+                self.release_circuit(probe, "failure", retry_after_seconds)
+            elif response.status_code < 400 or response.status_code == 404:
+                self.release_circuit(probe, "ok")
+            else:
+                self.release_circuit(probe, None)
 
             if response.status_code >= 400:
                 if self.responses_gte_400_counter_metric is None:
@@ -215,6 +281,126 @@ class AsyncRetryingClient(httpx.AsyncClient):
             f"Failed to get a successful response from {request.url} after {self.retries} retries"
         )
 
+    async def back_off(self, attempt: int, retry_after_seconds: float | None = None) -> None:
+        """Exponential backoff with full jitter, but not shorter than the source asked for (capped all the same)"""
+
+        max_backoff_seconds = settings.EVENT_SOURCE_RETRY_MAX_BACKOFF_SECONDS
+        backoff_seconds = random.uniform(  # noqa: S311
+            0, min(settings.EVENT_SOURCE_RETRY_BACKOFF_SECONDS * 2**attempt, max_backoff_seconds)
+        )
+        if retry_after_seconds is not None:
+            backoff_seconds = max(backoff_seconds, min(retry_after_seconds, max_backoff_seconds))
+
+        logger.debug(f"Backing off for {backoff_seconds} seconds before retrying")
+        await asyncio.sleep(backoff_seconds)
+
+    async def send_hedged(self, request: httpx.Request, *args: Any, **kwargs: Any) -> httpx.Response:
+        """
+        Sends a GET request, and sends it again if there is no response within the time the hedger allows. The first
+        response wins, and the other request is cancelled.
+        """
+
+        if self.hedger is None or request.method != "GET" or kwargs.get("stream"):
+            return await super().send(request, *args, **kwargs)
+
+        hedge_delay_seconds = self.hedger.start()
+        tasks = [asyncio.ensure_future(self.send_timed(request, *args, **kwargs))]
+
+        try:
+            if hedge_delay_seconds is not None:
+                await asyncio.wait(tasks, timeout=hedge_delay_seconds)
+
+                if not tasks[0].done() and self.hedger.try_hedge():
+                    self.requests_hedged += 1
+                    logger.debug(f"No response from {request.url} in {hedge_delay_seconds} seconds. Hedging")
+                    hedge_request = get_hedge_request(request)
+                    tasks.append(asyncio.ensure_future(self.send_timed(hedge_request, *args, is_hedge=True, **kwargs)))
+
+            return await self.first_response(tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Also retrieves the error of a failed loser
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def send_timed(
+        self, request: httpx.Request, *args: Any, is_hedge: bool = False, **kwargs: Any
+    ) -> httpx.Response:
+        start = timeit.default_timer()
+        try:
+            response = await super().send(request, *args, **kwargs)
+        except asyncio.CancelledError:
+            # The time a cancelled request was waited for is what is known of the tail of the response times. A
+            # cancelled hedge request only lost to its request, its short time would make the tail look shorter.
+            if self.hedger is not None and not is_hedge:
+                self.hedger.record(timeit.default_timer() - start)
+            raise
+
+        if self.hedger is not None:
+            self.hedger.record(timeit.default_timer() - start)
+        return response
+
+    async def first_response(self, tasks: list[asyncio.Future[httpx.Response]]) -> httpx.Response:
+        """The first response to a request or to its hedge request. The error of the request if both fail."""
+
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            responses = [task.result() for task in tasks if task in done and task.exception() is None]
+            if not responses:
+                continue
+
+            # Both may have completed at once
+            for response in responses[1:]:
+                await response.aclose()
+
+            if len(tasks) > 1:
+                winner = "primary" if tasks[0] in done and tasks[0].exception() is None else "hedge"
+                EVENT_SOURCE_HEDGED_REQUESTS.labels(self.name, f"{winner}_won").inc()
+
+            return responses[0]
+
+        if len(tasks) > 1:
+            EVENT_SOURCE_HEDGED_REQUESTS.labels(self.name, "failed").inc()
+
+        return tasks[0].result()
+
+    async def acquire_circuit(self, request: httpx.Request) -> bool:
+        if self.circuit_breaker is None:
+            return False
+
+        try:
+            return await self.circuit_breaker.acquire()
+        except CircuitOpenException as e:
+            if self.exceptions_counter_metric is None:
+                logger.warning(f"exceptions_counter_metric for {self.name} is None. Skipping metric recording")
+            else:
+                self.exceptions_counter_metric.labels("circuit_open").inc()
+
+            self.requests_rejected += 1
+            logger.warning(f"Not requesting {request.url}: {e}")
+            raise
+
+    def release_circuit(self, probe: bool, outcome: str | None, retry_after_seconds: float | None = None) -> None:
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.release(probe, outcome, retry_after_seconds)
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "total": self.requests_total,
+            "accepted": self.requests_accepted,
+            "failed_to_connect": self.requests_failed_to_connect,
+            "failed_to_proxy": self.requests_failed_to_proxy,
+            "timedout": self.requests_timedout,
+            "errored": self.requests_errored,
+            "throttled": self.requests_throttled,
+            "gte_400": self.requests_gte_400,
+            "retries_exhausted": self.requests_retries_exhausted,
+            "rejected": self.requests_rejected,
+            "hedged": self.requests_hedged,
+            "response_time_seconds": self.response_time_seconds_total,
+        }
+
     def log(self, request_time: float | None = None, next_request_allowed_in_seconds: float | None = None) -> None:
         log_msg = (
             f"{self.__class__.__name__}({self.name}): "
@@ -226,7 +412,9 @@ class AsyncRetryingClient(httpx.AsyncClient):
             f"errored {self.requests_errored}, "
             f"throttled {self.requests_throttled}, "
             f">=400 {self.requests_gte_400}, "
-            f"retries exhausted {self.requests_retries_exhausted}"
+            f"retries exhausted {self.requests_retries_exhausted}, "
+            f"rejected {self.requests_rejected}, "
+            f"hedged {self.requests_hedged}"
         )
 
         if request_time is not None:
@@ -238,6 +426,71 @@ class AsyncRetryingClient(httpx.AsyncClient):
         logger.debug(log_msg)
 
 
+class HostConcurrencyLimiter:
+    """
+    Limits the number of concurrent requests to each host. Semaphores are kept per event loop, as tasks may run in
+    loops of their own.
+    """
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self.semaphores: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, asyncio.Semaphore]] = (
+            weakref.WeakKeyDictionary()
+        )
+
+    @asynccontextmanager
+    async def acquire(self, host: str) -> AsyncIterator[None]:
+        semaphores = self.semaphores.setdefault(asyncio.get_running_loop(), {})
+        semaphore = semaphores.setdefault(host, asyncio.Semaphore(self.limit))
+
+        async with semaphore:
+            yield
+
+
+def get_hedge_request(request: httpx.Request) -> httpx.Request:
+    """A copy of a request to send as its hedge, through another proxy than the request if there are several"""
+
+    extensions = {**request.extensions, "avoid_proxy": request.extensions.get("proxy")}
+    return httpx.Request(request.method, request.url, headers=request.headers, extensions=extensions)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Seconds to wait according to a Retry-After header, which is either a number of seconds or an HTTP date"""
+
+    if not value:
+        return None
+
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        logger.warning(f"Invalid Retry-After header: {value}")
+        return None
+
+    return max(retry_at.timestamp() - time.time(), 0.0)
+
+
+event_source_http_cache = HTTPCache.from_settings()
+
+CONNECTION_LIMITS = httpx.Limits(max_connections=1000, max_keepalive_connections=1000)
+
+
+def get_proxy_kwargs(name: str, throttle_response_code: int) -> dict[str, Any]:
+    """Client arguments to send requests through the pool of proxies if there is one, or through the single proxy"""
+
+    if settings.PROXY_URLS:
+        transport = ProxyPoolTransport.from_proxy_urls(
+            name, settings.PROXY_URLS, throttle_response_code=throttle_response_code, limits=CONNECTION_LIMITS
+        )
+        return {"transport": transport}
+
+    return {"proxy": settings.PROXY_URL, "limits": CONNECTION_LIMITS}
+
+
 async_musicbrainz_client = AsyncRetryingClient(
     name="musicbrainz",
     throttle_response_code=503,
@@ -250,8 +503,8 @@ async_musicbrainz_client = AsyncRetryingClient(
     timeout=httpx.Timeout(MUSICBRAINZ_API_REQUEST_TIMEOUT),
     base_url=MUSICBRAINZ_API_BASE_URL,
     headers={"Accept": "application/json", "User-Agent": settings.HTTP_USER_AGENT},
-    proxy=settings.PROXY_URL,
-    limits=httpx.Limits(max_connections=1000, max_keepalive_connections=1000),
+    circuit_breaker=CircuitBreaker.from_settings("musicbrainz"),
+    **get_proxy_kwargs("musicbrainz", 503),
 )
 
 async_songkick_client = AsyncRetryingClient(
@@ -264,8 +517,10 @@ async_songkick_client = AsyncRetryingClient(
     # log_request_details=True,
     base_url=SONGKICK_BASE_URL,
     headers={"User-Agent": settings.HTTP_USER_AGENT},
-    proxy=settings.PROXY_URL,
-    limits=httpx.Limits(max_connections=1000, max_keepalive_connections=1000),
+    circuit_breaker=CircuitBreaker.from_settings("songkick"),
+    http_cache=event_source_http_cache,
+    hedger=RequestHedger.from_settings("songkick"),
+    **get_proxy_kwargs("songkick", 429),
 )
 
 async_bandsintown_client = AsyncRetryingClient(
@@ -279,10 +534,16 @@ async_bandsintown_client = AsyncRetryingClient(
     # log_request_details=True,
     base_url=BANDSINTOWN_BASE_URL,
     headers={"User-Agent": settings.HTTP_USER_AGENT},
-    proxy=settings.PROXY_URL,
-    limits=httpx.Limits(max_connections=1000, max_keepalive_connections=1000),
+    circuit_breaker=CircuitBreaker.from_settings("bandsintown"),
+    http_cache=event_source_http_cache,
+    hedger=RequestHedger.from_settings("bandsintown"),
+    **get_proxy_kwargs("bandsintown", 403),
 )
 
+EVENT_SOURCE_CLIENTS = (async_musicbrainz_client, async_songkick_client, async_bandsintown_client)
+
+redirect_resolution_limiter = HostConcurrencyLimiter(settings.REDIRECT_RESOLUTION_PER_HOST_CONCURRENCY_LIMIT)
+
 
 async def asend_get_request(
     client: AsyncRetryingClient,
@@ -293,7 +554,13 @@ async def asend_get_request(
     redirect_url: bool = False,
     raise_for_lte_300: bool = True,
     follow_redirects: bool = False,
+    extract: Callable[[bytes], Any] | None = None,
 ) -> Any:  # TODO
+    """
+    The second element of the result is what `xpath` selects from the HTML of the response, or what `extract` returns
+    for its raw content, which avoids building a DOM of the whole page. Both are run by the page parser.
+    """
+
     ret_json = None
     ret_xpath = None
     ret_redirect_url = None
@@ -322,12 +589,13 @@ async def asend_get_request(
 
     if xpath:
         try:
-            html = lh.fromstring(response.text)
+            ret_xpath = await parse_page(partial(select_html, xpath, response.encoding or "utf-8"), response.content)
         except Exception as e:
-            raise HTTPClientException(f"Failed to parse HTML data from {url}: {e}") from e
+            raise HTTPClientException(f"Failed to extract data from {url}: {e}") from e
 
+    if extract is not None:
         try:
-            ret_xpath = html.xpath(xpath)
+            ret_xpath = await parse_page(extract, response.content)
         except Exception as e:
             raise HTTPClientException(f"Failed to extract data from {url}: {e}") from e
 
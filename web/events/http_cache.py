@@ -0,0 +1,166 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Self
+
+import httpx
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Eviction removes the least recently used files until the cache is this share of its maximum size
+HTTP_CACHE_EVICTION_TARGET = 0.9
+
+
+@dataclass
+class CachedResponse:
+    etag: str | None
+    last_modified: str | None
+    content_type: str | None
+    content: bytes
+
+    def conditional_headers(self) -> dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def to_response(self, request: httpx.Request) -> httpx.Response:
+        headers = {
+            name: value
+            for name, value in (
+                ("Content-Type", self.content_type),
+                ("ETag", self.etag),
+                ("Last-Modified", self.last_modified),
+            )
+            if value is not None
+        }
+        return httpx.Response(200, headers=headers, content=self.content, request=request)
+
+
+class HTTPCache:
+    """
+    On-disk cache of GET response bodies that carry an ETag or Last-Modified header, to revalidate them with
+    conditional requests. Bodies are stored zlib-compressed under their SHA-256, so identical pages are stored once,
+    and are referenced by small per-URL entries. Once the cache grows over `max_bytes`, the least recently used files
+    are removed. A missing or broken file is a miss, so several processes can share a cache directory.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.size_bytes: int | None = None  # Estimate, recomputed on eviction
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls) -> Self | None:
+        if not settings.EVENT_SOURCE_HTTP_CACHE_ENABLED:
+            return None
+        return cls(settings.EVENT_SOURCE_HTTP_CACHE_DIR, settings.EVENT_SOURCE_HTTP_CACHE_MAX_BYTES)
+
+    def entry_path(self, url: str) -> Path:
+        digest = hashlib.sha256(url.encode()).hexdigest()
+        return self.directory / "entries" / digest[:2] / f"{digest[2:]}.json"
+
+    def body_path(self, digest: str) -> Path:
+        return self.directory / "bodies" / digest[:2] / digest[2:]
+
+    def get(self, url: str) -> CachedResponse | None:
+        entry_path = self.entry_path(url)
+
+        try:
+            entry = json.loads(entry_path.read_bytes())
+            body_path = self.body_path(entry["body"])
+            content = zlib.decompress(body_path.read_bytes())
+            # Mark both as recently used
+            os.utime(entry_path)
+            os.utime(body_path)
+        except FileNotFoundError:
+            return None
+        except (ValueError, KeyError, zlib.error) as e:
+            logger.warning(f"Removing broken HTTP cache entry for {url}: {e}")
+            entry_path.unlink(missing_ok=True)
+            return None
+
+        return CachedResponse(
+            etag=entry["etag"],
+            last_modified=entry["last_modified"],
+            content_type=entry["content_type"],
+            content=content,
+        )
+
+    def put(self, url: str, response: httpx.Response) -> None:
+        digest = hashlib.sha256(response.content).hexdigest()
+        body_path = self.body_path(digest)
+        entry = {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "content_type": response.headers.get("Content-Type"),
+            "body": digest,
+        }
+
+        written_bytes = 0
+        try:
+            if body_path.exists():
+                os.utime(body_path)
+            else:
+                written_bytes += write_atomically(body_path, zlib.compress(response.content))
+            written_bytes += write_atomically(self.entry_path(url), json.dumps(entry).encode())
+        except OSError as e:
+            logger.warning(f"Failed to cache response from {url}: {e}")
+            return
+
+        with self.lock:
+            if self.size_bytes is None:
+                self.size_bytes = self.compute_size()
+            else:
+                self.size_bytes += written_bytes
+
+            if self.size_bytes > self.max_bytes:
+                self.evict()
+
+    def compute_size(self) -> int:
+        return sum(path.stat().st_size for path in self.directory.rglob("*") if path.is_file())
+
+    def evict(self) -> None:
+        files = []
+        for path in self.directory.rglob("*"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if path.is_file():
+                files.append((stat.st_mtime, stat.st_size, path))
+
+        size_bytes = sum(size for _, size, _ in files)
+        target_bytes = self.max_bytes * HTTP_CACHE_EVICTION_TARGET
+        num_evicted = 0
+
+        for _, size, path in sorted(files):
+            if size_bytes <= target_bytes:
+                break
+            path.unlink(missing_ok=True)
+            size_bytes -= size
+            num_evicted += 1
+
+        self.size_bytes = size_bytes
+        logger.info(f"Evicted {num_evicted} files from the HTTP cache, {size_bytes} bytes left")
+
+
+def write_atomically(path: Path, data: bytes) -> int:
+    """Writes through a temporary file, so that concurrent readers never see a partially written file"""
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=path.parent, delete=False) as f:
+        f.write(data)
+    Path(f.name).replace(path)
+    return len(data)
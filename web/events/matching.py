@@ -0,0 +1,98 @@
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+from django.conf import settings
+from rapidfuzz import fuzz, process
+from unidecode import unidecode
+
+from .constants import ALNUM_TABLE
+from .enums import ArtistNameMatchAccuracy
+from .exceptions import HeuristicsException
+
+NAME_VARIANTS_CACHE_SIZE = 65536
+
+
+@dataclass(frozen=True)
+class NameVariants:
+    casefolded: str
+    alnum: str
+    transliterated: str
+    ascii: str
+
+
+@lru_cache(maxsize=NAME_VARIANTS_CACHE_SIZE)
+def get_name_variants(name: str) -> NameVariants:
+    casefolded = name.casefold()
+    return NameVariants(
+        casefolded=casefolded,
+        alnum=casefolded.translate(ALNUM_TABLE),
+        transliterated=unidecode(casefolded),
+        ascii=casefolded.encode("ascii", errors="ignore").decode("ascii"),
+    )
+
+
+def _first_ids(keys: list[str], ids: list[str], skip_empty: bool = True) -> dict[str, str]:
+    # Earlier candidates win, as search results are ordered by relevance
+    first_ids: dict[str, str] = {}
+    for key, id in zip(keys, ids, strict=True):  # noqa: A001
+        if key or not skip_empty:
+            first_ids.setdefault(key, id)
+    return first_ids
+
+
+class ArtistNameMatcher:
+    """
+    Picks the artist whose name best matches a given one from a list of (ID, name) candidates, e.g. search results.
+    Every name is normalised once into all its variants. Exact tiers are dictionary lookups, and fuzzy scoring is a
+    single batched call. Matching tiers, from best to worst: exact, exact alphanumeric, then (advanced only) exact
+    transliterated, exact ASCII and fuzzy.
+    """
+
+    def __init__(self, available_artists: list[tuple[str, str]]) -> None:
+        self.ids = [id for id, _ in available_artists]  # noqa: A001
+        self.variants = [get_name_variants(name) for _, name in available_artists]
+
+        self.by_casefolded = _first_ids([v.casefolded for v in self.variants], self.ids)
+        self.by_alnum = _first_ids([v.alnum for v in self.variants], self.ids)
+        self.by_transliterated = _first_ids([v.transliterated for v in self.variants], self.ids, skip_empty=False)
+        self.by_ascii = _first_ids([v.ascii for v in self.variants], self.ids)
+
+    def match_simple(self, artist_name: str) -> tuple[str, ArtistNameMatchAccuracy]:
+        variants = get_name_variants(artist_name)
+
+        if (id := self.by_casefolded.get(variants.casefolded)) is not None:  # noqa: A001
+            return id, ArtistNameMatchAccuracy.exact
+
+        if variants.alnum and (id := self.by_alnum.get(variants.alnum)) is not None:  # noqa: A001
+            return id, ArtistNameMatchAccuracy.exact_alnum
+
+        raise HeuristicsException(f"Artist '{artist_name}' not found")
+
+    def match_advanced(self, artist_name: str) -> tuple[str, ArtistNameMatchAccuracy]:
+        try:
+            return self.match_simple(artist_name)
+        except HeuristicsException:
+            pass
+
+        variants = get_name_variants(artist_name)
+
+        if (id := self.by_transliterated.get(variants.transliterated)) is not None:  # noqa: A001
+            return id, ArtistNameMatchAccuracy.exact_ascii
+
+        if not variants.ascii or not self.by_ascii:
+            raise HeuristicsException(f"Artist '{artist_name}' not found")
+
+        if (id := self.by_ascii.get(variants.ascii)) is not None:  # noqa: A001
+            return id, ArtistNameMatchAccuracy.exact_ascii
+
+        if (index := self.first_fuzzy_match(variants.ascii)) is not None:
+            return self.ids[index], ArtistNameMatchAccuracy.fuzzy
+
+        raise HeuristicsException(f"Artist '{artist_name}' not found")
+
+    def first_fuzzy_match(self, name: str) -> int | None:
+        scores = process.cdist([name], [v.casefolded for v in self.variants], scorer=fuzz.ratio, dtype=np.float64)[0]
+        # Scores are rounded half to even like thefuzz does, so the threshold means the same as before
+        matches = np.flatnonzero(np.round(scores) >= settings.EVENT_ARTIST_NAME_MATCH_THRESHOLD)
+        return int(matches[0]) if matches.size else None
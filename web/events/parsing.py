@@ -0,0 +1,61 @@
+"""
+Parsing of event source pages in a pool of processes, so that the event loop only does I/O. Parsers take the raw
+page bytes and return plain data, which is all that crosses the process boundary, so they must be module-level
+functions (or partials of them). Pages are parsed inline, on the event loop, unless EVENT_PAGE_PARSER_PROCESS_POOL is
+enabled, which is not worth it for small deployments.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+from collections.abc import Callable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import cache
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+@cache
+def get_parser_executor() -> ProcessPoolExecutor | None:
+    if not settings.EVENT_PAGE_PARSER_PROCESS_POOL:
+        return None
+
+    if multiprocessing.current_process().daemon:
+        # E.g. a django-q worker with daemonize_workers enabled
+        logger.warning("Daemonic processes can't start page parser processes. Parsing pages inline")
+        return None
+
+    logger.info(f"Starting {settings.EVENT_PAGE_PARSER_PROCESSES} page parser processes")
+    # Forking a process with running threads and event loops is unsafe
+    return ProcessPoolExecutor(
+        max_workers=settings.EVENT_PAGE_PARSER_PROCESSES, mp_context=multiprocessing.get_context("spawn")
+    )
+
+
+async def parse_page[T](parser: Callable[[bytes], T], content: bytes) -> T:
+    executor = get_parser_executor()
+    if executor is None:
+        return parser(content)
+
+    try:
+        # The processes are started on submission, which fails if they can't be
+        future = asyncio.get_running_loop().run_in_executor(executor, parser, content)
+    except Exception:
+        logger.exception("Could not start page parser processes, retrying with the next page. Parsing the page inline")
+        restart_parser_executor(executor)
+        return parser(content)
+
+    try:
+        return await future
+    except BrokenProcessPool:
+        logger.exception("Page parser processes died, restarting them. Parsing the page inline")
+        restart_parser_executor(executor)
+        return parser(content)
+
+
+def restart_parser_executor(executor: ProcessPoolExecutor) -> None:
+    get_parser_executor.cache_clear()
+    executor.shutdown(wait=False, cancel_futures=True)
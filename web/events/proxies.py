@@ -0,0 +1,133 @@
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+from typing import Any, Self
+
+import httpx
+from django.conf import settings
+
+from web.metrics import EVENT_SOURCE_PROXY_HEALTH, EVENT_SOURCE_PROXY_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+# Weight of the latest request in the health score of a proxy
+PROXY_HEALTH_DECAY = 0.1
+# The health score of a proxy recovers toward 1.0 while it is not used, otherwise a proxy that failed once would not
+# be picked again as long as another one never failed
+PROXY_HEALTH_RECOVERY_HALF_LIFE_SECONDS = 60
+
+
+@dataclass
+class ProxyHealth:
+    url: str
+    label: str  # Host and port only, proxy URLs may contain credentials
+    score: float = 1.0  # Exponentially weighted share of requests that were neither throttled nor failed
+    consecutive_throttles: int = 0
+    cooldown_until: float = 0.0
+    last_outcome_at: float = field(default_factory=time.monotonic)
+    in_flight: int = 0
+
+    def current_score(self, now: float) -> float:
+        recovery = 0.5 ** ((now - self.last_outcome_at) / PROXY_HEALTH_RECOVERY_HALF_LIFE_SECONDS)
+        return 1.0 - (1.0 - self.score) * recovery
+
+
+class ProxyPoolTransport(httpx.AsyncBaseTransport):
+    """
+    Sends each request to an event source through the healthiest of several proxies. Proxies that get throttled
+    cool down (are not used unless all of them are cooling down) for a time that doubles with every consecutive
+    throttle. Health is tracked per transport, so per source, as each source throttles on its own, and recovers while
+    a proxy is not used.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        transports: dict[str, httpx.AsyncBaseTransport],
+        throttle_response_code: int | None = None,
+    ) -> None:
+        if not transports:
+            raise ValueError("At least one proxy is required")
+
+        self.source = source
+        self.transports = transports
+        self.throttle_response_code = throttle_response_code
+        self.proxies = [ProxyHealth(url=url, label=get_proxy_label(url)) for url in transports]
+
+        for proxy in self.proxies:
+            EVENT_SOURCE_PROXY_HEALTH.labels(self.source, proxy.label).set(proxy.score)
+
+    @classmethod
+    def from_proxy_urls(
+        cls, source: str, proxy_urls: list[str], throttle_response_code: int | None = None, **transport_kwargs: Any
+    ) -> Self:
+        transports: dict[str, httpx.AsyncBaseTransport] = {
+            url: httpx.AsyncHTTPTransport(proxy=url, **transport_kwargs) for url in proxy_urls
+        }
+        return cls(source, transports, throttle_response_code)
+
+    def pick(self, avoid_url: str | None = None) -> ProxyHealth:
+        now = time.monotonic()
+
+        available = [proxy for proxy in self.proxies if proxy.cooldown_until <= now]
+        # E.g. the proxy of the request that a hedge request is sent for, unless it is the only one left
+        available = [proxy for proxy in available if proxy.url != avoid_url] or available
+        if not available:
+            return min(self.proxies, key=lambda proxy: proxy.cooldown_until)
+
+        # Equally healthy proxies share the load
+        return max(
+            available,
+            key=lambda proxy: (round(proxy.current_score(now), 1), -proxy.in_flight, random.random()),  # noqa: S311
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        proxy = self.pick(request.extensions.get("avoid_proxy"))
+        proxy.in_flight += 1
+        request.extensions["proxy"] = proxy.url
+
+        try:
+            response = await self.transports[proxy.url].handle_async_request(request)
+        except Exception:
+            self.record(proxy, "error")
+            raise
+        finally:
+            proxy.in_flight -= 1
+
+        if self.throttle_response_code is not None and response.status_code == self.throttle_response_code:
+            self.record(proxy, "throttled")
+        elif response.status_code >= 500:
+            self.record(proxy, "error")
+        else:
+            self.record(proxy, "ok")
+
+        return response
+
+    def record(self, proxy: ProxyHealth, outcome: str) -> None:
+        now = time.monotonic()
+        proxy.score = (1 - PROXY_HEALTH_DECAY) * proxy.current_score(now) + PROXY_HEALTH_DECAY * (outcome == "ok")
+        proxy.last_outcome_at = now
+
+        if outcome == "throttled":
+            cooldown_seconds = min(
+                settings.PROXY_COOLDOWN_SECONDS * 2**proxy.consecutive_throttles, settings.PROXY_MAX_COOLDOWN_SECONDS
+            )
+            proxy.consecutive_throttles += 1
+            proxy.cooldown_until = now + cooldown_seconds
+            logger.warning(f"Proxy {proxy.label} throttled by {self.source}, cooling down for {cooldown_seconds}s")
+        elif outcome == "ok":
+            proxy.consecutive_throttles = 0
+            proxy.cooldown_until = 0.0
+
+        EVENT_SOURCE_PROXY_REQUESTS.labels(self.source, proxy.label, outcome).inc()
+        EVENT_SOURCE_PROXY_HEALTH.labels(self.source, proxy.label).set(proxy.score)
+
+    async def aclose(self) -> None:
+        for transport in self.transports.values():
+            await transport.aclose()
+
+
+def get_proxy_label(proxy_url: str) -> str:
+    url = httpx.URL(proxy_url)
+    return f"{url.host}:{url.port}" if url.port else url.host
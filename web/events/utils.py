@@ -1,101 +1,42 @@
+import hashlib
+import json
 import logging
 import unicodedata
-from typing import TYPE_CHECKING
+from datetime import UTC, date, datetime, time, timedelta
+from functools import cache, lru_cache
+from typing import TYPE_CHECKING, Any
 
-import country_converter as coco
 from django.conf import settings
-from thefuzz import fuzz
 from unidecode import unidecode
 
-from .constants import ALNUM_TABLE
+from .countries import convert_country_name
 from .enums import ArtistNameMatchAccuracy, EventDataSource
-from .exceptions import HeuristicsException
+from .matching import NAME_VARIANTS_CACHE_SIZE, ArtistNameMatcher
 
 if TYPE_CHECKING:
-    from .data import Event
+    from .data import KnownEvent
 
 logger = logging.getLogger(__name__)
 
-cc = coco.CountryConverter()
-
 
 def get_normalized_country_name(country_name: str | None) -> str | None:
     if country_name is None:
         return None
 
-    normalized_name: str | None = cc.convert(country_name, to="name_short", not_found=None)  # pyright: ignore[reportArgumentType,reportAssignmentType]
+    normalized_name: str | None = convert_country_name(country_name)  # type: ignore[assignment]
     return normalized_name
 
 
 def find_best_artist_name_match_simple(
     artist_name: str, available_artists: list[tuple[str, str]]
 ) -> tuple[str, ArtistNameMatchAccuracy]:
-    original_artist_name = artist_name
-    artist_name = artist_name.casefold()
-    available_artists = [(_, name.casefold()) for _, name in available_artists]
-
-    if matches := [(_, name) for _, name in available_artists if name and artist_name == name]:
-        id, _ = matches[0]  # noqa: A001
-        return id, ArtistNameMatchAccuracy.exact
-
-    artist_name = artist_name.translate(ALNUM_TABLE)
-    if not artist_name:
-        raise HeuristicsException(f"Artist '{original_artist_name}' not found")
-
-    transformed = [(_, name.translate(ALNUM_TABLE)) for _, name in available_artists]
-    transformed = [(_, name) for _, name in transformed if name]
-    if not transformed:
-        raise HeuristicsException(f"Artist '{original_artist_name}' not found")
-
-    if matches := [(_, name) for _, name in transformed if artist_name == name]:
-        id, _ = matches[0]  # noqa: A001
-        return id, ArtistNameMatchAccuracy.exact_alnum
-
-    raise HeuristicsException(f"Artist '{original_artist_name}' not found")
+    return ArtistNameMatcher(available_artists).match_simple(artist_name)
 
 
 def find_best_artist_name_match_advanced(
     artist_name: str, available_artists: list[tuple[str, str]]
 ) -> tuple[str, ArtistNameMatchAccuracy]:
-    try:
-        return find_best_artist_name_match_simple(artist_name, available_artists)
-    except HeuristicsException:
-        pass
-
-    # TODO: This repeats what's already been done in find_best_artist_name_match_simple
-    original_artist_name = artist_name
-    artist_name = artist_name.casefold()
-    available_artists = [(_, name.casefold()) for _, name in available_artists]
-
-    transliterated_artist_name = unidecode(artist_name)
-    transliterated = [(_, unidecode(name)) for _, name in available_artists]
-
-    if matches := [(_, name) for _, name in transliterated if transliterated_artist_name == name]:
-        id, _ = matches[0]  # noqa: A001
-        return id, ArtistNameMatchAccuracy.exact_ascii
-
-    artist_name = artist_name.encode("ascii", errors="ignore").decode("ascii")
-    if not artist_name:
-        raise HeuristicsException(f"Artist '{original_artist_name}' not found")
-
-    transformed = [(_, name.encode("ascii", errors="ignore").decode("ascii")) for _, name in available_artists]
-    transformed = [(_, name) for _, name in transformed if name]
-    if not transformed:
-        raise HeuristicsException(f"Artist '{original_artist_name}' not found")
-
-    if matches := [(_, name) for _, name in transformed if artist_name == name]:
-        id, _ = matches[0]  # noqa: A001
-        return id, ArtistNameMatchAccuracy.exact_ascii
-
-    if matches := [
-        (_, name)
-        for _, name in available_artists
-        if fuzz.ratio(artist_name, name) >= settings.EVENT_ARTIST_NAME_MATCH_THRESHOLD
-    ]:
-        id, _ = matches[0]  # noqa: A001
-        return id, ArtistNameMatchAccuracy.fuzzy
-
-    raise HeuristicsException(f"Artist '{original_artist_name}' not found")
+    return ArtistNameMatcher(available_artists).match_advanced(artist_name)
 
     # from cyrtranslit import to_latin
     # from transliterate import translit
@@ -107,22 +48,36 @@ def find_best_artist_name_match_advanced(
     # [(_, to_latin(name, "ua")) for _, name in filtered]
 
 
+@lru_cache(maxsize=NAME_VARIANTS_CACHE_SIZE)
 def normalize_string(string: str) -> str:
     return replace_unicode_characters(string.strip().casefold())
 
 
+@lru_cache(maxsize=NAME_VARIANTS_CACHE_SIZE)
 def replace_unicode_characters(string: str) -> str:
+    if string.isascii():
+        return string
+    return "".join([replace_unicode_character(char) for char in string])
+
+
+@cache
+def replace_unicode_character(char: str) -> str:
     # https://www.unicode.org/reports/tr44/
     # https://www.compart.com/en/unicode/category
     # Mark, Number, Punctuation, Symbol
     # https://www.unicode.org/reports/tr44/#General_Category_Values
-    return "".join(
-        [unidecode(char) if unicodedata.category(char).startswith(("M", "N", "P", "S")) else char for char in string]
-    )
+    return unidecode(char) if unicodedata.category(char).startswith(("M", "N", "P", "S")) else char
 
 
-def should_fetch_event(event_url: str, event_source: EventDataSource, events: dict[str, "Event"]) -> bool:
-    existing_event = events.get(event_url)
+def should_fetch_event(
+    event_url: str, event_source: EventDataSource, event_data: dict[str, Any], known_events: dict[str, "KnownEvent"]
+) -> bool:
+    """
+    Whether to fetch the detail page of an event from an artist's calendar: if the event is new, if its calendar entry
+    changed since it was fetched, or if it has no ticket or stream URLs yet and is due to be re-checked for them
+    """
+
+    existing_event = known_events.get(event_url)
 
     if existing_event is None:
         return True
@@ -131,4 +86,31 @@ def should_fetch_event(event_url: str, event_source: EventDataSource, events: di
         logger.error("WTF!?")  # TODO: Eh?
         return True
 
-    return not existing_event.tickets_urls and not existing_event.stream_urls
+    if existing_event.listing_hash != get_listing_hash(event_data):
+        return True
+
+    if existing_event.has_urls:
+        return False
+
+    if existing_event.detail_checked_at is None:
+        return True
+
+    now = datetime.now(tz=UTC)
+    return now >= existing_event.detail_checked_at + get_detail_recheck_interval(existing_event.date, now)
+
+
+def get_listing_hash(event_data: dict[str, Any]) -> str:
+    """Hash of an event's calendar entry. The tracking query of its URL changes between page loads, so it's left out"""
+
+    event_data = {**event_data, "url": event_data["url"].split("?")[0]}
+    return hashlib.sha256(json.dumps(event_data, sort_keys=True).encode()).hexdigest()
+
+
+def get_detail_recheck_interval(event_date: date, now: datetime) -> timedelta:
+    """10% of the time until the event, so events are re-checked more often as they approach"""
+
+    time_until_event = datetime.combine(event_date, time.min, tzinfo=UTC) - now
+    return min(
+        max(time_until_event / 10, timedelta(hours=settings.EVENT_DETAIL_RECHECK_MIN_INTERVAL_HOURS)),
+        timedelta(hours=settings.EVENT_DETAIL_RECHECK_MAX_INTERVAL_HOURS),
+    )
@@ -0,0 +1,52 @@
+import math
+
+from django.contrib.gis.geos import Point
+from django.db import models
+from django.db.models.expressions import RawSQL
+
+EARTH_RADIUS_KM = 6371.0088
+BOUNDING_BOX_MARGIN = 1.01
+
+
+def bounding_box(point: Point, distance_km: float) -> tuple[float, float, float, float]:
+    """
+    (xmin, ymin, xmax, ymax) of a box that contains every point within `distance_km` of `point`. The box spans all
+    longitudes if it would reach a pole or cross the antimeridian.
+    """
+
+    # Exact distances are geodesic (on the ellipsoid), which differ from the spherical ones by well under 1%
+    angular_distance = distance_km * BOUNDING_BOX_MARGIN / EARTH_RADIUS_KM
+    lat_delta = math.degrees(angular_distance)
+    ymin = max(point.y - lat_delta, -90.0)
+    ymax = min(point.y + lat_delta, 90.0)
+
+    if ymin <= -90.0 or ymax >= 90.0:
+        return -180.0, ymin, 180.0, ymax
+
+    lon_delta = math.degrees(math.asin(min(1.0, math.sin(angular_distance) / math.cos(math.radians(point.y)))))
+    xmin = point.x - lon_delta
+    xmax = point.x + lon_delta
+
+    if xmin < -180.0 or xmax > 180.0:
+        return -180.0, ymin, 180.0, ymax
+
+    return xmin, ymin, xmax, ymax
+
+
+def within_bounding_box(model: type[models.Model], column: str, point: Point, distance_km: float) -> models.Q:
+    """
+    Lookup of the rows whose geometry intersects the bounding box, done in the SpatiaLite R*Tree of the column.
+    Distance lookups on their own are computed for every row, this narrows the candidates down first.
+    """
+
+    table = model._meta.db_table
+    pk_column = model._meta.pk.column  # pyright: ignore[reportOptionalMemberAccess]
+
+    return models.Q(
+        pk__in=RawSQL(  # noqa: S611
+            f'SELECT "{pk_column}" FROM "{table}" WHERE ROWID IN ('  # noqa: S608
+            "SELECT ROWID FROM SpatialIndex WHERE f_table_name = %s AND f_geometry_column = %s "
+            "AND search_frame = BuildMbr(%s, %s, %s, %s, %s))",
+            (table, column, *bounding_box(point, distance_km), point.srid),
+        )
+    )
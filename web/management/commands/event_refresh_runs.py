@@ -0,0 +1,48 @@
+import json
+from typing import Any, cast
+
+from django.core.management.base import BaseCommand, CommandError
+
+from web.models import EventRefreshRun
+
+
+class Command(BaseCommand):
+    help = "Show reports of event refresh runs"
+
+    def add_arguments(self, parser: Any) -> None:
+        parser.add_argument("--run-id", type=str, help="The ID of the run whose full report to show")
+        parser.add_argument("--limit", type=int, default=10, help="The number of most recent runs to show")
+
+    def handle(self, *_: Any, **options: str) -> None:
+        run_id: str | None = options.get("run_id")
+        limit: int = cast("int", options.get("limit", 10))
+
+        if run_id:
+            try:
+                run = EventRefreshRun.objects.get(pk=run_id)
+            except EventRefreshRun.DoesNotExist as e:
+                raise CommandError(f"Run with ID {run_id} does not exist") from e
+
+            self.stdout.write(
+                f"Run {run.id}\n"
+                f"Started: {run.started_at}\n"
+                f"Finished: {run.finished_at}\n"
+                f"Duration: {run.duration_seconds} seconds\n"
+                f"Forced refetch: {run.force_refetch}\n"
+                f"Artists: {run.num_artists} (succeeded {run.num_artists_succeeded}, failed {run.num_artists_failed})\n"
+                f"Events: {run.num_events} (created {run.num_events_created}, updated {run.num_events_updated})\n"
+                f"Event URLs: {run.num_event_urls}\n"
+                f"URLs shortened: {run.num_urls_shortened}\n"
+                f"Requests: {json.dumps(run.requests, indent=2)}\n"
+                f"Failures: {json.dumps(run.failures, indent=2)}"
+            )
+            return
+
+        for run in EventRefreshRun.objects.order_by("-started_at")[:limit]:
+            num_requests = sum(stats.get("total", 0) for stats in run.requests.values())
+            self.stdout.write(
+                f"{run.id} started {run.started_at:%Y-%m-%d %H:%M:%S}, took {run.duration_seconds} seconds: "
+                f"artists {run.num_artists_succeeded}/{run.num_artists}, "
+                f"events created {run.num_events_created}, updated {run.num_events_updated}, "
+                f"requests {num_requests}, failures {sum(run.failures.values())}"
+            )
@@ -0,0 +1,84 @@
+import bz2
+import gzip
+import json
+import lzma
+import tarfile
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Any, cast
+
+from django.core.management.base import BaseCommand, CommandError
+
+from web.models import MusicBrainzIndexEntry
+
+# The member of the artist JSON dump archive (artist.tar.xz) with the artists, one JSON object per line
+ARTIST_DUMP_MEMBER = "mbdump/artist"
+
+OPENERS = {".xz": lzma.open, ".gz": gzip.open, ".bz2": bz2.open}
+
+
+class Command(BaseCommand):
+    help = (
+        "Import artists with Spotify URLs into the local MusicBrainz index from a MusicBrainz artist JSON dump "
+        "(artist.tar.xz), or from a file of artists in its format, one JSON object per line (optionally compressed)"
+    )
+
+    def add_arguments(self, parser: Any) -> None:
+        parser.add_argument("path", type=Path, help="The dump archive or the file of artists to import")
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            default=False,
+            help=(
+                "The file has all artists, remove index entries of artists that are not in it. Otherwise it may have "
+                "just the artists that changed since the last import"
+            ),
+        )
+        parser.add_argument("--batch-size", type=int, default=1000, help="The number of artists to upsert at once")
+
+    def handle(self, *_: Any, **options: Any) -> None:
+        path = cast("Path", options["path"])
+        full = cast("bool", options["full"])
+
+        if not path.is_file():
+            raise CommandError(f"File {path} does not exist")
+
+        with open_artists_file(path) as f:
+            num_upserted, num_removed = MusicBrainzIndexEntry.import_artists(
+                read_artists(f, spotify_only=full), full=full, batch_size=options["batch_size"]
+            )
+
+        self.stdout.write(f"Upserted {num_upserted} and removed {num_removed} MusicBrainz index entries")
+
+
+@contextmanager
+def open_artists_file(path: Path) -> Iterator[IO[bytes]]:
+    if path.name.endswith((".tar", ".tar.xz", ".tar.gz", ".tar.bz2")):
+        # Stream mode, to not seek through the compressed archive
+        with tarfile.open(path, "r|*") as archive:
+            for member in archive:
+                if member.name == ARTIST_DUMP_MEMBER:
+                    f = archive.extractfile(member)
+                    if f is None:
+                        break
+                    yield f
+                    return
+        raise CommandError(f"Archive {path} has no {ARTIST_DUMP_MEMBER}")
+
+    opener = OPENERS.get(path.suffix, open)
+    with opener(path, "rb") as f:
+        yield cast("IO[bytes]", f)
+
+
+def read_artists(f: IO[bytes], spotify_only: bool = False) -> Iterator[dict[str, Any]]:
+    """
+    Artists of a dump file. With `spotify_only`, artists without Spotify URLs are skipped before they are decoded,
+    which is most of them
+    """
+
+    for line in f:
+        if not line.strip() or (spotify_only and b"open.spotify.com" not in line):
+            continue
+        artist: dict[str, Any] = json.loads(line)
+        yield artist
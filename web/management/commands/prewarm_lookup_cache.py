@@ -0,0 +1,37 @@
+from typing import Any, cast
+
+from asgiref.sync import async_to_sync
+from django.core.management.base import BaseCommand
+
+from web.events.data import MusicBrainzArtist
+from web.events.exceptions import MusicBrainzException
+from web.models import EventArtist, LookupCacheEntry
+
+
+class Command(BaseCommand):
+    help = "Look up all tracked artists in MusicBrainz, so that their lookups are cached"
+
+    def add_arguments(self, parser: Any) -> None:
+        parser.add_argument(
+            "--artist-id", type=str, action="append", help="The Spotify ID of an artist to look up (repeatable)"
+        )
+
+    def handle(self, *_: Any, **options: str) -> None:
+        artist_ids: list[str] | None = cast("list[str] | None", options.get("artist_id"))
+
+        num_purged = async_to_sync(LookupCacheEntry.purge_expired)()
+        self.stdout.write(f"Purged {num_purged} expired cache entries")
+
+        if not artist_ids:
+            artist_ids = list(EventArtist.objects.values_list("artist__spotify_id", flat=True))
+
+        num_found = 0
+        for artist_id in artist_ids:
+            try:
+                async_to_sync(MusicBrainzArtist.find_by_spotify_url)(f"https://open.spotify.com/artist/{artist_id}")
+            except MusicBrainzException as e:
+                self.stderr.write(f"Artist {artist_id}: {e}")
+            else:
+                num_found += 1
+
+        self.stdout.write(f"Artists found in MusicBrainz: {num_found} of {len(artist_ids)}")
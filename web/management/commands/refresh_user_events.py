@@ -0,0 +1,15 @@
+from typing import Any
+
+from django.core.management.base import BaseCommand
+
+from web.models import User, UserEvent
+
+
+class Command(BaseCommand):
+    help = "Rebuild the table of upcoming events relevant to each user"
+
+    def handle(self, *_: Any, **__: Any) -> None:
+        for user in User.objects.all():
+            UserEvent.refresh_for_user(user)
+
+        self.stdout.write(f"Relevant events: {UserEvent.objects.count()}")
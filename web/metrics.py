@@ -1,4 +1,4 @@
-from prometheus_client import Counter, Histogram, Summary
+from prometheus_client import Counter, Gauge, Histogram, Summary
 
 SPOTIFY_API_RESPONSE_TIME_SECONDS = Histogram(
     name="spotify_api_response_time_seconds",
@@ -60,7 +60,7 @@ MUSICBRAINZ_API_EXCEPTIONS = Counter(
     name="musicbrainz_exceptions",
     documentation=(
         "Exceptions raised while calling MusicBrainz API, "
-        "by exception type (connect, proxy, timeout, retries_exceeded, other)"
+        "by exception type (connect, proxy, timeout, retries_exceeded, circuit_open, other)"
     ),
     labelnames=["type"],
 )
@@ -75,6 +75,12 @@ MUSICBRAINZ_API_REQUEST_DELAY_TIME_SECONDS = Histogram(
     documentation="Time spent waiting to send the next MusicBrainz API request (to avoid being throttled) in seconds",
 )
 
+MUSICBRAINZ_URL_LOOKUP_BATCH_SIZE = Histogram(
+    name="musicbrainz_url_lookup_batch_size",
+    documentation="Number of URLs looked up in one MusicBrainz API request",
+    buckets=(1, 2, 5, 10, 20, 30, 40, 50),
+)
+
 SONGKICK_API_RESPONSE_TIME_SECONDS = Histogram(
     name="songkick_api_response_time_seconds",
     documentation="Songkick API response time in seconds",
@@ -90,7 +96,7 @@ SONGKICK_API_EXCEPTIONS = Counter(
     name="songkick_exceptions",
     documentation=(
         "Exceptions raised while calling Songkick API, "
-        "by exception type (connect, proxy, timeout, retries_exceeded, other)"
+        "by exception type (connect, proxy, timeout, retries_exceeded, circuit_open, other)"
     ),
     labelnames=["type"],
 )
@@ -110,7 +116,7 @@ BANDSINTOWN_API_EXCEPTIONS = Counter(
     name="bandsintown_exceptions",
     documentation=(
         "Exceptions raised while calling Bandsintown API, "
-        "by exception type (connect, proxy, timeout, retries_exceeded, other)"
+        "by exception type (connect, proxy, timeout, retries_exceeded, circuit_open, other)"
     ),
     labelnames=["type"],
 )
@@ -125,3 +131,95 @@ TASK_RUNTIME_SECONDS = Histogram(
     documentation="Time spent running a task in seconds, by task",
     labelnames=["task"],
 )
+
+EMAIL_OUTBOX_MESSAGES = Counter(
+    name="email_outbox_messages",
+    documentation="Outbox emails processed by the sender, by outcome (sent, retried, failed)",
+    labelnames=["status"],
+)
+
+EVENT_REFRESH_RUN_DURATION_SECONDS = Gauge(
+    name="event_refresh_run_duration_seconds",
+    documentation="Duration of the latest event refresh run in seconds",
+    multiprocess_mode="mostrecent",
+)
+
+EVENT_REFRESH_RUN_ARTISTS = Gauge(
+    name="event_refresh_run_artists",
+    documentation="Artists processed by the latest event refresh run, by outcome (succeeded, failed)",
+    labelnames=["outcome"],
+    multiprocess_mode="mostrecent",
+)
+
+EVENT_REFRESH_RUN_EVENTS = Gauge(
+    name="event_refresh_run_events",
+    documentation="Events of the latest event refresh run, by type (created, updated, total)",
+    labelnames=["type"],
+    multiprocess_mode="mostrecent",
+)
+
+EVENT_REFRESH_RUN_URLS = Gauge(
+    name="event_refresh_run_urls",
+    documentation="URLs of the latest event refresh run, by type (event, shortened)",
+    labelnames=["type"],
+    multiprocess_mode="mostrecent",
+)
+
+EVENT_REFRESH_RUN_REQUESTS = Gauge(
+    name="event_refresh_run_requests",
+    documentation=(
+        "Requests sent to event sources during the latest event refresh run, by source and stat "
+        "(total, accepted, failed_to_connect, failed_to_proxy, timedout, errored, throttled, gte_400, "
+        "retries_exhausted, rejected, hedged, response_time_seconds)"
+    ),
+    labelnames=["source", "stat"],
+    multiprocess_mode="mostrecent",
+)
+
+EVENT_REFRESH_RUN_FAILURES = Gauge(
+    name="event_refresh_run_failures",
+    documentation="Artists that failed to refresh during the latest event refresh run, by exception type",
+    labelnames=["type"],
+    multiprocess_mode="mostrecent",
+)
+
+EVENT_SOURCE_PROXY_REQUESTS = Counter(
+    name="event_source_proxy_requests",
+    documentation="Requests sent through pooled proxies, by source, proxy and outcome (ok, throttled, error)",
+    labelnames=["source", "proxy", "outcome"],
+)
+
+EVENT_SOURCE_PROXY_HEALTH = Gauge(
+    name="event_source_proxy_health",
+    documentation="Health score (0 to 1) of proxies, by source and proxy",
+    labelnames=["source", "proxy"],
+    multiprocess_mode="mostrecent",
+)
+
+EVENT_SOURCE_CIRCUIT_BREAKER_STATE = Gauge(
+    name="event_source_circuit_breaker_state",
+    documentation="State of the circuit breaker of event sources (0 closed, 1 half-open, 2 open), by source",
+    labelnames=["source"],
+    multiprocess_mode="mostrecent",
+)
+
+EVENT_SOURCE_HTTP_CACHE_REQUESTS = Counter(
+    name="event_source_http_cache_requests",
+    documentation="GET requests to event sources through the HTTP cache, by source and result (hit, miss)",
+    labelnames=["source", "result"],
+)
+
+EVENT_SOURCE_HEDGED_REQUESTS = Counter(
+    name="event_source_hedged_requests",
+    documentation=(
+        "Slow requests to event sources that were hedged, by source and result "
+        "(primary_won, hedge_won, failed, over_budget - not hedged as the budget was used up)"
+    ),
+    labelnames=["source", "result"],
+)
+
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    name="event_loop_lag_seconds",
+    documentation="How late the event loop resumed a coroutine that was due in seconds, by task",
+    labelnames=["task"],
+)
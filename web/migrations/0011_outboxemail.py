@@ -0,0 +1,43 @@
+# Generated by Django 5.2.8 on 2026-10-19 09:12
+
+import uuid
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("web", "0010_user_settings"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OutboxEmail",
+            fields=[
+                ("id", models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("recipient", models.EmailField(max_length=254)),
+                ("subject", models.CharField(max_length=200)),
+                ("html_message", models.TextField()),
+                ("message_hash", models.CharField(max_length=64)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[("pending", "pending"), ("sent", "sent"), ("failed", "failed")],
+                        default="pending",
+                        max_length=50,
+                    ),
+                ),
+                ("attempts", models.IntegerField(default=0)),
+                ("next_attempt_at", models.DateTimeField()),
+                ("last_error", models.TextField(null=True)),
+                ("sent_at", models.DateTimeField(null=True)),
+                ("event_updates", models.ManyToManyField(related_name="outbox_emails", to="web.eventupdate")),
+                ("playlist_updates", models.ManyToManyField(related_name="outbox_emails", to="web.playlistupdate")),
+            ],
+            options={
+                "indexes": [models.Index(fields=["status", "next_attempt_at"], name="outbox_email_status_next_idx")],
+            },
+        ),
+    ]
@@ -0,0 +1,16 @@
+# Generated by Django 5.2.8 on 2026-10-19 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("web", "0011_outboxemail"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="event",
+            index=models.Index(fields=["artist", "date"], name="event_artist_date_idx"),
+        ),
+    ]
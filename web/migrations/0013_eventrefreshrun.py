@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-19 11:20
+
+import uuid
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("web", "0012_event_artist_date_idx"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="EventRefreshRun",
+            fields=[
+                ("id", models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("started_at", models.DateTimeField()),
+                ("finished_at", models.DateTimeField(null=True)),
+                ("force_refetch", models.BooleanField(default=False)),
+                ("num_artists", models.IntegerField(default=0)),
+                ("num_artists_succeeded", models.IntegerField(default=0)),
+                ("num_artists_failed", models.IntegerField(default=0)),
+                ("num_events_created", models.IntegerField(default=0)),
+                ("num_events_updated", models.IntegerField(default=0)),
+                ("num_events", models.IntegerField(default=0)),
+                ("num_event_urls", models.IntegerField(default=0)),
+                ("num_urls_shortened", models.IntegerField(default=0)),
+                ("requests", models.JSONField(default=dict)),
+                ("failures", models.JSONField(default=dict)),
+            ],
+        ),
+    ]
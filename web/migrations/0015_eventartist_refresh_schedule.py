@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-19 14:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("web", "0014_userevent"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="eventartist",
+            name="last_changed_at",
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name="eventartist",
+            name="last_fetched_at",
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name="eventartist",
+            name="next_fetch_at",
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name="eventartist",
+            name="unchanged_fetches",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name="eventartist",
+            index=models.Index(fields=["next_fetch_at"], name="event_artist_next_fetch_idx"),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:21
+
+import uuid
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("web", "0015_eventartist_refresh_schedule"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LookupCacheEntry",
+            fields=[
+                ("id", models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "type",
+                    models.CharField(
+                        choices=[
+                            ("musicbrainz_url", "musicbrainz_url"),
+                            ("musicbrainz_artist", "musicbrainz_artist"),
+                            ("redirect", "redirect"),
+                        ],
+                        max_length=50,
+                    ),
+                ),
+                ("key", models.CharField(max_length=2000)),
+                ("value", models.JSONField(null=True)),
+                ("expires_at", models.DateTimeField()),
+            ],
+            options={
+                "indexes": [models.Index(fields=["expires_at"], name="lookup_cache_entry_expires_idx")],
+                "constraints": [models.UniqueConstraint(fields=("type", "key"), name="lookup_cache_entry_unique")],
+            },
+        ),
+    ]
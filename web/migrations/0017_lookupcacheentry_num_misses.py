@@ -0,0 +1,31 @@
+# Generated by Django 5.2.8 on 2026-10-19 15:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("web", "0016_lookupcacheentry"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="lookupcacheentry",
+            name="num_misses",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name="lookupcacheentry",
+            name="type",
+            field=models.CharField(
+                choices=[
+                    ("musicbrainz_url", "musicbrainz_url"),
+                    ("musicbrainz_artist", "musicbrainz_artist"),
+                    ("redirect", "redirect"),
+                    ("songkick_artist_search", "songkick_artist_search"),
+                    ("bandsintown_artist_search", "bandsintown_artist_search"),
+                ],
+                max_length=50,
+            ),
+        ),
+    ]
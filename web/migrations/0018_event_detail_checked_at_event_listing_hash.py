@@ -0,0 +1,22 @@
+# Generated by Django 5.2.8 on 2026-10-19 17:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("web", "0017_lookupcacheentry_num_misses"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="event",
+            name="detail_checked_at",
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name="event",
+            name="listing_hash",
+            field=models.CharField(max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-19 18:03
+
+import uuid
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("web", "0018_event_detail_checked_at_event_listing_hash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MusicBrainzIndexEntry",
+            fields=[
+                ("id", models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("spotify_url", models.CharField(max_length=100, unique=True)),
+                ("musicbrainz_id", models.UUIDField(db_index=True)),
+                ("name", models.CharField(max_length=1000)),
+                ("primary_aliases", models.JSONField(default=list)),
+                ("songkick_url", models.CharField(max_length=2000, null=True)),
+                ("bandsintown_url", models.CharField(max_length=2000, null=True)),
+                ("imported_at", models.DateTimeField()),
+            ],
+        ),
+    ]
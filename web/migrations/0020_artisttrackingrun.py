@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-19 19:12
+
+import uuid
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("web", "0019_musicbrainzindexentry"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArtistTrackingRun",
+            fields=[
+                ("id", models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("started_at", models.DateTimeField()),
+                ("finished_at", models.DateTimeField(null=True)),
+                ("force_reevaluate", models.BooleanField(default=False)),
+                ("num_artists", models.IntegerField(default=0)),
+                ("num_artists_known", models.IntegerField(default=0)),
+                ("num_artists_succeeded", models.IntegerField(default=0)),
+                ("num_artists_failed", models.IntegerField(default=0)),
+                (
+                    "spotify_user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="artist_tracking_runs",
+                        to="web.spotifyuser",
+                    ),
+                ),
+            ],
+        ),
+    ]
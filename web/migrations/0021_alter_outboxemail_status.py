@@ -0,0 +1,21 @@
+# Generated by Django 5.2.8 on 2026-10-19 20:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("web", "0020_artisttrackingrun"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="outboxemail",
+            name="status",
+            field=models.CharField(
+                choices=[("pending", "pending"), ("sending", "sending"), ("sent", "sent"), ("failed", "failed")],
+                default="pending",
+                max_length=50,
+            ),
+        ),
+    ]
@@ -1,27 +1,45 @@
 import datetime
 import hashlib
+import itertools
 import json
 import logging
+import time
 import uuid
 from collections import defaultdict
+from collections.abc import Iterable
 from typing import Any
 
 from asgiref.sync import sync_to_async
 from dirtyfields import DirtyFieldsMixin
 from django.conf import settings
 from django.contrib.gis.db import models as gis_models
+from django.contrib.gis.db.models.functions import Distance as DistanceFunc
 from django.contrib.gis.geos import Point
 from django.contrib.gis.measure import Distance
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
 from django.core.serializers.json import DjangoJSONEncoder
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Coalesce
 from tekore import Token
 from tekore.model import PlaylistTrack
 
-from web.events.data import EventSourceArtist
-from web.events.enums import EventDataSource, EventType
+from web.events.data import EventSourceArtist, KnownEvent, get_spotify_artist_urls, parse_artist_data
+from web.events.enums import EventDataSource, EventType, LookupType
+from web.events.http import EVENT_SOURCE_CLIENTS
+from web.metrics import (
+    EMAIL_OUTBOX_MESSAGES,
+    EVENT_REFRESH_RUN_ARTISTS,
+    EVENT_REFRESH_RUN_DURATION_SECONDS,
+    EVENT_REFRESH_RUN_EVENTS,
+    EVENT_REFRESH_RUN_FAILURES,
+    EVENT_REFRESH_RUN_REQUESTS,
+    EVENT_REFRESH_RUN_URLS,
+)
 
 from .events.data import Event as FetchedEvent
 from .events.data import Venue as FetchedVenue
+from .geo import within_bounding_box
 from .spotify import authenticate
 from .utils import MottleException, MottleSpotifyClient
 
@@ -59,6 +77,11 @@ def decrypt_value(value: str) -> str:
     return settings.SPOTIFY_TOKEN_CRYPTER.decrypt(value).decode("utf-8")
 
 
+class JSONArrayLength(models.Func):
+    function = "JSON_ARRAY_LENGTH"
+    output_field = models.IntegerField()
+
+
 class EncryptedCharField(models.CharField):
     def to_python(self, value: str | None) -> str | None:
         if value is None:
@@ -88,7 +111,7 @@ class BaseModel(models.Model):
         abstract = True
 
 
-class User(BaseModel):
+class User(DirtyFieldsMixin, BaseModel):
     spotify_user = models.OneToOneField("SpotifyUser", on_delete=models.CASCADE, related_name="user")
     playlist_notifications = models.BooleanField(default=True)
     release_notifications = models.BooleanField(default=False)
@@ -99,39 +122,42 @@ class User(BaseModel):
     def __str__(self) -> str:
         return f"<User {self.id} spotify_user={self.spotify_user}>"
 
+    def upcoming_events_query(self) -> models.QuerySet["Event"]:
+        # Relevance is materialized in UserEvent, this is an indexed lookup
+        return Event.objects.filter(relevant_users__user=self, date__gte=datetime.datetime.now(tz=datetime.UTC).date())
+
+    def relevant_events_query(self) -> models.QuerySet["Event"]:
+        """
+        Upcoming events of all artists the user watches, in a single query. If the user has a location, only
+        streaming events and events within the configured distance of it are included. Non-streaming events
+        sometimes do not have geolocation (https://www.songkick.com/concerts/41973416), those are left out then.
+        This is what UserEvent is refreshed from.
+        """
+
+        events_query = Event.objects.filter(
+            artist__watching_users=self.spotify_user_id,  # pyright: ignore[reportAttributeAccessIssue]
+            date__gte=datetime.datetime.now(tz=datetime.UTC).date(),
+        )
+
+        if self.location is None or self.event_distance_threshold is None:
+            return events_query
+
+        return events_query.filter(
+            models.Q(type=EventType.live_stream)
+            | (
+                models.Q(~models.Q(type=EventType.live_stream), geolocation__isnull=False)
+                # The bounding box is looked up in the spatial index, the exact distance is only computed for the
+                # events within it
+                & within_bounding_box(Event, "geolocation", self.location, self.event_distance_threshold)
+                & models.Q(geolocation__distance_lte=(self.location, Distance(km=self.event_distance_threshold)))
+            )
+        )
+
     async def upcoming_events(self) -> dict["EventArtist", list["Event"]]:
         artists_with_events = defaultdict(list)
 
-        if self.location is None:
-            async for event_artist in self.spotify_user.watched_event_artists.all():
-                async for event in event_artist.events.filter(
-                    date__gte=datetime.datetime.now(tz=datetime.UTC).date()
-                ).all():
-                    artists_with_events[event_artist].append(event)
-        else:
-            async for event_artist in self.spotify_user.watched_event_artists.all():
-                # Two cases:
-                # 1. Streaming event
-                # 2. Non-streaming event with geolocation defined, and its geolocation is within X km of user's location
-                # Non-streaming events sometimes do not have geolocation (https://www.songkick.com/concerts/41973416)
-                events_query = event_artist.events.filter(
-                    models.Q(date__gte=datetime.datetime.now(tz=datetime.UTC).date())
-                    & (
-                        models.Q(type=EventType.live_stream)
-                        | (
-                            models.Q(~models.Q(type=EventType.live_stream), geolocation__isnull=False)
-                            & models.Q(
-                                geolocation__distance_lte=(
-                                    self.location,
-                                    Distance(km=self.event_distance_threshold),
-                                )
-                            )
-                        )
-                    )
-                ).order_by("date")
-
-                async for event in events_query.all():
-                    artists_with_events[event_artist].append(event)
+        async for event in self.upcoming_events_query().select_related("artist__artist").order_by("date"):
+            artists_with_events[event.artist].append(event)
 
         return artists_with_events
 
@@ -246,6 +272,23 @@ class Artist(SpotifyEntityModel):
         albums = await spotify_client.get_artist_albums(self.spotify_id)
         return [album.id for album in albums]
 
+    @staticmethod
+    async def bulk_get_or_create(spotify_ids: list[str]) -> dict[str, "Artist"]:
+        """Artists by their Spotify IDs, those that do not exist yet are created at once"""
+
+        artists = {artist.spotify_id: artist async for artist in Artist.objects.filter(spotify_id__in=spotify_ids)}
+
+        missing_ids = [spotify_id for spotify_id in spotify_ids if spotify_id not in artists]
+        if missing_ids:
+            # Artists created concurrently in the meantime are left as they are, hence the artists are loaded again
+            await Artist.objects.abulk_create(
+                [Artist(spotify_id=spotify_id) for spotify_id in missing_ids], ignore_conflicts=True
+            )
+            async for artist in Artist.objects.filter(spotify_id__in=missing_ids):
+                artists[artist.spotify_id] = artist
+
+        return artists
+
 
 class EventArtist(DirtyFieldsMixin, BaseModel):
     artist = models.OneToOneField(Artist, on_delete=models.CASCADE, related_name="event_artist")  # TODO: Cascade?
@@ -255,18 +298,118 @@ class EventArtist(DirtyFieldsMixin, BaseModel):
     songkick_name_match_accuracy = models.IntegerField()
     bandsintown_name_match_accuracy = models.IntegerField()
     watching_users = models.ManyToManyField(SpotifyUser, related_name="watched_event_artists")
+    last_fetched_at = models.DateTimeField(null=True)
+    last_changed_at = models.DateTimeField(null=True)
+    unchanged_fetches = models.IntegerField(default=0)
+    next_fetch_at = models.DateTimeField(null=True)  # Due right away if not set
+
+    class Meta:
+        indexes = [models.Index(fields=["next_fetch_at"], name="event_artist_next_fetch_idx")]
 
     def __str__(self) -> str:
         return f"<EventArtist {self.id}>"
 
-    async def as_fetched_artist(self, with_events: bool = True) -> EventSourceArtist:
-        # TODO: This is inefficient
-        events = [e.as_fetched_event() async for e in self.events.all()] if with_events else []  # pyright: ignore[reportAttributeAccessIssue]
+    @staticmethod
+    def due_for_refresh(budget: int | None = None) -> models.QuerySet["EventArtist"]:
+        """
+        Watched artists whose events are due to be fetched again, most important first: those with watchers that
+        have notifications enabled, then those that changed most recently, then those with the soonest upcoming
+        events. At most `budget` artists are returned, the rest are left for the next runs.
+        """
+
+        now = datetime.datetime.now(tz=datetime.UTC)
+        budget = settings.EVENTS_REFRESH_BUDGET if budget is None else budget
+
+        artists = (
+            EventArtist.objects.filter(
+                models.Q(next_fetch_at__isnull=True) | models.Q(next_fetch_at__lte=now),
+                watching_users__isnull=False,
+            )
+            .annotate(
+                num_notified_watchers=models.Count(
+                    "watching_users", filter=models.Q(watching_users__user__event_notifications=True), distinct=True
+                ),
+                next_event_date=models.Min("events__date", filter=models.Q(events__date__gte=now.date())),
+            )
+            .order_by(
+                models.Case(models.When(num_notified_watchers__gt=0, then=0), default=1),
+                models.F("last_changed_at").desc(nulls_last=True),
+                models.F("next_event_date").asc(nulls_last=True),
+                models.F("next_fetch_at").asc(nulls_first=True),
+            )
+        )
+
+        return artists[:budget] if budget else artists
+
+    async def record_fetch(self, changed: bool) -> None:
+        """
+        Schedule the next fetch. The interval doubles with every fetch that brought no changes, up to the maximum,
+        unless the artist has events coming up soon.
+        """
+
+        now = datetime.datetime.now(tz=datetime.UTC)
 
+        self.last_fetched_at = now
+        if changed:
+            self.last_changed_at = now
+            self.unchanged_fetches = 0
+        else:
+            self.unchanged_fetches += 1
+
+        interval_hours = min(
+            settings.EVENT_ARTIST_REFRESH_MIN_INTERVAL_HOURS * 2 ** min(self.unchanged_fetches, 16),
+            settings.EVENT_ARTIST_REFRESH_MAX_INTERVAL_HOURS,
+        )
+
+        has_events_soon = await self.events.filter(  # pyright: ignore[reportAttributeAccessIssue]
+            date__gte=now.date(),
+            date__lte=now.date() + datetime.timedelta(days=settings.EVENT_ARTIST_REFRESH_SOON_DAYS),
+        ).aexists()
+        if has_events_soon:
+            interval_hours = settings.EVENT_ARTIST_REFRESH_MIN_INTERVAL_HOURS
+
+        self.next_fetch_at = now + datetime.timedelta(hours=interval_hours)
+        await self.asave(update_fields=["last_fetched_at", "last_changed_at", "unchanged_fetches", "next_fetch_at"])
+
+    def as_fetched_artist(self, known_events: dict[str, KnownEvent] | None = None) -> EventSourceArtist:
         return EventSourceArtist(
-            name="dummy", songkick_url=self.songkick_url, bandsintown_url=self.bandsintown_url, events=events
+            name="dummy",
+            songkick_url=self.songkick_url,
+            bandsintown_url=self.bandsintown_url,
+            known_events=known_events or {},
         )
 
+    @staticmethod
+    async def load_known_events(
+        event_artists: models.QuerySet["EventArtist"],
+    ) -> dict[uuid.UUID, dict[str, KnownEvent]]:
+        """
+        Snapshot of upcoming events of the given artists, keyed by artist ID and event URL. Loaded once per refresh
+        run, and only with the columns needed to decide which events to fetch again.
+        """
+
+        known_events: dict[uuid.UUID, dict[str, KnownEvent]] = defaultdict(dict)
+
+        query = (
+            Event.objects.filter(artist__in=event_artists, date__gte=datetime.datetime.now(tz=datetime.UTC).date())
+            .annotate(
+                num_urls=Coalesce(JSONArrayLength("tickets_urls"), 0) + Coalesce(JSONArrayLength("stream_urls"), 0)
+            )
+            .values_list("artist_id", "source", "source_url", "date", "num_urls", "listing_hash", "detail_checked_at")
+        )
+
+        async for artist_id, source, source_url, date, num_urls, listing_hash, detail_checked_at in query:
+            known_events[artist_id][source_url] = KnownEvent(
+                source=EventDataSource(source),
+                url=source_url,
+                date=date,
+                has_urls=num_urls > 0,
+                listing_hash=listing_hash,
+                detail_checked_at=detail_checked_at,
+            )
+
+        return known_events
+
     @staticmethod
     async def create_from_fetched_artist(
         artist: Artist,
@@ -286,6 +429,37 @@ class EventArtist(DirtyFieldsMixin, BaseModel):
         await event_artist.watching_users.aset(watching_spotify_user_ids)  # type: ignore[arg-type]
         return event_artist
 
+    @staticmethod
+    async def add_watching_user(artists: list[Artist], spotify_user_id: str) -> set[uuid.UUID]:
+        """
+        Adds the user to the watchers of the artists that already have an EventArtist, with one insert for all of
+        them. Returns the IDs of these artists, the others have yet to be looked up in the event sources.
+        """
+
+        event_artist_ids = {
+            artist_id: event_artist_id
+            async for artist_id, event_artist_id in EventArtist.objects.filter(artist__in=artists).values_list(
+                "artist_id", "id"
+            )
+        }
+
+        through_model = EventArtist.watching_users.through
+        # Users that already watch an artist are left as they are
+        await through_model.objects.abulk_create(
+            [
+                through_model(eventartist_id=event_artist_id, spotifyuser_id=spotify_user_id)
+                for event_artist_id in event_artist_ids.values()
+            ],
+            ignore_conflicts=True,
+        )
+
+        # Bulk inserts into the through table don't send m2m_changed, so relevant events are refreshed here
+        if event_artist_ids:
+            async for user in User.objects.filter(spotify_user_id=spotify_user_id):
+                await sync_to_async(UserEvent.refresh_for_user)(user, list(event_artist_ids.values()))
+
+        return set(event_artist_ids)
+
     async def update_from_fetched_artist(self, musicbrainz_id: str | None, fetched_artist: EventSourceArtist) -> None:
         self.musicbrainz_id = musicbrainz_id
         self.songkick_url = fetched_artist.songkick_url
@@ -294,15 +468,30 @@ class EventArtist(DirtyFieldsMixin, BaseModel):
         self.bandsintown_name_match_accuracy = fetched_artist.bandsintown_match_accuracy
         await self.asave()
 
-    async def update_events(self, force_refetch: bool = False) -> "EventArtist":
-        fetched_artist = await self.as_fetched_artist(with_events=not force_refetch)
-        await fetched_artist.fetch_events()
+    async def update_events(
+        self, force_refetch: bool = False, known_events: dict[str, KnownEvent] | None = None
+    ) -> tuple[int, int, int]:
+        if force_refetch:
+            known_events = {}
+        elif known_events is None:
+            known_events = (await EventArtist.load_known_events(EventArtist.objects.filter(id=self.id))).get(
+                self.id, {}
+            )
+
+        fetched_artist = self.as_fetched_artist(known_events)
+
+        try:
+            await fetched_artist.fetch_events()
+            num_created, num_updated = await Event.bulk_upsert_from_fetched_events(fetched_artist.events, self)
+        except Exception:
+            # Backed off like a fetch without changes, failing artists must not stay at the front of every run
+            await self.record_fetch(changed=False)
+            raise
 
-        for event in fetched_artist.events:
-            await Event.update_or_create_from_fetched_event(event, self)
+        await self.record_fetch(changed=bool(num_created or num_updated))
 
-        # This is returned for logging purposes
-        return self
+        # Number of created and updated events and of newly shortened URLs, for the refresh run report
+        return num_created, num_updated, fetched_artist.num_urls_shortened
 
 
 # class ArtistNameMatchResult(BaseModel):
@@ -341,14 +530,34 @@ class Event(DirtyFieldsMixin, BaseModel):
     geolocation = gis_models.PointField(null=True, geography=True, srid=settings.GEODJANGO_SRID)
     stream_urls = models.JSONField(null=True)
     tickets_urls = models.JSONField(null=True)
+    # Hash of the event's entry in the artist's calendar, to only fetch the event's page again when it changes
+    listing_hash = models.CharField(max_length=64, null=True)
+    detail_checked_at = models.DateTimeField(null=True)
+
+    # Fields that are populated from fetched events
+    EVENT_DATA_FIELDS = (
+        "type",
+        "date",
+        "venue",
+        "postcode",
+        "address",
+        "city",
+        "country",
+        "geolocation",
+        "stream_urls",
+        "tickets_urls",
+    )
+    # Fields whose changes users get notified of
+    EVENT_UPDATE_FIELDS = ("stream_urls", "tickets_urls", "geolocation")
+
+    class Meta:
+        indexes = [models.Index(fields=["artist", "date"], name="event_artist_date_idx")]
 
     def __str__(self) -> str:
         return f"<Event {self.id} date={self.date} artist={self.artist}>"
 
     @staticmethod
-    async def update_or_create_from_fetched_event(
-        fetched_event: FetchedEvent, event_artist: EventArtist
-    ) -> tuple["Event", bool]:
+    def fields_from_fetched_event(fetched_event: FetchedEvent) -> dict[str, Any]:
         venue = fetched_event.venue
 
         if venue is None:
@@ -366,25 +575,114 @@ class Event(DirtyFieldsMixin, BaseModel):
             country = venue.country
             geolocation = Point(venue.geo_lon, venue.geo_lat, srid=settings.GEODJANGO_SRID)
 
+        return {
+            "type": fetched_event.type,
+            "date": fetched_event.date,
+            "venue": venue_name,
+            "postcode": postcode,
+            "address": address,
+            "city": city,
+            "country": country,
+            "geolocation": geolocation,
+            # TODO: Move this logic to a custom JSON endoder/decoder?
+            "stream_urls": fetched_event.stream_urls,
+            "tickets_urls": fetched_event.tickets_urls,
+        }
+
+    @staticmethod
+    async def update_or_create_from_fetched_event(
+        fetched_event: FetchedEvent, event_artist: EventArtist
+    ) -> tuple["Event", bool]:
         return await Event.objects.aupdate_or_create(
             artist=event_artist,
             source=fetched_event.source,
             source_url=fetched_event.url,
-            defaults={
-                "type": fetched_event.type,
-                "date": fetched_event.date,
-                "venue": venue_name,
-                "postcode": postcode,
-                "address": address,
-                "city": city,
-                "country": country,
-                "geolocation": geolocation,
-                # TODO: Move this logic to a custom JSON endoder/decoder?
-                "stream_urls": fetched_event.stream_urls,
-                "tickets_urls": fetched_event.tickets_urls,
-            },
+            defaults=Event.fields_from_fetched_event(fetched_event),
         )
 
+    @staticmethod
+    async def bulk_upsert_from_fetched_events(
+        fetched_events: list[FetchedEvent], event_artist: EventArtist
+    ) -> tuple[int, int]:
+        """
+        Set-based counterpart of `update_or_create_from_fetched_event`. Bulk writes do not send `post_save`, so the
+        `EventUpdate`s that `handle_post_save_event` would have created are written here, in the same transaction.
+        Returns the number of created and updated events.
+        """
+
+        return await sync_to_async(Event._bulk_upsert_from_fetched_events)(fetched_events, event_artist)
+
+    @staticmethod
+    def _bulk_upsert_from_fetched_events(
+        fetched_events: list[FetchedEvent], event_artist: EventArtist
+    ) -> tuple[int, int]:
+        if not fetched_events:
+            return 0, 0
+
+        existing_events = {
+            (e.source, e.source_url): e
+            for e in Event.objects.filter(artist=event_artist, source_url__in=[e.url for e in fetched_events])
+        }
+
+        events_to_create: list[Event] = []
+        events_to_update: list[Event] = []
+        # Fetched again, but with the same data
+        events_checked: list[Event] = []
+        relevance_changed_events: list[Event] = []
+        event_updates: list[EventUpdate] = []
+        now = datetime.datetime.now(tz=datetime.UTC)
+
+        for fetched_event in fetched_events:
+            fields = Event.fields_from_fetched_event(fetched_event)
+            event = existing_events.get((fetched_event.source, fetched_event.url))
+
+            if event is None:
+                event = Event(
+                    artist=event_artist,
+                    source=fetched_event.source,
+                    source_url=fetched_event.url,
+                    listing_hash=fetched_event.listing_hash,
+                    detail_checked_at=now,
+                    **fields,
+                )
+                events_to_create.append(event)
+                event_updates.append(EventUpdate(event=event, type=EventUpdate.FULL))
+                continue
+
+            event.listing_hash = fetched_event.listing_hash
+            event.detail_checked_at = now
+
+            old_values = {name: getattr(event, name) for name, value in fields.items() if getattr(event, name) != value}
+            if not old_values:
+                events_checked.append(event)
+                continue
+
+            for name, value in fields.items():
+                setattr(event, name, value)
+            event.updated_at = now
+            events_to_update.append(event)
+
+            if not old_values.keys().isdisjoint(UserEvent.RELEVANCE_FIELDS):
+                relevance_changed_events.append(event)
+
+            if changes := compile_event_changes(event, old_values):
+                event_updates.append(EventUpdate(event=event, type=EventUpdate.PARTIAL, changes=changes))
+
+        with transaction.atomic():
+            Event.objects.bulk_create(events_to_create)
+            Event.objects.bulk_update(
+                events_to_update, fields=[*Event.EVENT_DATA_FIELDS, "listing_hash", "detail_checked_at", "updated_at"]
+            )
+            Event.objects.bulk_update(events_checked, fields=["listing_hash", "detail_checked_at"])
+            EventUpdate.objects.bulk_create(event_updates)
+            UserEvent.refresh_for_events(events_to_create + relevance_changed_events)
+
+        logger.debug(
+            f"Upserted events of {event_artist}: created {len(events_to_create)}, updated {len(events_to_update)}, "
+            f"event updates {len(event_updates)}"
+        )
+        return len(events_to_create), len(events_to_update)
+
     def as_fetched_event(self) -> FetchedEvent:
         if self.venue is None or self.geolocation is None:
             venue = None
@@ -410,6 +708,14 @@ class Event(DirtyFieldsMixin, BaseModel):
         )
 
 
+def compile_event_changes(event: Event, old_values: dict[str, Any]) -> dict[str, dict[str, Any]]:
+    return {
+        field_name: {"old": old_values[field_name], "new": getattr(event, field_name)}
+        for field_name in Event.EVENT_UPDATE_FIELDS
+        if field_name in old_values
+    }
+
+
 class EventUpdate(BaseModel):
     FULL = "full"
     PARTIAL = "partial"
@@ -424,6 +730,382 @@ class EventUpdate(BaseModel):
         return f"<EventUpdate {self.id} type={self.type}>"
 
 
+class UserEvent(BaseModel):
+    """
+    Materialized relevance of upcoming events to users: an event is relevant to a user if they watch its artist and
+    it is either a stream or within their configured distance. Kept up to date whenever an event is created or moved,
+    a user changes their location or radius, or starts or stops watching an artist.
+    """
+
+    # Event fields that relevance depends on
+    RELEVANCE_FIELDS = ("type", "date", "geolocation")
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="relevant_events")
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name="relevant_users")
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["user", "event"], name="user_event_unique")]
+
+    def __str__(self) -> str:
+        return f"<UserEvent {self.id} user={self.user_id} event={self.event_id}>"  # pyright: ignore[reportAttributeAccessIssue]
+
+    @staticmethod
+    def refresh_for_user(user: User, event_artist_ids: list[uuid.UUID] | None = None) -> None:
+        user_events = UserEvent.objects.filter(user=user)
+        events_query = user.relevant_events_query()
+
+        if event_artist_ids is not None:
+            user_events = user_events.filter(event__artist_id__in=event_artist_ids)
+            events_query = events_query.filter(artist_id__in=event_artist_ids)
+
+        with transaction.atomic():
+            user_events.delete()
+            UserEvent.objects.bulk_create(
+                [UserEvent(user=user, event_id=event_id) for event_id in events_query.values_list("id", flat=True)],
+                ignore_conflicts=True,
+            )
+
+    @staticmethod
+    def refresh_for_events(events: list[Event]) -> None:
+        if not events:
+            return
+
+        today = datetime.datetime.now(tz=datetime.UTC).date()
+        upcoming_events = [event for event in events if event.date >= today]
+
+        # Watchers of all the events' artists in one query. Users without a location are shown all events.
+        through_model = EventArtist.watching_users.through
+        watcher_rows = through_model.objects.filter(
+            eventartist_id__in={event.artist_id for event in upcoming_events}, spotifyuser__user__isnull=False
+        ).values_list(
+            "eventartist_id",
+            "spotifyuser__user__id",
+            "spotifyuser__user__location",
+            "spotifyuser__user__event_distance_threshold",
+        )
+
+        watchers: defaultdict[uuid.UUID, list[uuid.UUID]] = defaultdict(list)
+        unlocated_watchers: defaultdict[uuid.UUID, list[uuid.UUID]] = defaultdict(list)
+        for event_artist_id, user_id, location, distance_threshold in watcher_rows:
+            watchers[event_artist_id].append(user_id)
+            if location is None or distance_threshold is None:
+                unlocated_watchers[event_artist_id].append(user_id)
+
+        user_events: list[UserEvent] = []
+        located_event_ids: list[uuid.UUID] = []
+
+        for event in upcoming_events:
+            if event.type == EventType.live_stream:
+                user_ids = watchers[event.artist_id]
+            else:
+                user_ids = unlocated_watchers[event.artist_id]
+                if event.geolocation is not None:
+                    located_event_ids.append(event.id)
+
+            user_events.extend(UserEvent(user_id=user_id, event=event) for user_id in user_ids)
+
+        if located_event_ids:
+            # The distances of all events and the watchers of their artists in one query. The joins are only made in
+            # annotations, so all of them refer to the same watcher.
+            nearby = (
+                Event.objects.filter(id__in=located_event_ids)
+                .annotate(
+                    watcher_id=models.F("artist__watching_users__user__id"),
+                    watcher_distance_threshold=models.F("artist__watching_users__user__event_distance_threshold"),
+                    distance=DistanceFunc("geolocation", "artist__watching_users__user__location"),
+                )
+                .filter(distance__lte=models.F("watcher_distance_threshold") * 1000)
+                .values_list("id", "watcher_id")
+            )
+            user_events.extend(UserEvent(user_id=user_id, event_id=event_id) for event_id, user_id in nearby)
+
+        with transaction.atomic():
+            UserEvent.objects.filter(event__in=events).delete()
+            UserEvent.objects.bulk_create(user_events, ignore_conflicts=True)
+
+
+class EventRefreshRun(BaseModel):
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField(null=True)
+    force_refetch = models.BooleanField(default=False)
+    num_artists = models.IntegerField(default=0)
+    num_artists_succeeded = models.IntegerField(default=0)
+    num_artists_failed = models.IntegerField(default=0)
+    num_events_created = models.IntegerField(default=0)
+    num_events_updated = models.IntegerField(default=0)
+    num_events = models.IntegerField(default=0)
+    num_event_urls = models.IntegerField(default=0)
+    num_urls_shortened = models.IntegerField(default=0)
+    requests = models.JSONField(default=dict)  # per event source, e.g. {"songkick": {"total": 10, ...}}
+    failures = models.JSONField(default=dict)  # per exception type, e.g. {"HTTPClientException": 2}
+
+    def __str__(self) -> str:
+        return f"<EventRefreshRun {self.id} started_at={self.started_at} finished_at={self.finished_at}>"
+
+    @property
+    def duration_seconds(self) -> float | None:
+        if self.finished_at is None:
+            return None
+        return (self.finished_at - self.started_at).total_seconds()
+
+    @staticmethod
+    def request_stats() -> dict[str, dict[str, float]]:
+        return {client.name: client.stats() for client in EVENT_SOURCE_CLIENTS}
+
+    async def finish(
+        self, event_artists: models.QuerySet[EventArtist], request_stats_before: dict[str, dict[str, float]]
+    ) -> None:
+        event_stats = await Event.objects.filter(artist__in=event_artists).aaggregate(
+            num_events=models.Count("id"),
+            num_urls=models.Sum(
+                Coalesce(JSONArrayLength("tickets_urls"), 0) + Coalesce(JSONArrayLength("stream_urls"), 0)
+            ),
+        )
+        self.num_events = event_stats["num_events"]
+        self.num_event_urls = event_stats["num_urls"] or 0
+
+        self.requests = {}
+        for source, stats in EventRefreshRun.request_stats().items():
+            stats_before = request_stats_before.get(source, {})
+            self.requests[source] = {stat: value - stats_before.get(stat, 0) for stat, value in stats.items()}
+
+        self.finished_at = datetime.datetime.now(tz=datetime.UTC)
+        await self.asave()
+
+    def export_metrics(self) -> None:
+        if self.duration_seconds is not None:
+            EVENT_REFRESH_RUN_DURATION_SECONDS.set(self.duration_seconds)
+
+        EVENT_REFRESH_RUN_ARTISTS.labels("succeeded").set(self.num_artists_succeeded)
+        EVENT_REFRESH_RUN_ARTISTS.labels("failed").set(self.num_artists_failed)
+        EVENT_REFRESH_RUN_EVENTS.labels("created").set(self.num_events_created)
+        EVENT_REFRESH_RUN_EVENTS.labels("updated").set(self.num_events_updated)
+        EVENT_REFRESH_RUN_EVENTS.labels("total").set(self.num_events)
+        EVENT_REFRESH_RUN_URLS.labels("event").set(self.num_event_urls)
+        EVENT_REFRESH_RUN_URLS.labels("shortened").set(self.num_urls_shortened)
+
+        for source, stats in self.requests.items():
+            for stat, value in stats.items():
+                EVENT_REFRESH_RUN_REQUESTS.labels(source, stat).set(value)
+
+        # Exception types of a previous run must not linger
+        EVENT_REFRESH_RUN_FAILURES.clear()
+        for exception_type, count in self.failures.items():
+            EVENT_REFRESH_RUN_FAILURES.labels(exception_type).set(count)
+
+
+class ArtistTrackingRun(BaseModel):
+    """
+    Progress of tracking the events of a batch of artists for a user. Artists that already have an EventArtist are
+    tracked right away, the rest are counted as they are looked up in the event sources.
+    """
+
+    spotify_user = models.ForeignKey(SpotifyUser, on_delete=models.CASCADE, related_name="artist_tracking_runs")
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField(null=True)
+    force_reevaluate = models.BooleanField(default=False)
+    num_artists = models.IntegerField(default=0)
+    num_artists_known = models.IntegerField(default=0)
+    num_artists_succeeded = models.IntegerField(default=0)
+    num_artists_failed = models.IntegerField(default=0)
+
+    # Progress is saved in batches, the counts are always saved when the run finishes
+    _num_unsaved_records = 0
+    _progress_saved_at: float | None = None  # Monotonic time, the first outcome is saved right away
+
+    def __str__(self) -> str:
+        return f"<ArtistTrackingRun {self.id} started_at={self.started_at} finished_at={self.finished_at}>"
+
+    @property
+    def num_artists_processed(self) -> int:
+        return self.num_artists_known + self.num_artists_succeeded + self.num_artists_failed
+
+    async def record(self, succeeded: bool) -> None:
+        """Records the outcome of looking up an artist in the event sources"""
+
+        if succeeded:
+            self.num_artists_succeeded += 1
+        else:
+            self.num_artists_failed += 1
+        self._num_unsaved_records += 1
+
+        if (
+            self._progress_saved_at is None
+            or self._num_unsaved_records >= settings.ARTIST_TRACKING_PROGRESS_SAVE_INTERVAL_ARTISTS
+            or time.monotonic() - self._progress_saved_at >= settings.ARTIST_TRACKING_PROGRESS_SAVE_INTERVAL_SECONDS
+        ):
+            await self.asave(update_fields=["num_artists_succeeded", "num_artists_failed", "updated_at"])
+            self._num_unsaved_records = 0
+            self._progress_saved_at = time.monotonic()
+
+    async def finish(self) -> None:
+        self.finished_at = datetime.datetime.now(tz=datetime.UTC)
+        await self.asave()
+
+
+class LookupCacheEntry(BaseModel):
+    """
+    Persistent cache of the results of lookups at external services, e.g. MusicBrainz. Negative results (lookups that
+    found nothing) are cached too, for a shorter time that doubles with every consecutive negative result.
+    """
+
+    type = models.CharField(max_length=50, choices=[(e.name, e.value) for e in LookupType])
+    key = models.CharField(max_length=2000)
+    value = models.JSONField(null=True)  # None if nothing was found
+    num_misses = models.IntegerField(default=0)  # Consecutive negative results
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=["type", "key"], name="lookup_cache_entry_unique")]
+        indexes = [models.Index(fields=["expires_at"], name="lookup_cache_entry_expires_idx")]
+
+    def __str__(self) -> str:
+        return f"<LookupCacheEntry {self.id} type={self.type} key={self.key}>"
+
+    @staticmethod
+    async def get_value(lookup_type: LookupType, key: str) -> tuple[bool, Any]:
+        """Whether there is a fresh entry for the lookup, and its value"""
+
+        entry = await LookupCacheEntry.objects.filter(
+            type=lookup_type, key=key, expires_at__gt=datetime.datetime.now(tz=datetime.UTC)
+        ).afirst()
+
+        if entry is None:
+            return False, None
+
+        return True, entry.value
+
+    @staticmethod
+    async def set_value(lookup_type: LookupType, key: str, value: Any, negative: bool | None = None) -> None:
+        """Cache the result of a lookup. It is negative if `value` is None, unless `negative` says otherwise."""
+
+        if negative is None:
+            negative = value is None
+
+        if negative:
+            previous_num_misses = (
+                await LookupCacheEntry.objects.filter(type=lookup_type, key=key)
+                .values_list("num_misses", flat=True)
+                .afirst()
+            )
+            num_misses = (previous_num_misses or 0) + 1
+            ttl_days = min(
+                settings.LOOKUP_CACHE_NEGATIVE_TTL_DAYS * 2 ** (num_misses - 1), settings.LOOKUP_CACHE_TTL_DAYS
+            )
+        else:
+            num_misses = 0
+            ttl_days = settings.LOOKUP_CACHE_TTL_DAYS
+
+        await LookupCacheEntry.objects.aupdate_or_create(
+            type=lookup_type,
+            key=key,
+            defaults={
+                "value": value,
+                "num_misses": num_misses,
+                "expires_at": datetime.datetime.now(tz=datetime.UTC) + datetime.timedelta(days=ttl_days),
+            },
+        )
+
+    @staticmethod
+    async def purge_expired() -> int:
+        now = datetime.datetime.now(tz=datetime.UTC)
+        # Expired negative results are kept for a while, so that the next re-check interval keeps growing
+        num_deleted, _ = await LookupCacheEntry.objects.filter(
+            models.Q(num_misses=0)
+            | models.Q(expires_at__lte=now - datetime.timedelta(days=settings.LOOKUP_CACHE_TTL_DAYS)),
+            expires_at__lte=now,
+        ).adelete()
+        return num_deleted
+
+
+class MusicBrainzIndexEntry(BaseModel):
+    """
+    Local index of MusicBrainz artists by their Spotify URLs, imported from MusicBrainz JSON data dumps with the
+    `import_musicbrainz_dump` command, so that most artists are found without requests to the rate-limited API. An
+    artist with several Spotify URLs has an entry for each of them.
+    """
+
+    spotify_url = models.CharField(max_length=100, unique=True)
+    musicbrainz_id = models.UUIDField(db_index=True)
+    name = models.CharField(max_length=1000)
+    primary_aliases = models.JSONField(default=list)
+    songkick_url = models.CharField(max_length=2000, null=True)
+    bandsintown_url = models.CharField(max_length=2000, null=True)
+    imported_at = models.DateTimeField()
+
+    # Fields that an import overwrites
+    ARTIST_DATA_FIELDS = ("musicbrainz_id", "name", "primary_aliases", "songkick_url", "bandsintown_url", "imported_at")
+
+    def __str__(self) -> str:
+        return f"<MusicBrainzIndexEntry {self.id} musicbrainz_id={self.musicbrainz_id} spotify_url={self.spotify_url}>"
+
+    @staticmethod
+    async def get_artist(spotify_url: str) -> tuple[str, dict[str, Any]] | None:
+        """The MusicBrainz ID of the artist with the Spotify URL, and its data as `parse_artist_data` returns it"""
+
+        entry = await MusicBrainzIndexEntry.objects.filter(spotify_url=spotify_url).afirst()
+
+        if entry is None:
+            return None
+
+        return str(entry.musicbrainz_id), {
+            "name": entry.name,
+            "primary_aliases": entry.primary_aliases,
+            "songkick_url": entry.songkick_url,
+            "bandsintown_url": entry.bandsintown_url,
+        }
+
+    @staticmethod
+    def import_artists(
+        artists: Iterable[dict[str, Any]], full: bool = False, batch_size: int = 1000
+    ) -> tuple[int, int]:
+        """
+        Upserts the artists (as MusicBrainz JSON) that have Spotify URLs, and removes the Spotify URLs that the
+        artists no longer have. A full import also removes the entries of artists that are not in it, otherwise
+        `artists` may be just the artists that changed. Returns the number of upserted and removed entries.
+        """
+
+        imported_at = datetime.datetime.now(tz=datetime.UTC)
+        num_upserted = 0
+        num_removed = 0
+
+        for batch in itertools.batched(artists, batch_size):
+            # Keyed by Spotify URL, in case several artists in the batch claim one
+            entries = {
+                spotify_url: MusicBrainzIndexEntry(
+                    spotify_url=spotify_url,
+                    musicbrainz_id=artist["id"],
+                    imported_at=imported_at,
+                    **parse_artist_data(artist),
+                )
+                for artist in batch
+                for spotify_url in get_spotify_artist_urls(artist)
+            }
+
+            with transaction.atomic():
+                num_deleted, _ = (
+                    MusicBrainzIndexEntry.objects.filter(musicbrainz_id__in=[artist["id"] for artist in batch])
+                    .exclude(spotify_url__in=list(entries))
+                    .delete()
+                )
+                MusicBrainzIndexEntry.objects.bulk_create(
+                    list(entries.values()),
+                    update_conflicts=True,
+                    unique_fields=["spotify_url"],
+                    update_fields=MusicBrainzIndexEntry.ARTIST_DATA_FIELDS,
+                )
+
+            num_upserted += len(entries)
+            num_removed += num_deleted
+
+        if full:
+            num_deleted, _ = MusicBrainzIndexEntry.objects.filter(imported_at__lt=imported_at).delete()
+            num_removed += num_deleted
+
+        logger.info(f"Imported MusicBrainz artists: upserted {num_upserted}, removed {num_removed} index entries")
+        return num_upserted, num_removed
+
+
 class Playlist(SpotifyEntityModel):
     spotify_user = models.ForeignKey(SpotifyUser, null=True, on_delete=models.CASCADE, related_name="playlists")
 
@@ -734,6 +1416,189 @@ class PlaylistUpdate(BaseModel):
             return update, False
 
 
+class OutboxEmail(BaseModel):
+    PENDING = "pending"
+    SENDING = "sending"
+    SENT = "sent"
+    FAILED = "failed"
+    OUTBOX_EMAIL_STATUSES = [(PENDING, "pending"), (SENDING, "sending"), (SENT, "sent"), (FAILED, "failed")]
+
+    recipient = models.EmailField()
+    subject = models.CharField(max_length=200)
+    html_message = models.TextField()
+    message_hash = models.CharField(max_length=64)
+    status = models.CharField(max_length=50, choices=OUTBOX_EMAIL_STATUSES, default=PENDING)
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField()  # While sending, when the claim of the sender expires
+    last_error = models.TextField(null=True)
+    sent_at = models.DateTimeField(null=True)
+    event_updates = models.ManyToManyField(EventUpdate, related_name="outbox_emails")
+    playlist_updates = models.ManyToManyField(PlaylistUpdate, related_name="outbox_emails")
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "next_attempt_at"], name="outbox_email_status_next_idx")]
+
+    def __str__(self) -> str:
+        return f"<OutboxEmail {self.id} status={self.status} attempts={self.attempts}>"
+
+    @staticmethod
+    async def enqueue(
+        recipient: str,
+        subject: str,
+        html_message: str,
+        event_updates: list[EventUpdate] | None = None,
+        playlist_updates: list[PlaylistUpdate] | None = None,
+    ) -> "OutboxEmail":
+        message_hash = hashlib.sha256(json.dumps([recipient, subject, html_message]).encode()).hexdigest()
+
+        # The notification jobs may run again before the sender has drained the outbox, in which case they compile
+        # the very same message. Reuse the pending (or being sent) one instead of sending the same email twice.
+        email = await OutboxEmail.objects.filter(
+            status__in=[OutboxEmail.PENDING, OutboxEmail.SENDING], recipient=recipient, message_hash=message_hash
+        ).afirst()
+
+        if email is None:
+            email = await OutboxEmail.objects.acreate(
+                recipient=recipient,
+                subject=subject,
+                html_message=html_message,
+                message_hash=message_hash,
+                next_attempt_at=datetime.datetime.now(tz=datetime.UTC),
+            )
+            logger.info(f"Enqueued {email} to {recipient}")
+        else:
+            logger.info(f"{email} with the same message to {recipient} is already {email.status}")
+
+        # https://github.com/typeddjango/django-stubs/issues/997
+        if event_updates:
+            await email.event_updates.aadd(*event_updates)  # type: ignore[arg-type]
+        if playlist_updates:
+            await email.playlist_updates.aadd(*playlist_updates)  # type: ignore[arg-type]
+
+        return email
+
+    def as_email_message(self, connection: BaseEmailBackend | None = None) -> EmailMultiAlternatives:
+        message = EmailMultiAlternatives(
+            subject=self.subject,
+            body="",
+            from_email=f"{settings.MAIL_FROM_NAME} <{settings.MAIL_FROM_EMAIL}>",
+            to=[self.recipient],
+            connection=connection,
+        )
+        message.attach_alternative(self.html_message, "text/html")
+        return message
+
+    def mark_sent(self) -> None:
+        with transaction.atomic():
+            self.status = OutboxEmail.SENT
+            self.attempts += 1
+            self.sent_at = datetime.datetime.now(tz=datetime.UTC)
+            self.last_error = None
+            self.save()
+
+            # TODO: This will cause other users to not get notifications if they follow the same artists
+            self.event_updates.all().update(is_notified_of=True)
+            self.playlist_updates.all().update(is_notified_of=True)
+
+    def mark_failed(self, error: Exception) -> None:
+        self.attempts += 1
+        self.last_error = f"{error.__class__.__name__}: {error}"
+
+        if self.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+            logger.error(f"Giving up on {self} after {self.attempts} attempts: {self.last_error}")
+            self.status = OutboxEmail.FAILED
+        else:
+            self.status = OutboxEmail.PENDING
+            backoff_seconds = settings.EMAIL_OUTBOX_RETRY_BACKOFF_SECONDS * 2 ** (self.attempts - 1)
+            self.next_attempt_at = datetime.datetime.now(tz=datetime.UTC) + datetime.timedelta(seconds=backoff_seconds)
+            logger.warning(f"Failed to send {self}: {self.last_error}. Retrying in {backoff_seconds} seconds")
+
+        self.save()
+
+    @staticmethod
+    def due() -> models.QuerySet["OutboxEmail"]:
+        """Pending messages that are due, and messages whose sender has not finished sending them in time"""
+
+        return OutboxEmail.objects.filter(
+            status__in=[OutboxEmail.PENDING, OutboxEmail.SENDING],
+            next_attempt_at__lte=datetime.datetime.now(tz=datetime.UTC),
+        )
+
+    def claim(self) -> bool:
+        """
+        Claims the message for sending until the lease expires, so that senders that run at the same time do not send
+        it twice. Returns False if another sender has claimed it first.
+        """
+
+        lease_expires_at = datetime.datetime.now(tz=datetime.UTC) + datetime.timedelta(
+            seconds=settings.EMAIL_OUTBOX_LEASE_SECONDS
+        )
+        # A conditional update, only one sender gets to change the row
+        claimed = (
+            OutboxEmail.due().filter(id=self.id).update(status=OutboxEmail.SENDING, next_attempt_at=lease_expires_at)
+        )
+        if claimed:
+            self.status = OutboxEmail.SENDING
+            self.next_attempt_at = lease_expires_at
+        return bool(claimed)
+
+    @staticmethod
+    def send_pending(batch_size: int | None = None) -> tuple[int, int]:
+        """Drain due messages over a single SMTP connection. Returns the number of sent and failed messages."""
+
+        batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+        sent_count = 0
+        failed_count = 0
+
+        connection = get_connection(fail_silently=False)
+
+        try:
+            connection.open()
+        except Exception as e:
+            # Nothing is lost, the messages stay pending until the next run
+            logger.error(f"Failed to open connection to the mail server: {e}")
+            return sent_count, failed_count
+
+        try:
+            while batch := list(OutboxEmail.due().order_by("next_attempt_at")[:batch_size]):
+                logger.info(f"Sending batch of {len(batch)} emails")
+
+                for email in batch:
+                    if not email.claim():
+                        logger.info(f"{email} is being sent by another sender")
+                        continue
+
+                    # Messages go out one per `send_messages` call over the same open connection. Sending the whole
+                    # batch in one call would make it impossible to tell which messages made it if the server fails
+                    # midway, and those would be sent again.
+                    try:
+                        num_sent = connection.send_messages([email.as_email_message(connection)])
+                        if not num_sent:
+                            raise MottleException("Mail server did not accept the message")
+                    except Exception as e:
+                        email.mark_failed(e)
+                        failed_count += 1
+                        EMAIL_OUTBOX_MESSAGES.labels(
+                            "failed" if email.status == OutboxEmail.FAILED else "retried"
+                        ).inc()
+
+                        # The connection may be broken after a failure, start over with a fresh one
+                        connection.close()
+                        try:
+                            connection.open()
+                        except Exception as exc:
+                            logger.error(f"Failed to reopen connection to the mail server: {exc}")
+                            return sent_count, failed_count
+                    else:
+                        email.mark_sent()
+                        sent_count += 1
+                        EMAIL_OUTBOX_MESSAGES.labels("sent").inc()
+        finally:
+            connection.close()
+
+        return sent_count, failed_count
+
+
 def generate_playlist_update_hash(
     albums_added: list[str] | None = None,
     albums_removed: list[str] | None = None,
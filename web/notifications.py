@@ -0,0 +1,66 @@
+import datetime
+import logging
+import uuid
+from collections import defaultdict
+
+from .models import EventArtist, EventUpdate, User, UserEvent
+
+logger = logging.getLogger(__name__)
+
+
+def fan_out_event_updates(
+    users: dict[uuid.UUID, User],
+    updates: list[EventUpdate],
+    relevant_user_ids: dict[uuid.UUID, list[uuid.UUID]],
+) -> dict[User, dict[EventArtist, list[EventUpdate]]]:
+    """
+    Groups event updates by the users that should be notified of them, and then by artist. `relevant_user_ids` maps
+    event IDs to the IDs of the users the events are relevant to, as materialized in UserEvent. Users that are not in
+    `users` are not notified. The order of updates is kept.
+    """
+
+    fan_out: dict[User, dict[EventArtist, list[EventUpdate]]] = {}
+
+    for update in updates:
+        for user_id in relevant_user_ids.get(update.event_id, ()):  # pyright: ignore[reportAttributeAccessIssue]
+            if (user := users.get(user_id)) is not None:
+                fan_out.setdefault(user, defaultdict(list))[update.event.artist].append(update)
+
+    return fan_out
+
+
+async def load_event_updates_fan_out() -> dict[User, dict[EventArtist, list[EventUpdate]]]:
+    """Pending event updates of upcoming events per notifiable user, grouped by artist"""
+
+    updates_query = EventUpdate.objects.filter(
+        is_notified_of=False, event__date__gte=datetime.datetime.now(tz=datetime.UTC).date()
+    )
+    updates = [
+        update
+        async for update in updates_query.select_related("event__artist__artist").order_by("event__date", "created_at")
+    ]
+
+    if not updates:
+        return {}
+
+    # Relevance is materialized in UserEvent, the same lookup as the events page
+    user_events = UserEvent.objects.filter(event__in=updates_query.values("event_id"))
+
+    relevant_user_ids: dict[uuid.UUID, list[uuid.UUID]] = defaultdict(list)
+    async for event_id, user_id in user_events.values_list("event_id", "user_id"):
+        relevant_user_ids[event_id].append(user_id)
+
+    users = {
+        user.id: user
+        async for user in User.objects.filter(
+            id__in=user_events.values("user_id"),
+            spotify_user__email__isnull=False,
+            location__isnull=False,
+            event_distance_threshold__isnull=False,
+        ).select_related("spotify_user")
+    }
+
+    fan_out = fan_out_event_updates(users, updates, relevant_user_ids)
+    logger.debug(f"Fanned out {len(updates)} event updates to {len(fan_out)} of {len(users)} users")
+
+    return fan_out
@@ -4,7 +4,7 @@ from typing import Any
 from django.db.models import signals
 from django.dispatch import receiver
 
-from .models import Event, EventUpdate
+from .models import Event, EventArtist, EventUpdate, SpotifyUser, User, UserEvent, compile_event_changes
 
 logger = logging.getLogger(__name__)
 
@@ -15,23 +15,45 @@ def handle_post_save_event(instance: Event, created: bool, **__: Any) -> None:
 
     if created:
         EventUpdate.objects.create(event=instance, type=EventUpdate.FULL)
+        UserEvent.refresh_for_events([instance])
         return
 
-    old_values = instance.get_dirty_fields()
+    dirty_fields = instance.get_dirty_fields()
 
-    if "stream_urls" not in old_values and "tickets_urls" not in old_values and "geolocation" not in old_values:
+    if not dirty_fields.keys().isdisjoint(UserEvent.RELEVANCE_FIELDS):
+        UserEvent.refresh_for_events([instance])
+
+    changes = compile_event_changes(instance, dirty_fields)
+
+    if not changes:
         logger.debug(f"No changes detected for {instance}")
         return
 
-    changes = {}
+    EventUpdate.objects.create(event=instance, type=EventUpdate.PARTIAL, changes=changes)
+
 
-    if "stream_urls" in old_values:
-        changes["stream_urls"] = {"old": old_values["stream_urls"], "new": instance.stream_urls}
+@receiver(signals.post_save, sender=User)
+def handle_post_save_user(instance: User, created: bool, **__: Any) -> None:
+    if created or not instance.get_dirty_fields().keys().isdisjoint(("location", "event_distance_threshold")):
+        logger.debug(f"Refreshing relevant events of {instance}")
+        UserEvent.refresh_for_user(instance)
 
-    if "tickets_urls" in old_values:
-        changes["tickets_urls"] = {"old": old_values["tickets_urls"], "new": instance.tickets_urls}
 
-    if "geolocation" in old_values:
-        changes["geolocation"] = {"old": old_values["geolocation"], "new": instance.geolocation}
+@receiver(signals.m2m_changed, sender=EventArtist.watching_users.through)
+def handle_watching_users_changed(
+    instance: EventArtist | SpotifyUser, action: str, reverse: bool, pk_set: set[Any] | None, **__: Any
+) -> None:
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
 
-    EventUpdate.objects.create(event=instance, type=EventUpdate.PARTIAL, changes=changes)
+    if reverse:
+        # A SpotifyUser started or stopped watching event artists with IDs in pk_set (all of them if cleared)
+        event_artist_ids = None if pk_set is None else list(pk_set)
+        for user in User.objects.filter(spotify_user=instance):
+            UserEvent.refresh_for_user(user, event_artist_ids)
+    elif pk_set is None:
+        # Nobody watches this event artist any more
+        UserEvent.objects.filter(event__artist=instance).delete()
+    else:
+        for user in User.objects.filter(spotify_user_id__in=pk_set):
+            UserEvent.refresh_for_user(user, [instance.id])
@@ -3,27 +3,37 @@ import datetime
 import itertools
 import logging
 import timeit
-from collections import defaultdict
+from collections import Counter
 from functools import partial
 from typing import Any
 
 from asgiref.sync import async_to_sync, sync_to_async
 from django.conf import settings
-from django.contrib.gis.measure import Distance
 from django.core.exceptions import ObjectDoesNotExist
-from django.core.mail import send_mail
 from django.db.models import Q
 from sentry_sdk import capture_exception
 
 from web.metrics import TASK_RUNTIME_SECONDS
 
 from .events.data import EventSourceArtist, MusicBrainzArtist
-from .events.enums import ArtistNameMatchAccuracy, EventType
+from .events.enums import ArtistNameMatchAccuracy
 from .events.exceptions import MusicBrainzException
 from .images import create_cover_image
-from .models import Artist, EventArtist, EventUpdate, Playlist, PlaylistUpdate, SpotifyAuth, SpotifyUser
+from .models import (
+    Artist,
+    ArtistTrackingRun,
+    EventArtist,
+    EventRefreshRun,
+    OutboxEmail,
+    Playlist,
+    PlaylistUpdate,
+    SpotifyAuth,
+    SpotifyUser,
+    UserEvent,
+)
+from .notifications import load_event_updates_fan_out
 from .spotify import get_client_token
-from .utils import MottleException, MottleSpotifyClient, gather_with_concurrency
+from .utils import MottleException, MottleSpotifyClient, gather_with_concurrency, measure_loop_lag
 from .views_utils import compile_event_updates_email, compile_playlist_updates_email
 
 logger = logging.getLogger(__name__)
@@ -172,22 +182,14 @@ async def check_user_playlists_for_updates(user: SpotifyUser, send_notifications
         logger.warning(f"No email for user {user}")
         return
 
-    logger.info(f"Sending email to {user.email}")
-    try:
-        await sync_to_async(send_mail)(
-            subject="We've got updates for you",
-            message="",
-            html_message=html_message,
-            from_email=f"{settings.MAIL_FROM_NAME} <{settings.MAIL_FROM_EMAIL}>",
-            recipient_list=[user.email],
-        )
-    except Exception as e:
-        logger.error(f"Failed to send email to {user.email}: {e}")
-    else:
-        # TODO: This will update all PlaylistUpdates, not just the ones that were sent
-        await PlaylistUpdate.objects.filter(
-            target_playlist__in=user.playlists.filter(~Q(configs_as_watching=None))  # pyright: ignore[reportAttributeAccessIssue]
-        ).aupdate(is_notified_of=True)
+    logger.info(f"Queueing email to {user.email}")
+    # The updates are marked as notified of by the sender, once the email has actually been delivered
+    await OutboxEmail.enqueue(
+        recipient=user.email,
+        subject="We've got updates for you",
+        html_message=html_message,
+        playlist_updates=[u["update"] for update_list in updates.values() for u in update_list],
+    )
 
 
 async def acheck_playlists_for_updates(send_notifications: bool = False) -> None:
@@ -214,21 +216,38 @@ async def acheck_artists_for_event_updates(
 
     logger.info("Checking artists for event updates")
 
+    # Explicitly requested artists, and all of them on a forced refetch, are processed regardless of staleness
     if artist_spotify_ids:
         artists = EventArtist.objects.filter(artist__spotify_id__in=artist_spotify_ids).all()
-    else:
+        artists_to_process = [artist async for artist in artists]
+    elif force_refetch:
         artists = EventArtist.objects.all()
-    num_artists = await artists.acount()
+        artists_to_process = [artist async for artist in artists]
+    else:
+        artists_to_process = [artist async for artist in EventArtist.due_for_refresh()]
+        # Limited by the budget, hence not a subquery
+        artists = EventArtist.objects.filter(id__in=[artist.id for artist in artists_to_process])
+    num_artists = len(artists_to_process)
+
+    run = EventRefreshRun(
+        started_at=datetime.datetime.now(tz=datetime.UTC), force_refetch=force_refetch, num_artists=num_artists
+    )
 
-    success_count = 0
-    fail_count = 0
-    num_events = 0
-    num_urls = 0
+    # Only upcoming events are looked up in UserEvent
+    await UserEvent.objects.filter(event__date__lt=run.started_at.date()).adelete()
+    request_stats_before = EventRefreshRun.request_stats()
+    failures: Counter[str] = Counter()
 
     logger.info(f"Artists to process: {num_artists}")
 
+    # One query for the whole run instead of one per artist
+    known_events = {} if force_refetch else await EventArtist.load_known_events(artists)
+
     if concurrent_execution:
-        calls = [artist.update_events(force_refetch=force_refetch) async for artist in artists]
+        calls = [
+            artist.update_events(force_refetch=force_refetch, known_events=known_events.get(artist.id, {}))
+            for artist in artists_to_process
+        ]
 
         concurrency_limit = concurrency_limit or settings.EVENTS_FETCH_CONCURRENCY_LIMIT
 
@@ -237,67 +256,49 @@ async def acheck_artists_for_event_updates(
         else:
             results = await asyncio.gather(*calls, return_exceptions=True)
 
-        for result in results:
+        for artist, result in zip(artists_to_process, results, strict=True):
             if isinstance(result, Exception):
-                logger.exception(f"Failed to process artist: {result}")
-                fail_count += 1
-            elif isinstance(result, EventArtist):
-                logger.debug(f"Processed artist: {result}")
-                success_count += 1
-                num_events += await result.events.acount()  # pyright: ignore[reportAttributeAccessIssue]
-                async for event in result.events.all():  # pyright: ignore[reportAttributeAccessIssue]
-                    num_urls += len(event.stream_urls or []) + len(event.tickets_urls or [])
+                logger.exception(f"Failed to process artist {artist}: {result}")
+                run.num_artists_failed += 1
+                failures[result.__class__.__name__] += 1
+            else:
+                logger.debug(f"Processed artist: {artist}")
+                run.num_artists_succeeded += 1
+                run.num_events_created += result[0]
+                run.num_events_updated += result[1]
+                run.num_urls_shortened += result[2]
     else:
-        async for artist in artists:
+        for artist in artists_to_process:
             logger.info(f"Processing artist {artist}")
 
             try:
-                await artist.update_events(force_refetch=force_refetch)
+                num_created, num_updated, num_urls_shortened = await artist.update_events(
+                    force_refetch=force_refetch, known_events=known_events.get(artist.id, {})
+                )
             except Exception as e:
                 logger.error(f"Failed to update events for artist {artist}: {e}")
-                fail_count += 1
+                run.num_artists_failed += 1
+                failures[e.__class__.__name__] += 1
                 continue
             else:
-                success_count += 1
+                run.num_artists_succeeded += 1
+                run.num_events_created += num_created
+                run.num_events_updated += num_updated
+                run.num_urls_shortened += num_urls_shortened
+
+    run.failures = dict(failures)
+    await run.finish(artists, request_stats_before)
+    run.export_metrics()
 
     if compile_notifications:
         # TODO: Only do it if there are updates
         token = get_client_token()
         spotify_client = MottleSpotifyClient(token.access_token)
 
-        async for spotify_user in SpotifyUser.objects.filter(
-            ~Q(watched_event_artists=None),
-            email__isnull=False,
-            user__location__isnull=False,
-            user__event_distance_threshold__isnull=False,
-        ):
-            artists_with_events = defaultdict(list)
-            user = await sync_to_async(lambda: spotify_user.user)()  # pyright: ignore[reportAttributeAccessIssue]
-
-            async for event_artist in spotify_user.watched_event_artists.all():  # pyright: ignore[reportAttributeAccessIssue]
-                # Two cases:
-                # 1. Streaming event
-                # 2. Non-streaming event with geolocation defined, and its geolocation is within the configured number
-                #    of km of user's location
-                # Non-streaming events sometimes do not have geolocation (https://www.songkick.com/concerts/41973416)
-                events_query = event_artist.events.filter(
-                    Q(date__gte=datetime.datetime.now(tz=datetime.UTC).date())
-                    & (
-                        Q(type=EventType.live_stream)
-                        | (
-                            Q(~Q(type=EventType.live_stream), geolocation__isnull=False)
-                            & Q(geolocation__distance_lte=(user.location, Distance(km=user.event_distance_threshold)))
-                        )
-                    )
-                )
+        fan_out = await load_event_updates_fan_out()
 
-                async for event in events_query.all():
-                    async for update in event.updates.filter(is_notified_of=False).all():
-                        artists_with_events[event_artist].append(update)
-
-            if not artists_with_events:
-                logger.info(f"No event updates for user {spotify_user}")
-                continue
+        for user, artists_with_events in fan_out.items():
+            spotify_user = user.spotify_user
 
             all_updates = list(itertools.chain.from_iterable(artists_with_events.values()))
             logger.info(f"Event updates for user {spotify_user}: {all_updates}")
@@ -318,28 +319,22 @@ async def acheck_artists_for_event_updates(
                 logger.warning(f"No email for user {spotify_user}")
                 continue
 
-            logger.info(f"Sending email to {spotify_user.email}")
-            try:
-                await sync_to_async(send_mail)(
-                    subject="We've got updates for you",
-                    message="",
-                    html_message=html_message,
-                    from_email=f"{settings.MAIL_FROM_NAME} <{settings.MAIL_FROM_EMAIL}>",
-                    recipient_list=[spotify_user.email],
-                )
-            except Exception as e:
-                logger.error(f"Failed to send email to {spotify_user.email}: {e}")
-            else:
-                # TODO: This will cause other users to not get notifications if they follow the same artists
-                logger.info("Marking updates as notified of")
-                await EventUpdate.objects.filter(id__in=[u.id for u in all_updates]).aupdate(is_notified_of=True)
+            logger.info(f"Queueing email to {spotify_user.email}")
+            # The updates are marked as notified of by the sender, once the email has actually been delivered
+            await OutboxEmail.enqueue(
+                recipient=spotify_user.email,
+                subject="We've got updates for you",
+                html_message=html_message,
+                event_updates=all_updates,
+            )
 
     elapsed_time = timeit.default_timer() - start_time
-    avg_per_artist = elapsed_time / num_artists
+    avg_per_artist = elapsed_time / num_artists if num_artists else 0
     logger.debug(
         f"Processed {num_artists} artists in {elapsed_time} seconds, "
-        f"success: {success_count}, fail: {fail_count}, events: {num_events}, URLs: {num_urls}, "
-        f"average {avg_per_artist} seconds per artist"
+        f"success: {run.num_artists_succeeded}, fail: {run.num_artists_failed}, "
+        f"events: {run.num_events} (created {run.num_events_created}, updated {run.num_events_updated}), "
+        f"URLs: {run.num_event_urls}, average {avg_per_artist} seconds per artist"
     )
 
 
@@ -353,17 +348,28 @@ def check_artists_for_event_updates(
 ) -> None:
     with TASK_RUNTIME_SECONDS.labels("get_event_updates").time():
         asyncio.run(
-            acheck_artists_for_event_updates(
-                artist_spotify_ids=artist_spotify_ids,
-                compile_notifications=compile_notifications,
-                send_notifications=send_notifications,
-                force_refetch=force_refetch,
-                concurrent_execution=concurrent_execution,
-                concurrency_limit=concurrency_limit,
+            measure_loop_lag(
+                "get_event_updates",
+                acheck_artists_for_event_updates(
+                    artist_spotify_ids=artist_spotify_ids,
+                    compile_notifications=compile_notifications,
+                    send_notifications=send_notifications,
+                    force_refetch=force_refetch,
+                    concurrent_execution=concurrent_execution,
+                    concurrency_limit=concurrency_limit,
+                ),
             )
         )
 
 
+def send_queued_emails() -> None:
+    with TASK_RUNTIME_SECONDS.labels("send_queued_emails").time():
+        sent_count, failed_count = OutboxEmail.send_pending()
+
+    if sent_count or failed_count:
+        logger.info(f"Outbox emails sent: {sent_count}, failed: {failed_count}")
+
+
 # def _get_users_with_event_updates() -> QuerySet[SpotifyUser]:
 #     return SpotifyUser.objects.filter(~Q(watched_event_artists=None)).prefetch_related(
 #         Prefetch(
@@ -508,22 +514,64 @@ async def atrack_artists_events(
     concurrent_execution: bool = True,
     concurrency_limit: int | None = None,
 ) -> None:
+    """
+    Tracks the events of the artists for the user, `artists_data` being Spotify IDs and names in the order of
+    priority. Artists that already have an EventArtist are tracked in a few queries for all of them, only new
+    artists are looked up in the event sources, unless `force_reevaluate`.
+    """
+
     start_time = timeit.default_timer()
 
+    for artist_spotify_id, artist_name in artists_data.items():
+        if not artist_name:
+            logger.error(f"Artist name is empty for Spotify ID {artist_spotify_id}")
+    artists_data = {
+        artist_spotify_id: artist_name for artist_spotify_id, artist_name in artists_data.items() if artist_name
+    }
+
     number_of_artists = len(artists_data)
     logger.debug(f"Artists to process: {number_of_artists}")
 
-    success_count = 0
-    fail_count = 0
+    run = ArtistTrackingRun(
+        spotify_user_id=spotify_user_id,
+        started_at=datetime.datetime.now(tz=datetime.UTC),
+        force_reevaluate=force_reevaluate,
+        num_artists=number_of_artists,
+    )
+
+    if not force_reevaluate:
+        artists = await Artist.bulk_get_or_create(list(artists_data))
+        known_artist_ids = await EventArtist.add_watching_user(list(artists.values()), spotify_user_id)
+        artists_data = {
+            artist_spotify_id: artist_name
+            for artist_spotify_id, artist_name in artists_data.items()
+            if artists[artist_spotify_id].id not in known_artist_ids
+        }
+        run.num_artists_known = len(known_artist_ids)
+
+    await run.asave()
+    logger.debug(f"Artists already tracked: {run.num_artists_known}, to look up: {len(artists_data)}")
+
     no_mb = 0
     no_sk = 0
     no_bt = 0
 
+    async def track_and_record(artist_spotify_id: str, artist_name: str) -> EventArtist:
+        try:
+            event_artist = await track_artist_events(
+                artist_spotify_id, artist_name, spotify_user_id, force_reevaluate=force_reevaluate
+            )
+        except Exception:
+            await run.record(succeeded=False)
+            raise
+
+        await run.record(succeeded=True)
+        return event_artist
+
     if concurrent_execution:
+        # Started in the order of priority
         calls = [
-            track_artist_events(artist_spotify_id, artist_name, spotify_user_id, force_reevaluate=force_reevaluate)
-            for artist_spotify_id, artist_name in artists_data.items()
-            if artist_name
+            track_and_record(artist_spotify_id, artist_name) for artist_spotify_id, artist_name in artists_data.items()
         ]
 
         concurrency_limit = concurrency_limit or settings.EVENT_SOURCES_FETCH_CONCURRENCY_LIMIT
@@ -536,10 +584,8 @@ async def atrack_artists_events(
         for result in results:
             if isinstance(result, Exception):
                 logger.exception(f"Failed to process artist: {result}")
-                fail_count += 1
             elif isinstance(result, EventArtist):
                 logger.debug(f"Processed artist: {result}")
-                success_count += 1
 
                 if result.musicbrainz_id is None:
                     no_mb += 1
@@ -549,20 +595,11 @@ async def atrack_artists_events(
                     no_bt += 1
     else:
         for artist_spotify_id, artist_name in artists_data.items():
-            if not artist_name:
-                logger.error(f"Artist name is empty for Spotify ID {artist_spotify_id}")
-                continue
-
             try:
-                event_artist = await track_artist_events(
-                    artist_spotify_id, artist_name, spotify_user_id, force_reevaluate=force_reevaluate
-                )
+                event_artist = await track_and_record(artist_spotify_id, artist_name)
             except Exception as e:
                 logger.exception(f"Failed to process artist {artist_name} (Spotify ID {artist_spotify_id}): {e}")
-                fail_count += 1
             else:
-                success_count += 1
-
                 if event_artist.musicbrainz_id is None:
                     no_mb += 1
                 if event_artist.songkick_url is None:
@@ -570,12 +607,14 @@ async def atrack_artists_events(
                 if event_artist.bandsintown_url is None:
                     no_bt += 1
 
+    await run.finish()
+
     elapsed_time = timeit.default_timer() - start_time
-    avg_per_artist = elapsed_time / number_of_artists
+    avg_per_artist = elapsed_time / max(number_of_artists, 1)
     logger.debug(
-        f"Processed {number_of_artists} artists in {elapsed_time} seconds, "
-        f"success: {success_count}, fail: {fail_count}, no MB: {no_mb}, no SK: {no_sk}, no BT: {no_bt}, "
-        f"average {avg_per_artist} seconds per artist"
+        f"Processed {number_of_artists} artists in {elapsed_time} seconds, already tracked: {run.num_artists_known}, "
+        f"success: {run.num_artists_succeeded}, fail: {run.num_artists_failed}, "
+        f"no MB: {no_mb}, no SK: {no_sk}, no BT: {no_bt}, average {avg_per_artist} seconds per artist"
     )
 
 
@@ -588,11 +627,14 @@ def track_artists_events(
 ) -> None:
     with TASK_RUNTIME_SECONDS.labels("track_artists_events").time():
         asyncio.run(
-            atrack_artists_events(
-                artists_data,
-                spotify_user_id,
-                force_reevaluate=force_reevaluate,
-                concurrent_execution=concurrent_execution,
-                concurrency_limit=concurrency_limit,
+            measure_loop_lag(
+                "track_artists_events",
+                atrack_artists_events(
+                    artists_data,
+                    spotify_user_id,
+                    force_reevaluate=force_reevaluate,
+                    concurrent_execution=concurrent_execution,
+                    concurrency_limit=concurrency_limit,
+                ),
             )
         )
@@ -3,7 +3,7 @@ import itertools
 import logging
 from collections import Counter
 from collections.abc import Awaitable, Callable, Generator, Iterable
-from contextlib import contextmanager
+from contextlib import contextmanager, suppress
 from functools import partial
 from types import MethodType
 from typing import Any
@@ -30,10 +30,14 @@ from tekore.model import (
     SimpleTrack,
 )
 
+from .metrics import EVENT_LOOP_LAG_SECONDS
 from .spotify import get_client
 
 logger = logging.getLogger(__name__)
 
+# How often the event loop lag is measured
+LOOP_LAG_INTERVAL_SECONDS = 0.5
+
 
 class MottleException(Exception):
     pass
@@ -454,3 +458,24 @@ async def gather_with_concurrency(
             return await coro
 
     return await asyncio.gather(*(sem_coro(c) for c in coroutines), return_exceptions=return_exceptions)
+
+
+async def measure_loop_lag[T](task: str, coroutine: Awaitable[T]) -> T:
+    """Awaits the coroutine while measuring how long the event loop is blocked, e.g. by parsing"""
+
+    loop = asyncio.get_running_loop()
+
+    async def measure() -> None:
+        while True:
+            start = loop.time()
+            await asyncio.sleep(LOOP_LAG_INTERVAL_SECONDS)
+            EVENT_LOOP_LAG_SECONDS.labels(task).observe(max(loop.time() - start - LOOP_LAG_INTERVAL_SECONDS, 0.0))
+
+    monitor = asyncio.create_task(measure())
+
+    try:
+        return await coroutine
+    finally:
+        monitor.cancel()
+        with suppress(asyncio.CancelledError):
+            await monitor
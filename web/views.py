@@ -1,4 +1,5 @@
 import logging
+from collections import Counter
 from datetime import UTC, datetime
 from itertools import groupby
 from urllib.parse import unquote
@@ -500,13 +501,16 @@ async def playlist_items(request: MottleHttpRequest, playlist_id: str) -> HttpRe
         if isinstance(track.track, FullPlaylistTrack)
     ]
     if settings.EVENTS_ENABLED and request.GET.get("track-artists", False):
-        artists = {}
+        artist_names = {}
+        artist_num_tracks: Counter[str] = Counter()
         for track in tracks:
             for artist in track.artists:
-                artists[artist.id] = artist.name
+                artist_names[artist.id] = artist.name
+                artist_num_tracks[artist.id] += 1
 
+        # New artists are looked up in the order of priority, those with the most tracks in the playlist first
         await sync_to_async(task_track_artists_events)(
-            artists_data=artists,
+            artists_data={artist_id: artist_names[artist_id] for artist_id, _ in artist_num_tracks.most_common()},
             spotify_user_id=request.session["spotify_user_id"],
         )
 